@@ -3,8 +3,6 @@ Admin-only endpoints.
 All routes require the current user to have role=ADMIN.
 """
 import logging
-import asyncio
-import shutil
 from fastapi import APIRouter, Depends, HTTPException
 from fastapi import Path as ApiPath
 from sqlalchemy import select, func, delete
@@ -12,46 +10,40 @@ from sqlalchemy.ext.asyncio import AsyncSession
 from starlette import status
 from typing import Annotated, List, Optional
 from fastapi import Query
-from pathlib import Path
 from pydantic import BaseModel
 
-from app.dependencies import get_db
-from app.models import AppModel, Users, ErrorLog
+from app.dependencies import get_db, get_read_db
+from app.models import AppModel, Users, ErrorLog, Deployment
 from app.constants import AppStatus, UserRoles, BillingType
-from app.services.auth import get_admin_user
-from app.services.system_metrics import get_system_metrics
-from app.services.docker import docker_container_exists, docker_remove_container, docker_remove_image
-from app.services.nginx_manager import remove_app_conf
+from app.services.auth import get_admin_user, invalidate_user_cache
+from app.services.cache import SingleFlightCache
+from app.services.pagination import paginate, split_page, cached_count
+from app.services.system_metrics import get_system_metrics, get_system_metrics_history
+from app.services.deploy_history import get_stage_percentiles, serialize_deployment
+from app.services.container_metrics import get_top_apps
+from app.services.teardown import teardown_apps
+from app.services.secrets_client import delete_secrets
 from app.config import Config
 
 logger = logging.getLogger(__name__)
 router = APIRouter(prefix="/admin", tags=["admin"])
 
 db_dep = Annotated[AsyncSession, Depends(get_db)]
+read_db_dep = Annotated[AsyncSession, Depends(get_read_db)]
 admin_dep = Annotated[Users, Depends(get_admin_user)]
 
-BASE_APPS_DIR = Path(Config.BASE_APPS_DIR)
-
 
 # ── Health ────────────────────────────────────────────────────────────────────
 
-@router.get("/health", status_code=status.HTTP_200_OK)
-async def admin_health(db: db_dep, _: admin_dep):
-    metrics = await get_system_metrics()
+_health_cache = SingleFlightCache(ttl=Config.HEALTH_CACHE_TTL)
 
-    # App stats from DB
-    result = await db.execute(select(func.count()).select_from(AppModel))
-    total_apps = result.scalar() or 0
 
-    result = await db.execute(
-        select(func.count()).select_from(AppModel).where(AppModel.status == AppStatus.RUNNING)
-    )
-    running_apps = result.scalar() or 0
+async def _compute_health(db: AsyncSession) -> dict:
+    metrics = await get_system_metrics()
 
-    result = await db.execute(
-        select(func.count()).select_from(AppModel).where(AppModel.status == AppStatus.ERROR)
-    )
-    error_apps = result.scalar() or 0
+    # One pass over apps (served from ix_apps_status) instead of three COUNT(*) queries
+    result = await db.execute(select(AppModel.status, func.count()).group_by(AppModel.status))
+    apps_by_status = {row[0]: row[1] for row in result.all()}
 
     result = await db.execute(select(func.count()).select_from(Users))
     total_users = result.scalar() or 0
@@ -59,38 +51,58 @@ async def admin_health(db: db_dep, _: admin_dep):
     return {
         **metrics,
         "apps": {
-            "total": total_apps,
-            "running": running_apps,
-            "error": error_apps,
+            "total": sum(apps_by_status.values()),
+            "running": apps_by_status.get(AppStatus.RUNNING, 0),
+            "error": apps_by_status.get(AppStatus.ERROR, 0),
         },
         "users": {"total": total_users},
     }
 
 
+@router.get("/health", status_code=status.HTTP_200_OK)
+async def admin_health(db: db_dep, _: admin_dep):
+    # Concurrent dashboards share one computation per HEALTH_CACHE_TTL window
+    return await _health_cache.get_or_load("health", lambda: _compute_health(db))
+
+
+@router.get("/health/history", status_code=status.HTTP_200_OK)
+async def admin_health_history(_: admin_dep):
+    """Recent host samples (oldest first) kept by the background sampler."""
+    return {"items": get_system_metrics_history()}
+
+
 # ── Apps ──────────────────────────────────────────────────────────────────────
 
 @router.get("/apps", status_code=status.HTTP_200_OK)
 async def admin_list_apps(
-    db: db_dep,
+    db: read_db_dep,
     _: admin_dep,
     filter_status: Optional[str] = None,
     page: int = Query(default=1, ge=1),
     size: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Opaque next_cursor from a previous page"),
 ):
-    query = select(AppModel)
+    query = select(
+        AppModel.id, AppModel.name, AppModel.subdomain, AppModel.repo_url, AppModel.branch,
+        AppModel.status, AppModel.internal_port, AppModel.container_port, AppModel.user_id,
+        AppModel.created_at,
+    )
+    count_query = select(func.count()).select_from(AppModel)
     if filter_status and filter_status in [s.value for s in AppStatus]:
-        query = query.where(AppModel.status == filter_status)
-    query = query.order_by(AppModel.id.desc()).offset((page - 1) * size).limit(size)
-    result = await db.execute(query)
-    apps = result.scalars().all()
+        query = query.where(AppModel.status == AppStatus(filter_status))
+        count_query = count_query.where(AppModel.status == AppStatus(filter_status))
+    else:
+        filter_status = None
+    result = await db.execute(paginate(query, AppModel.id, cursor, page, size))
+    apps, next_cursor = split_page(result.all(), size, lambda a: a.id)
 
-    count_result = await db.execute(select(func.count()).select_from(AppModel))
-    total = count_result.scalar() or 0
+    total = await cached_count(f"apps:{filter_status or '*'}", count_query)
 
     return {
         "total": total,
         "page": page,
         "size": size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": app.id,
@@ -109,6 +121,26 @@ async def admin_list_apps(
     }
 
 
+_TOP_APPS_SORT_FIELDS = {
+    "cpu": "cpu_percent",
+    "memory": "mem_bytes",
+    "net_rx": "net_rx_bytes",
+    "net_tx": "net_tx_bytes",
+    "block_read": "block_read_bytes",
+    "block_write": "block_write_bytes",
+}
+
+
+@router.get("/apps/top", status_code=status.HTTP_200_OK)
+async def admin_top_apps(
+    _: admin_dep,
+    by: str = Query(default="cpu", pattern="^(" + "|".join(_TOP_APPS_SORT_FIELDS) + ")$"),
+    limit: int = Query(default=10, ge=1, le=100),
+):
+    """Apps ranked by their latest container sample — served from memory, no Docker call."""
+    return {"by": by, "items": get_top_apps(_TOP_APPS_SORT_FIELDS[by], limit)}
+
+
 class AdminAppUpdate(BaseModel):
     status: Optional[str] = None
     branch: Optional[str] = None
@@ -135,58 +167,126 @@ async def admin_update_app(
     return {"id": app.id, "status": app.status.value, "branch": app.branch}
 
 
+async def _delete_app_rows(db: AsyncSession, app_ids: List[int]) -> None:
+    if app_ids:
+        await db.execute(delete(Deployment).where(Deployment.app_id.in_(app_ids)))
+        await db.execute(delete(AppModel).where(AppModel.id.in_(app_ids)))
+        await delete_secrets(app_ids)
+
+
+_BULK_DELETE_MAX = 500
+
+
+def _parse_ids(raw: List[str]) -> List[int]:
+    """Accept both ?ids=1&ids=2 and ?ids=1,2."""
+    try:
+        ids = {int(part) for value in raw for part in value.split(",") if part.strip()}
+    except ValueError:
+        raise HTTPException(status_code=400, detail="ids must be integers")
+    if not ids or min(ids) <= 0:
+        raise HTTPException(status_code=400, detail="ids must be positive integers")
+    if len(ids) > _BULK_DELETE_MAX:
+        raise HTTPException(status_code=400, detail=f"At most {_BULK_DELETE_MAX} ids per request")
+    return sorted(ids)
+
+
+@router.delete("/apps", status_code=status.HTTP_200_OK)
+async def admin_bulk_delete_apps(
+    db: db_dep,
+    _: admin_dep,
+    ids: List[str] = Query(..., description="App ids, repeated or comma-separated"),
+):
+    app_ids = _parse_ids(ids)
+    result = await db.execute(select(AppModel.id).where(AppModel.id.in_(app_ids)))
+    found = [row[0] for row in result.all()]
+    # Release the connection while containers and files are torn down
+    await db.commit()
+
+    teardown = await teardown_apps(found)
+    await _delete_app_rows(db, teardown.removed)
+    await db.commit()
+
+    return {
+        "deleted": sorted(teardown.removed),
+        "failed": {str(app_id): str(e) for app_id, e in sorted(teardown.failed.items())},
+        "not_found": sorted(set(app_ids) - set(found)),
+    }
+
+
 @router.delete("/apps/{app_id}", status_code=status.HTTP_204_NO_CONTENT)
 async def admin_delete_app(
     db: db_dep,
     _: admin_dep,
     app_id: int = ApiPath(gt=0),
 ):
-    result = await db.execute(select(AppModel).where(AppModel.id == app_id))
-    app = result.scalar_one_or_none()
-    if not app:
+    result = await db.execute(select(AppModel.id).where(AppModel.id == app_id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="App not found")
+    await db.commit()
 
-    image_name = f"app_{app_id}_image"
-    container_name = f"app_{app_id}_container"
+    teardown = await teardown_apps([app_id])
+    if app_id in teardown.failed:
+        raise teardown.failed[app_id]
 
-    container_id = await asyncio.to_thread(docker_container_exists, container_name)
-    if container_id:
-        await asyncio.to_thread(docker_remove_container, container_name, container_id)
+    await _delete_app_rows(db, [app_id])
+    await db.commit()
 
-    await asyncio.to_thread(docker_remove_image, image_name)
-    await remove_app_conf(app_id)
 
-    app_dir = BASE_APPS_DIR / f"app-{app_id}"
-    log_dir = Config.BASE_LOGS_DIR / f"app-{app_id}"
-    if app_dir.exists():
-        await asyncio.to_thread(shutil.rmtree, app_dir)
-    if log_dir.exists():
-        await asyncio.to_thread(shutil.rmtree, log_dir)
+# ── Deployments ───────────────────────────────────────────────────────────────
 
-    await db.delete(app)
-    await db.commit()
+@router.get("/deployments", status_code=status.HTTP_200_OK)
+async def admin_list_deployments(
+    db: read_db_dep,
+    _: admin_dep,
+    app_id: Optional[int] = Query(default=None, gt=0),
+    page: int = Query(default=1, ge=1),
+    size: int = Query(default=50, ge=1, le=100),
+):
+    query = select(Deployment)
+    if app_id is not None:
+        query = query.where(Deployment.app_id == app_id)
+    query = query.order_by(Deployment.id.desc()).offset((page - 1) * size).limit(size)
+    result = await db.execute(query)
+    deployments = result.scalars().all()
+
+    return {
+        "page": page,
+        "size": size,
+        "items": [serialize_deployment(d) for d in deployments],
+    }
+
+
+@router.get("/deployments/stats", status_code=status.HTTP_200_OK)
+async def admin_deployment_stats(
+    db: db_dep,
+    _: admin_dep,
+    days: int = Query(default=7, ge=1, le=90),
+):
+    """p50/p95 wall time per deploy stage — shows where deploy time actually goes."""
+    return await get_stage_percentiles(db, days=days)
 
 
 # ── Users ─────────────────────────────────────────────────────────────────────
 
 @router.get("/users", status_code=status.HTTP_200_OK)
 async def admin_list_users(
-    db: db_dep,
+    db: read_db_dep,
     _: admin_dep,
     page: int = Query(default=1, ge=1),
     size: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Opaque next_cursor from a previous page"),
 ):
-    query = select(Users).order_by(Users.id.asc()).offset((page - 1) * size).limit(size)
+    query = paginate(select(Users), Users.id, cursor, page, size, descending=False)
     result = await db.execute(query)
-    users = result.scalars().all()
+    users, next_cursor = split_page(result.scalars().all(), size, lambda u: u.id)
 
-    count_result = await db.execute(select(func.count()).select_from(Users))
-    total = count_result.scalar() or 0
+    total = await cached_count("users", select(func.count()).select_from(Users))
 
     return {
         "total": total,
         "page": page,
         "size": size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": u.id,
@@ -224,6 +324,7 @@ async def admin_update_user(
         user.billing_type = BillingType(data.billing_type)
 
     await db.commit()
+    await invalidate_user_cache(user.id)
     return {"id": user.id, "role": user.role.value, "billing_type": user.billing_type.value}
 
 
@@ -233,51 +334,54 @@ async def admin_delete_user(
     _: admin_dep,
     user_id: int = ApiPath(gt=0),
 ):
-    # First delete all apps belonging to this user
-    app_result = await db.execute(select(AppModel).where(AppModel.user_id == user_id))
-    apps = app_result.scalars().all()
-    for app in apps:
-        image_name = f"app_{app.id}_image"
-        container_name = f"app_{app.id}_container"
-        container_id = await asyncio.to_thread(docker_container_exists, container_name)
-        if container_id:
-            await asyncio.to_thread(docker_remove_container, container_name, container_id)
-        await asyncio.to_thread(docker_remove_image, image_name)
-        await remove_app_conf(app.id)
-        app_dir = BASE_APPS_DIR / f"app-{app.id}"
-        if app_dir.exists():
-            await asyncio.to_thread(shutil.rmtree, app_dir)
-        await db.delete(app)
-
-    result = await db.execute(select(Users).where(Users.id == user_id))
-    user = result.scalar_one_or_none()
-    if not user:
+    result = await db.execute(select(Users.id).where(Users.id == user_id))
+    if result.scalar_one_or_none() is None:
         raise HTTPException(status_code=404, detail="User not found")
 
-    await db.delete(user)
+    app_result = await db.execute(select(AppModel.id).where(AppModel.user_id == user_id))
+    app_ids = [row[0] for row in app_result.all()]
+    # Release the connection while containers and files are torn down
     await db.commit()
 
+    teardown = await teardown_apps(app_ids)
+    await _delete_app_rows(db, teardown.removed)
+    if teardown.failed:
+        # The user's remaining apps still reference it — keep the user so the delete can be retried
+        await db.commit()
+        raise HTTPException(
+            status_code=502,
+            detail={
+                "message": "Some apps could not be torn down; the user was not deleted",
+                "failed_app_ids": sorted(teardown.failed),
+            },
+        )
+
+    await db.execute(delete(Users).where(Users.id == user_id))
+    await db.commit()
+    await invalidate_user_cache(user_id)
+
 
 # ── Error logs ────────────────────────────────────────────────────────────────
 
 @router.get("/errors", status_code=status.HTTP_200_OK)
 async def admin_error_logs(
-    db: db_dep,
+    db: read_db_dep,
     _: admin_dep,
     page: int = Query(default=1, ge=1),
     size: int = Query(default=50, ge=1, le=100),
+    cursor: Optional[str] = Query(default=None, description="Opaque next_cursor from a previous page"),
 ):
-    query = select(ErrorLog).order_by(ErrorLog.id.desc()).offset((page - 1) * size).limit(size)
-    result = await db.execute(query)
-    logs = result.scalars().all()
+    # Prefer ?cursor= for deep pages: it seeks on the primary key instead of OFFSET-scanning
+    result = await db.execute(paginate(select(ErrorLog), ErrorLog.id, cursor, page, size))
+    logs, next_cursor = split_page(result.scalars().all(), size, lambda log: log.id)
 
-    count_result = await db.execute(select(func.count()).select_from(ErrorLog))
-    total = count_result.scalar() or 0
+    total = await cached_count("error_logs", select(func.count()).select_from(ErrorLog))
 
     return {
         "total": total,
         "page": page,
         "size": size,
+        "next_cursor": next_cursor,
         "items": [
             {
                 "id": log.id,
@@ -1,27 +1,32 @@
 import logging
 import shutil
 import asyncio
-from fastapi import APIRouter, Depends, HTTPException
+from fastapi import APIRouter, Depends, HTTPException, Request, Response
+from fastapi.responses import StreamingResponse
 from fastapi import Path as ApiPath
-from sqlalchemy import select
+from sqlalchemy import select, update
 from sqlalchemy.ext.asyncio import AsyncSession
-from typing import Annotated, List
+from sqlalchemy.orm import undefer
+from typing import Annotated, List, Optional
 from fastapi import Query
 from starlette import status
 from pathlib import Path
 
-from app.dependencies import get_db
-from app.models import AppModel
+from app.dependencies import get_db, get_read_db
+from app.models import AppModel, Deployment
 from app.models.users import Users
-from app.constants import AppStatus
+from app.constants import AppStatus, DeployTrigger
 from app.services.auth import get_current_user
-from app.services.deploy import validate_github_repo, clone_or_pull_repo
-from app.services.docker import (
-    docker_build, docker_run, docker_container_exists,
-    docker_remove_container, docker_remove_image,
-)
+from app.services.deploy import validate_github_repo, clone_or_pull_repo, get_head_commit
+from app.services.deploy_history import StageTimer, start_deployment, finish_deployment, serialize_deployment
+from app.services.docker import docker_build, docker_run, docker_container_exists, docker_remove_container
 from app.services.port_manager import allocate_free_port
-from app.services.nginx_manager import write_app_conf, remove_app_conf
+from app.services.nginx_manager import write_app_conf
+from app.services.container_metrics import get_app_metrics
+from app.services.container_logs import container_log_path, follow_events, parse_since, read_tail
+from app.services.app_purger import move_to_trash, enqueue_purge
+from app.services.secrets_client import save_app_env, resolve_app_env
+from app.services.etag import compute_etag, etag_matches, not_modified, set_etag
 from app.schemas import AppCreateRequestModel, AppResponseModel, AppListItem, AppDetail, AppDeployRequestModel
 from app.Errors import AppNotFoundError
 from app.config import Config
@@ -34,11 +39,15 @@ BASE_APPS_DIR = Path(Config.BASE_APPS_DIR)
 BASE_APPS_DIR.mkdir(parents=True, exist_ok=True)
 
 db_dependency = Annotated[AsyncSession, Depends(get_db)]
+read_db_dependency = Annotated[AsyncSession, Depends(get_read_db)]
 user_dependency = Annotated[Users, Depends(get_current_user)]
 
 
-async def _get_owned_app(app_id: int, user: Users, db: AsyncSession) -> AppModel:
-    result = await db.execute(select(AppModel).where(AppModel.id == app_id))
+async def _get_owned_app(app_id: int, user: Users, db: AsyncSession, with_env: bool = False) -> AppModel:
+    query = select(AppModel).where(AppModel.id == app_id)
+    if with_env:
+        query = query.options(undefer(AppModel.env))
+    result = await db.execute(query)
     app = result.scalar_one_or_none()
     if app is None:
         raise AppNotFoundError(detail="App not found")
@@ -47,6 +56,33 @@ async def _get_owned_app(app_id: int, user: Users, db: AsyncSession) -> AppModel
     return app
 
 
+class _DeletedDuringDeploy(Exception):
+    pass
+
+
+async def _set_status(db: AsyncSession, app_id: int, new_status: AppStatus) -> bool:
+    """
+    Set and commit a deploy status unless a delete has marked the app DELETING
+    since the deploy started (the purger owns it then). Returns False in that case.
+    """
+    result = await db.execute(
+        update(AppModel)
+        .where(AppModel.id == app_id, AppModel.status != AppStatus.DELETING)
+        .values(status=new_status)
+    )
+    await db.commit()
+    return result.rowcount > 0
+
+
+async def _ensure_not_deleting(db: AsyncSession, app_id: int) -> None:
+    result = await db.execute(select(AppModel.status).where(AppModel.id == app_id))
+    current = result.scalar_one_or_none()
+    # End the transaction now: the Docker calls that follow must not hold a connection
+    await db.commit()
+    if current in (None, AppStatus.DELETING):
+        raise _DeletedDuringDeploy()
+
+
 @router.post("/create", status_code=status.HTTP_201_CREATED, response_model=AppResponseModel)
 async def create_app(model: AppCreateRequestModel, db: db_dependency, current_user: user_dependency):
     logger.info("App Create Request for repo: %s by user_id=%s", model.repo_url, current_user.id)
@@ -60,13 +96,21 @@ async def create_app(model: AppCreateRequestModel, db: db_dependency, current_us
         branch=model.branch,
         build_path=model.source_dir,
         dockerfile_path=model.dockerfile_path,
-        env=model.env,
+        env={},
         user_id=current_user.id,
     )
     db.add(new_app)
     await db.flush()
 
     new_app.subdomain = f"app-{new_app.id}"
+    # Commit before the sidecar round trip so the writer connection isn't held during it
+    await db.commit()
+    try:
+        await save_app_env(new_app, model.env)
+    except HTTPException:
+        await db.delete(new_app)
+        await db.commit()
+        raise
     await db.commit()
     logger.info("Created app %s for user_id=%s", new_app.id, current_user.id)
 
@@ -78,9 +122,22 @@ async def create_app(model: AppCreateRequestModel, db: db_dependency, current_us
     }
 
 
+def _etag_row(app) -> tuple:
+    return (app.id, app.updated_at, app.status.name)
+
+
+# Only what AppListItem returns (+ updated_at for the ETag) — rows come back as plain tuples
+_LIST_COLUMNS = (
+    AppModel.id, AppModel.name, AppModel.subdomain, AppModel.container_port, AppModel.repo_url,
+    AppModel.build_path, AppModel.branch, AppModel.status, AppModel.updated_at,
+)
+
+
 @router.get("/list/", status_code=status.HTTP_200_OK, response_model=List[AppListItem])
 async def get_apps(
-    db: db_dependency,
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
     current_user: user_dependency,
     filter_status: str | None = None,
     page: int = Query(default=1, ge=1),
@@ -88,13 +145,23 @@ async def get_apps(
 ):
     logger.info("Listing apps for user_id=%s", current_user.id)
 
-    query = select(AppModel).where(AppModel.user_id == current_user.id)
-    if filter_status and filter_status in [s.value for s in AppStatus]:
-        query = query.where(AppModel.status == filter_status)
+    def _page(query):
+        query = query.where(AppModel.user_id == current_user.id)
+        if filter_status and filter_status in [s.value for s in AppStatus]:
+            query = query.where(AppModel.status == AppStatus(filter_status))
+        return query.order_by(AppModel.id).offset((page - 1) * size).limit(size)
 
-    query = query.offset((page - 1) * size).limit(size)
-    result = await db.execute(query)
-    apps = result.scalars().all()
+    etag_scope = f"apps:{current_user.id}"
+    if request.headers.get("if-none-match"):
+        # Validator only: a 304 costs one narrow query, no full rows
+        validator = await db.execute(_page(select(AppModel.id, AppModel.updated_at, AppModel.status)))
+        etag = compute_etag(etag_scope, (_etag_row(row) for row in validator))
+        if etag_matches(request, etag):
+            return not_modified(etag)
+
+    result = await db.execute(_page(select(*_LIST_COLUMNS)))
+    apps = result.all()
+    set_etag(response, compute_etag(etag_scope, (_etag_row(app) for app in apps)))
 
     return [
         {
@@ -112,9 +179,29 @@ async def get_apps(
 
 
 @router.get("/{app_id}", status_code=status.HTTP_200_OK, response_model=AppDetail)
-async def get_app(db: db_dependency, current_user: user_dependency, app_id: int = ApiPath(gt=0)):
+async def get_app(
+    request: Request,
+    response: Response,
+    db: read_db_dependency,
+    current_user: user_dependency,
+    app_id: int = ApiPath(gt=0),
+):
     logger.info("Fetching details for app_id=%s user_id=%s", app_id, current_user.id)
-    app = await _get_owned_app(app_id, current_user, db)
+
+    etag_scope = f"app:{current_user.id}"
+    if request.headers.get("if-none-match"):
+        result = await db.execute(
+            select(AppModel.id, AppModel.updated_at, AppModel.status, AppModel.user_id)
+            .where(AppModel.id == app_id)
+        )
+        row = result.one_or_none()
+        if row is not None and row.user_id == current_user.id:
+            etag = compute_etag(etag_scope, [_etag_row(row)])
+            if etag_matches(request, etag):
+                return not_modified(etag)
+
+    app = await _get_owned_app(app_id, current_user, db, with_env=True)
+    set_etag(response, compute_etag(etag_scope, [_etag_row(app)]))
 
     return {
         "id": app.id,
@@ -133,33 +220,20 @@ async def get_app(db: db_dependency, current_user: user_dependency, app_id: int
     }
 
 
-@router.delete("/delete/{app_id}", status_code=status.HTTP_204_NO_CONTENT)
+@router.delete("/delete/{app_id}", status_code=status.HTTP_202_ACCEPTED)
 async def delete_app(db: db_dependency, current_user: user_dependency, app_id: int = ApiPath(gt=0)):
     logger.info("Delete request for app_id=%s user_id=%s", app_id, current_user.id)
     app = await _get_owned_app(app_id, current_user, db)
 
-    image_name = f"app_{app_id}_image"
-    container_name = f"app_{app_id}_container"
-
-    container_id = await asyncio.to_thread(docker_container_exists, container_name)
-    if container_id:
-        await asyncio.to_thread(docker_remove_container, container_name, container_id)
-
-    await asyncio.to_thread(docker_remove_image, image_name)
-
-    app_dir = BASE_APPS_DIR / f"app-{app_id}"
-    log_dir = Config.BASE_LOGS_DIR / f"app-{app_id}"
-    if app_dir.exists():
-        await asyncio.to_thread(shutil.rmtree, app_dir)
-    if log_dir.exists():
-        await asyncio.to_thread(shutil.rmtree, log_dir)
-
-    # Remove Nginx config (no-op if NGINX_ENABLED=false)
-    await remove_app_conf(app_id)
+    if app.status != AppStatus.DELETING:
+        app.status = AppStatus.DELETING
+        await db.commit()
 
-    await db.delete(app)
-    await db.commit()
-    logger.info("App %s deleted.", app_id)
+    # Constant-time regardless of workspace size; the purger removes containers, images and files
+    await asyncio.to_thread(move_to_trash, app_id)
+    enqueue_purge(app_id)
+    logger.info("App %s marked for deletion.", app_id)
+    return {"id": app_id, "status": AppStatus.DELETING.value}
 
 
 @router.post("/{app_id}/deploy", status_code=status.HTTP_201_CREATED)
@@ -170,7 +244,9 @@ async def deploy_app(
     app_id: int = ApiPath(gt=0),
 ):
     logger.info("Deploy triggered for app_id=%s user_id=%s", app_id, current_user.id)
-    app = await _get_owned_app(app_id, current_user, db)
+    app = await _get_owned_app(app_id, current_user, db, with_env=True)
+    if app.status == AppStatus.DELETING:
+        raise HTTPException(status_code=409, detail="App is being deleted")
 
     if props.branch is not None:
         app.branch = props.branch
@@ -179,50 +255,145 @@ async def deploy_app(
     if props.source_dir is not None:
         app.build_path = props.source_dir
     if props.env is not None:
-        app.env = props.env
+        await save_app_env(app, props.env)
+    env = await resolve_app_env(app)
 
     app_dir = BASE_APPS_DIR / f"app-{app.id}"
     if props.force_rebuild and app_dir.exists():
         await asyncio.to_thread(shutil.rmtree, app_dir)
     app_dir.mkdir(parents=True, exist_ok=True)
 
+    trigger = DeployTrigger.FORCE_REBUILD if props.force_rebuild else DeployTrigger.MANUAL
+    deployment = await start_deployment(db, app, trigger=trigger, user_id=current_user.id)
+    timer = StageTimer()
+
     try:
-        await asyncio.to_thread(clone_or_pull_repo, str(app.repo_url), app_dir, env=props.env)
+        with timer.stage("clone"):
+            await asyncio.to_thread(clone_or_pull_repo, str(app.repo_url), app_dir, env=env)
         logger.info("Code fetched for app %s", app_id)
-        app.status = AppStatus.PREPARED
-        await db.commit()
-
-        await asyncio.to_thread(
-            docker_build, app, app_dir,
-            build_args=props.build_args or {},
-            clear_cache=props.clear_cache or False,
-        )
+        # Recorded before the build so failed builds can be traced to a commit too
+        deployment.commit_sha = await asyncio.to_thread(get_head_commit, app_dir)
+        if not await _set_status(db, app_id, AppStatus.PREPARED):
+            raise _DeletedDuringDeploy()
+
+        with timer.stage("build"):
+            deployment.image_tag = await asyncio.to_thread(
+                docker_build, app, app_dir,
+                build_args=props.build_args or {},
+                clear_cache=props.clear_cache or False,
+            )
         logger.info("Docker build successful for app %s", app_id)
 
-        container_name = f"app_{app.id}_container"
-        container_id = await asyncio.to_thread(docker_container_exists, container_name)
-        if container_id:
-            await asyncio.to_thread(docker_remove_container, container_name, container_id)
-            app.internal_port = None
-            await db.commit()
+        await _ensure_not_deleting(db, app_id)
+        with timer.stage("port"):
+            container_name = f"app_{app.id}_container"
+            container_id = await asyncio.to_thread(docker_container_exists, container_name)
+            if container_id:
+                await asyncio.to_thread(docker_remove_container, container_name, container_id)
+                app.internal_port = None
+                await db.commit()
 
-        app.internal_port = await allocate_free_port(db)
-        await db.commit()
+            app.internal_port = await allocate_free_port(db)
+            await db.commit()
         logger.info("Port %d allocated for app %s", app.internal_port, app_id)
 
-        Config.BASE_LOGS_DIR.mkdir(parents=True, exist_ok=True)
-        await asyncio.to_thread(docker_run, app, app_dir, env_vars=props.env or {})
-        app.status = AppStatus.RUNNING
-        await db.commit()
+        with timer.stage("run"):
+            Config.BASE_LOGS_DIR.mkdir(parents=True, exist_ok=True)
+            await _ensure_not_deleting(db, app_id)
+            await asyncio.to_thread(docker_run, app, app_dir, env_vars=env)
+            if not await _set_status(db, app_id, AppStatus.RUNNING):
+                raise _DeletedDuringDeploy()
         logger.info("App %s is RUNNING on port %d", app_id, app.internal_port)
 
         # Write Nginx config (no-op if NGINX_ENABLED=false)
-        await write_app_conf(app.id, app.subdomain, app.internal_port)
-
+        with timer.stage("nginx"):
+            await write_app_conf(app.id, app.subdomain, app.internal_port)
+
+    except _DeletedDuringDeploy:
+        logger.warning("App %s was deleted during its deploy; aborting", app_id)
+        # Purging is idempotent: have the purger also remove whatever this deploy created
+        enqueue_purge(app_id)
+        raise HTTPException(status_code=409, detail="App was deleted during the deploy")
     except Exception as e:
         logger.error("Deployment failed for app %s: %s", app_id, str(e))
-        app.status = AppStatus.ERROR
-        await db.commit()
+        if not db.sync_session.is_active:
+            await db.rollback()  # a failed flush, e.g. the row was purged under us
+        if not await _set_status(db, app_id, AppStatus.ERROR):
+            enqueue_purge(app_id)
+            raise
+        await finish_deployment(db, deployment, timer, error=e)
         raise
 
-    return {"id": app.id, "status": app.status.value}
+    await finish_deployment(db, deployment, timer)
+    return {"id": app.id, "status": app.status.value, "deployment_id": deployment.id}
+
+
+@router.get("/{app_id}/deployments", status_code=status.HTTP_200_OK)
+async def list_deployments(
+    db: db_dependency,
+    current_user: user_dependency,
+    app_id: int = ApiPath(gt=0),
+    page: int = Query(default=1, ge=1),
+    size: int = Query(default=20, ge=1, le=100),
+):
+    await _get_owned_app(app_id, current_user, db)
+
+    query = (
+        select(Deployment)
+        .where(Deployment.app_id == app_id)
+        .order_by(Deployment.id.desc())
+        .offset((page - 1) * size)
+        .limit(size)
+    )
+    result = await db.execute(query)
+    return [serialize_deployment(d) for d in result.scalars().all()]
+
+
+@router.get("/{app_id}/metrics", status_code=status.HTTP_200_OK)
+async def app_metrics(
+    db: db_dependency,
+    current_user: user_dependency,
+    app_id: int = ApiPath(gt=0),
+    window: int = Query(default=300, ge=10, le=86400, description="Lookback in seconds"),
+):
+    await _get_owned_app(app_id, current_user, db)
+    return get_app_metrics(app_id, window)
+
+
+@router.get("/{app_id}/logs", status_code=status.HTTP_200_OK)
+async def app_logs(
+    request: Request,
+    db: read_db_dependency,
+    current_user: user_dependency,
+    app_id: int = ApiPath(gt=0),
+    tail: int = Query(default=100, ge=0, le=10000, description="Number of most recent lines"),
+    since: Optional[str] = Query(default=None, description="Epoch seconds, RFC 3339 time or duration (10m, 2h)"),
+    follow: bool = Query(default=False, description="Keep streaming new lines as server-sent events"),
+):
+    await _get_owned_app(app_id, current_user, db)
+    # A follow stream can stay open for hours; don't keep a pooled connection checked out for it
+    await db.close()
+
+    try:
+        since_ts = parse_since(since)
+    except ValueError as e:
+        raise HTTPException(status_code=422, detail=str(e))
+
+    path = await container_log_path(app_id)
+    if path is None:
+        raise HTTPException(status_code=404, detail="App has no container logs")
+    try:
+        lines, offset = await asyncio.to_thread(read_tail, path, tail, since_ts)
+    except FileNotFoundError:
+        raise HTTPException(status_code=404, detail="App has no container logs")
+    except PermissionError:
+        logger.error("Cannot read container log %s: permission denied", path)
+        raise HTTPException(status_code=503, detail="Container logs are not readable")
+
+    if not follow:
+        return {"app_id": app_id, "lines": lines}
+    return StreamingResponse(
+        follow_events(path, lines, offset, request.is_disconnected),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
@@ -15,8 +15,9 @@ from app.services.auth import (
     create_refresh_token,
     decode_token,
     get_current_user,
+    invalidate_user_cache,
 )
-from app.utils import hash_password, verify_password
+from app.utils import hash_password_async, verify_password_async
 from app.services.otp_manager import OTPManager
 from app.services.redis_service import redis_delete, redis_get, redis_set
 from app.services.CommunicationBuilder import CommunicationBuilder, PasswordResetTemplate
@@ -49,7 +50,7 @@ async def register(data: RegisterRequest, db: AsyncSession = Depends(get_db)):
     user = Users(
         username=data.username,
         email=data.email,
-        hashed_password=hash_password(data.password),
+        hashed_password=await hash_password_async(data.password),
         role=UserRoles.USER,
         billing_type=BillingType.FREE,
     )
@@ -141,14 +142,19 @@ async def update_password(
     current_user: Users = Depends(get_current_user),
     db: AsyncSession = Depends(get_db),
 ):
-    if not verify_password(data.current_password, current_user.hashed_password):
+    # current_user may be a detached snapshot from the token cache — load the row to modify it
+    user = await db.get(Users, current_user.id)
+    if not user:
+        raise HTTPException(status_code=401, detail="User not found")
+    if not await verify_password_async(data.current_password, user.hashed_password):
         raise HTTPException(status_code=400, detail="Current password is incorrect")
     if data.current_password == data.new_password:
         raise HTTPException(status_code=400, detail="New password must differ from current password")
 
-    current_user.hashed_password = hash_password(data.new_password)
+    user.hashed_password = await hash_password_async(data.new_password)
     await db.commit()
-    logger.info("Password updated for user %s", current_user.username)
+    await invalidate_user_cache(user.id)
+    logger.info("Password updated for user %s", user.username)
     return {"message": "Password updated successfully"}
 
 
@@ -165,6 +171,7 @@ async def verify_otp(data: VerifyOtpRequest, db: AsyncSession = Depends(get_db))
 
     user.is_verified = True
     await db.commit()
+    await invalidate_user_cache(user.id)
     logger.info("User %s email verified", user.username)
     return {"message": "Email verified successfully"}
 
@@ -200,8 +207,8 @@ async def forgot_password(data: ForgotPasswordRequest, db: AsyncSession = Depend
         template=PasswordResetTemplate(),
         data={"reset_link": reset_link, "username": user.username},
     )
-    builder.send()
-    logger.info("Password reset link sent to %s", user.email)
+    builder.enqueue()
+    logger.info("Password reset link queued for %s", user.email)
     return {"message": "If that email is registered, a reset link has been sent"}
 
 
@@ -216,8 +223,9 @@ async def reset_password(data: ResetPasswordRequest, db: AsyncSession = Depends(
     if not user:
         raise HTTPException(status_code=404, detail="User not found")
 
-    user.hashed_password = hash_password(data.new_password)
+    user.hashed_password = await hash_password_async(data.new_password)
     await db.commit()
+    await invalidate_user_cache(user.id)
     await redis_delete(f"pwd_reset:{data.token}")
     logger.info("Password reset for user %s", user.username)
     return {"message": "Password reset successfully"}
@@ -8,6 +8,16 @@ load_dotenv()
 
 class Config:
     DB_URL: str = os.getenv("DB_URL", "sqlite+aiosqlite:///./gitdeploy.db")
+    # Optional read replica for list/detail endpoints (e.g. a Postgres streaming replica)
+    DB_READ_URL: str = os.getenv("DB_READ_URL", "")
+    DB_READ_POOL_SIZE: int = int(os.getenv("DB_READ_POOL_SIZE", "10"))
+    DB_READ_MAX_OVERFLOW: int = int(os.getenv("DB_READ_MAX_OVERFLOW", "20"))
+    # SQLite profile: WAL + tuned pragmas, one writer connection and a read pool
+    SQLITE_TUNING: bool = os.getenv("SQLITE_TUNING", "true").lower() == "true"
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SQLITE_READ_POOL_SIZE", "5"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SQLITE_CACHE_SIZE_KB", "16384"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SQLITE_MMAP_SIZE", str(256 * 1024 * 1024)))
     BASE_APPS_DIR: Path = Path(os.getenv("BASE_APPS_DIR", "/opt/apps"))
     BASE_LOGS_DIR: Path = Path(os.getenv("BASE_LOGS_DIR", "/opt/logs"))
     VALID_API_KEY: str = os.getenv("VALID_API_KEY", "")
@@ -18,9 +28,28 @@ class Config:
     ACCESS_TOKEN_EXPIRE_MINUTES: int = int(os.getenv("ACCESS_TOKEN_EXPIRE_MINUTES", "15"))
     REFRESH_TOKEN_EXPIRE_DAYS: int = int(os.getenv("REFRESH_TOKEN_EXPIRE_DAYS", "7"))
 
+    # bcrypt runs in a process pool (0 = worker threads) with a bounded queue
+    PASSWORD_HASH_WORKERS: int = int(os.getenv("PASSWORD_HASH_WORKERS", str(min(os.cpu_count() or 1, 4))))
+    PASSWORD_HASH_QUEUE: int = int(os.getenv("PASSWORD_HASH_QUEUE", "64"))
+
+    # Verified access token → user snapshot cache (per worker)
+    AUTH_CACHE_TTL: float = float(os.getenv("AUTH_CACHE_TTL", "30"))
+    AUTH_CACHE_MAX_ENTRIES: int = int(os.getenv("AUTH_CACHE_MAX_ENTRIES", "10000"))
+
     # Redis — optional, gracefully skipped if not set
     REDIS_URL: str = os.getenv("REDIS_URL", "redis://localhost:6379/0")
     REDIS_ENABLED: bool = os.getenv("REDIS_ENABLED", "false").lower() == "true"
+    # Per-worker near cache for redis_get; values are at most REDIS_NEAR_CACHE_TTL seconds stale
+    REDIS_NEAR_CACHE_ENABLED: bool = os.getenv("REDIS_NEAR_CACHE_ENABLED", "false").lower() == "true"
+    REDIS_NEAR_CACHE_TTL: float = float(os.getenv("REDIS_NEAR_CACHE_TTL", "5"))
+    REDIS_NEAR_CACHE_MAX_ENTRIES: int = int(os.getenv("REDIS_NEAR_CACHE_MAX_ENTRIES", "10000"))
+    # Cap for the in-process store used instead of Redis when it is disabled/unreachable
+    MEMORY_STORE_MAX_BYTES: int = int(os.getenv("MEMORY_STORE_MAX_BYTES", str(64 * 1024 * 1024)))
+
+    # Rate limiting — token buckets on login/register/OTP/deploy routes
+    RATE_LIMIT_ENABLED: bool = os.getenv("RATE_LIMIT_ENABLED", "true").lower() == "true"
+    # Take the client IP from X-Forwarded-For (only behind a trusted proxy such as Nginx)
+    RATE_LIMIT_TRUST_FORWARDED: bool = os.getenv("RATE_LIMIT_TRUST_FORWARDED", "false").lower() == "true"
 
     # Domain — used to build public app URLs (e.g. app-1.yourdomain.com)
     APP_DOMAIN: str = os.getenv("APP_DOMAIN", "localhost")
@@ -28,6 +57,13 @@ class Config:
     # Secret Sidecar
     SIDECAR_URL: str = os.getenv("SIDECAR_URL", "http://localhost:8001")
     SIDECAR_API_KEY: str = os.getenv("SIDECAR_API_KEY", secrets.token_hex(32))
+    # Store app env vars in the sidecar instead of plaintext in apps.env
+    SIDECAR_ENABLED: bool = os.getenv("SIDECAR_ENABLED", "false").lower() == "true"
+    SIDECAR_TIMEOUT: float = float(os.getenv("SIDECAR_TIMEOUT", "5"))
+    SIDECAR_MAX_CONNECTIONS: int = int(os.getenv("SIDECAR_MAX_CONNECTIONS", "10"))
+    # Decrypted secrets cached per worker
+    SECRETS_CACHE_TTL: float = float(os.getenv("SECRETS_CACHE_TTL", "30"))
+    SECRETS_CACHE_MAX_ENTRIES: int = int(os.getenv("SECRETS_CACHE_MAX_ENTRIES", "1000"))
 
     # Nginx — automatic config management
     NGINX_ENABLED: bool = os.getenv("NGINX_ENABLED", "false").lower() == "true"
@@ -35,9 +71,52 @@ class Config:
     NGINX_AUTO_RELOAD: bool = os.getenv("NGINX_AUTO_RELOAD", "false").lower() == "true"
     NGINX_LISTEN_PORT: int = int(os.getenv("NGINX_LISTEN_PORT", "80"))
 
+    # How many apps are torn down (container, image, files) in parallel on bulk deletes
+    TEARDOWN_CONCURRENCY: int = int(os.getenv("TEARDOWN_CONCURRENCY", "8"))
+    # Purge deleted app files under ionice idle class / nice 19 when available
+    PURGE_LOW_PRIORITY: bool = os.getenv("PURGE_LOW_PRIORITY", "true").lower() == "true"
+    # Container env is passed as a --env-file rendered here (tmpfs) and deleted once the container starts
+    ENV_FILE_DIR: Path = Path(os.getenv("ENV_FILE_DIR", "/dev/shm/gitdeploy"))
+    # Also write the env to <repo>/.env for apps that read it at build time (rewritten only when it changes)
+    DEPLOY_WRITE_DOTENV: bool = os.getenv("DEPLOY_WRITE_DOTENV", "false").lower() == "true"
+
+    # Metrics — Prometheus exposition at /metrics
+    METRICS_ENABLED: bool = os.getenv("METRICS_ENABLED", "true").lower() == "true"
+    # Optional bearer token required to scrape /metrics (empty = no auth)
+    METRICS_TOKEN: str = os.getenv("METRICS_TOKEN", "")
+
+    # Host metrics — background psutil sampler behind /admin/health
+    SYSTEM_METRICS_INTERVAL: int = int(os.getenv("SYSTEM_METRICS_INTERVAL", "5"))
+    SYSTEM_METRICS_HISTORY: int = int(os.getenv("SYSTEM_METRICS_HISTORY", "120"))  # 10 min at 5s
+
+    # /admin/health payload is cached this many seconds (shared by concurrent callers)
+    HEALTH_CACHE_TTL: float = float(os.getenv("HEALTH_CACHE_TTL", "5"))
+
+    # Totals on admin listing endpoints are cached this many seconds
+    ADMIN_COUNT_CACHE_TTL: float = float(os.getenv("ADMIN_COUNT_CACHE_TTL", "30"))
+
+    # Per-container resource metrics (docker stats sampled in the background)
+    CONTAINER_METRICS_ENABLED: bool = os.getenv("CONTAINER_METRICS_ENABLED", "true").lower() == "true"
+    CONTAINER_METRICS_INTERVAL: int = int(os.getenv("CONTAINER_METRICS_INTERVAL", "15"))
+    CONTAINER_METRICS_SAMPLES: int = int(os.getenv("CONTAINER_METRICS_SAMPLES", "240"))  # 1h at 15s
+
+    # GET /apps/{id}/logs?follow=true — poll interval for new lines and SSE keep-alive period (seconds)
+    LOG_FOLLOW_POLL_INTERVAL: float = float(os.getenv("LOG_FOLLOW_POLL_INTERVAL", "0.5"))
+    LOG_FOLLOW_HEARTBEAT: float = float(os.getenv("LOG_FOLLOW_HEARTBEAT", "15"))
+
     # SMTP — used for OTP and password reset emails
     SMTP_EMAIL: str = os.getenv("SMTP_EMAIL", "")
     SMTP_PASSWORD: str = os.getenv("SMTP_PASSWORD", "")
+    SMTP_HOST: str = os.getenv("SMTP_HOST", "smtp.gmail.com")
+    SMTP_PORT: int = int(os.getenv("SMTP_PORT", "465"))
+    SMTP_USE_SSL: bool = os.getenv("SMTP_USE_SSL", "true").lower() == "true"
+
+    # Email outbox — background sender reusing one SMTP connection
+    EMAIL_QUEUE_MAX: int = int(os.getenv("EMAIL_QUEUE_MAX", "1000"))
+    EMAIL_BATCH_SIZE: int = int(os.getenv("EMAIL_BATCH_SIZE", "20"))
+    EMAIL_MAX_ATTEMPTS: int = int(os.getenv("EMAIL_MAX_ATTEMPTS", "5"))
+    EMAIL_RETRY_BASE_SECONDS: float = float(os.getenv("EMAIL_RETRY_BASE_SECONDS", "5"))
+    EMAIL_SMTP_IDLE_SECONDS: float = float(os.getenv("EMAIL_SMTP_IDLE_SECONDS", "60"))
 
     # Frontend URL — used to build password reset links
     FRONTEND_URL: str = os.getenv("FRONTEND_URL", "http://localhost:5173")
@@ -4,6 +4,7 @@ class AppStatus(enum.Enum):
     RUNNING = "running"
     ERROR = "error"
     PREPARED = "prepared"
+    DELETING = "deleting"
 
 class BillingType(enum.Enum):
     FREE = "free"
@@ -11,4 +12,13 @@ class BillingType(enum.Enum):
 
 class UserRoles(enum.Enum):
     USER = "user"
-    ADMIN = "admin"
\ No newline at end of file
+    ADMIN = "admin"
+
+class DeploymentStatus(enum.Enum):
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class DeployTrigger(enum.Enum):
+    MANUAL = "manual"
+    FORCE_REBUILD = "force_rebuild"
@@ -1,5 +1,10 @@
+from contextvars import ContextVar
+
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.sql.dml import UpdateBase
+from sqlalchemy.sql.elements import TextClause
 from app.config import Config
 
 
@@ -17,19 +22,27 @@ def _make_async_url(url: str) -> str:
 
 
 ASYNC_DATABASE_URL = _make_async_url(Config.DB_URL)
+_IS_SQLITE = ASYNC_DATABASE_URL.startswith("sqlite")
+# In-memory databases are per connection — they can't be split across pools
+_IS_SQLITE_FILE = _IS_SQLITE and ":memory:" not in ASYNC_DATABASE_URL and not ASYNC_DATABASE_URL.endswith("://")
+_SQLITE_PROFILE = _IS_SQLITE_FILE and Config.SQLITE_TUNING
 
 connect_args = {}
-if "sqlite" in ASYNC_DATABASE_URL:
+if _IS_SQLITE:
     connect_args["check_same_thread"] = False
 
 _pool_kwargs = {}
-if "sqlite" not in ASYNC_DATABASE_URL:
+if not _IS_SQLITE:
     _pool_kwargs = {
         "pool_size": 10,
         "max_overflow": 20,
         "pool_pre_ping": True,
         "pool_recycle": 3600,
     }
+elif _SQLITE_PROFILE:
+    # Single writer: write transactions queue for this one connection instead of
+    # racing each other into "database is locked"
+    _pool_kwargs = {"pool_size": 1, "max_overflow": 0}
 
 engine = create_async_engine(
     ASYNC_DATABASE_URL,
@@ -38,14 +51,120 @@ engine = create_async_engine(
     **_pool_kwargs,
 )
 
-AsyncSessionLocal = async_sessionmaker(
-    bind=engine,
+# Read-only pool on the same SQLite file (no lag); None means "read from `engine`"
+read_engine = None
+# Optional replica (DB_READ_URL) — may lag, so only get_read_db sessions use it
+replica_engine = None
+
+if Config.DB_READ_URL:
+    replica_engine = create_async_engine(
+        _make_async_url(Config.DB_READ_URL),
+        echo=False,
+        pool_size=Config.DB_READ_POOL_SIZE,
+        max_overflow=Config.DB_READ_MAX_OVERFLOW,
+        pool_pre_ping=True,
+        pool_recycle=3600,
+    )
+
+# Set once anything in the current request (task) has written through `engine`;
+# from then on replica reads in the same request go to the primary instead.
+_request_wrote: ContextVar[bool] = ContextVar("db_request_wrote", default=False)
+
+
+# ── SQLite performance profile ────────────────────────────────────────────────
+# WAL lets readers run alongside the writer, synchronous=NORMAL is durable
+# across application crashes (only an OS crash can lose the last commits),
+# and busy_timeout makes a blocked connection wait instead of failing.
+
+def _sqlite_pragmas(read_only: bool):
+    def on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(Config.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(Config.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(Config.SQLITE_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+if _SQLITE_PROFILE:
+    event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+    read_engine = create_async_engine(
+        ASYNC_DATABASE_URL,
+        connect_args=connect_args,
+        echo=False,
+        pool_size=Config.SQLITE_READ_POOL_SIZE,
+        max_overflow=0,
+    )
+    event.listen(read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+
+
+class RoutingSession(Session):
+    """
+    Sends reads to `read_engine` and writes to `engine`. Once a session has
+    written (flush, DML, SELECT ... FOR UPDATE) it sticks to `engine` until
+    the transaction ends, so it always reads its own writes; after a commit
+    the read pool sees them too. Raw `text()` SQL can't be told apart, so it
+    is treated as a write.
+    """
+    _sticky = False
+
+    def _read_bind(self):
+        return read_engine
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self._sticky and (
+            self._flushing
+            or isinstance(clause, (UpdateBase, TextClause))
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self._sticky = True
+            _request_wrote.set(True)
+        if self._sticky:
+            return engine.sync_engine
+        return (self._read_bind() or engine).sync_engine
+
+
+@event.listens_for(RoutingSession, "after_commit")
+@event.listens_for(RoutingSession, "after_rollback")
+def _unstick(session: RoutingSession) -> None:
+    # Later reads go back to the read pool instead of opening a transaction
+    # on the single writer connection and holding it
+    session._sticky = False
+
+
+class ReplicaSession(RoutingSession):
+    """RoutingSession that reads from the DB_READ_URL replica unless this request already wrote."""
+
+    def _read_bind(self):
+        if replica_engine is not None and not _request_wrote.get():
+            return replica_engine
+        return read_engine
+
+
+_session_kwargs = dict(
     class_=AsyncSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
+AsyncSessionLocal = async_sessionmaker(bind=engine, sync_session_class=RoutingSession, **_session_kwargs)
+
+# Read-mostly endpoints (lists, details) — may be served by the replica
+ReadSessionLocal = async_sessionmaker(bind=engine, sync_session_class=ReplicaSession, **_session_kwargs)
+
+
+async def dispose_engines() -> None:
+    await engine.dispose()
+    for extra in (read_engine, replica_engine):
+        if extra is not None:
+            await extra.dispose()
+
 
 class Base(DeclarativeBase):
     pass
@@ -1,9 +1,15 @@
 from typing import AsyncGenerator
 from sqlalchemy.ext.asyncio import AsyncSession
 
-from app.database import AsyncSessionLocal
+from app.database import AsyncSessionLocal, ReadSessionLocal
 
 
 async def get_db() -> AsyncGenerator[AsyncSession, None]:
     async with AsyncSessionLocal() as session:
         yield session
+
+
+async def get_read_db() -> AsyncGenerator[AsyncSession, None]:
+    """Session for read-mostly endpoints: reads may go to the DB_READ_URL replica."""
+    async with ReadSessionLocal() as session:
+        yield session
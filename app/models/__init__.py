@@ -1,10 +1,12 @@
 from app.models.app_model import AppModel
+from app.models.deployment import Deployment
 from app.models.error_log import ErrorLog
 from app.models.timestatus_mixin import TimeStatusMixin
 from app.models.users import Users
 
 __models = [
     "AppModel",
+    "Deployment",
     "ErrorLog",
     "Users",
 ]
@@ -1,5 +1,6 @@
 from app.database import Base
 from sqlalchemy import Column, Integer, String, Text, Enum, CheckConstraint, JSON, ForeignKey
+from sqlalchemy.orm import deferred
 from app.models.timestatus_mixin import TimeStatusMixin
 from app.constants import AppStatus
 
@@ -16,8 +17,9 @@ class AppModel(Base, TimeStatusMixin):
     build_path = Column(String, nullable=False, default=".")
     dockerfile_path = Column(String, nullable=False, default="Dockerfile")
     container_port = Column(Integer, unique=False, nullable=False)
-    status = Column(Enum(AppStatus), nullable=False, default=AppStatus.CREATED)
-    env = Column(JSON, nullable=False, default=dict)
+    status = Column(Enum(AppStatus), nullable=False, default=AppStatus.CREATED, index=True)
+    # Can be large — only loaded when asked for with undefer(AppModel.env)
+    env = deferred(Column(JSON, nullable=False, default=dict))
     user_id = Column(ForeignKey("users.id"), nullable=False)
 
     __table_args__ = (
@@ -0,0 +1,39 @@
+from sqlalchemy import Column, Integer, String, Text, Enum, DateTime, ForeignKey, Index
+from datetime import datetime, timezone
+from app.database import Base
+from app.constants import DeploymentStatus, DeployTrigger
+
+# Stage columns recorded per deployment, in pipeline order.
+DEPLOY_STAGES = ("clone", "build", "port", "run", "nginx")
+
+
+class Deployment(Base):
+    __tablename__ = "deployments"
+
+    id = Column(Integer, primary_key=True, index=True, autoincrement=True)
+    app_id = Column(ForeignKey("apps.id", ondelete="CASCADE"), nullable=False)
+    user_id = Column(Integer, nullable=True)
+    trigger = Column(Enum(DeployTrigger), nullable=False, default=DeployTrigger.MANUAL)
+    status = Column(Enum(DeploymentStatus), nullable=False, default=DeploymentStatus.RUNNING)
+    branch = Column(String, nullable=True)
+    commit_sha = Column(String(40), nullable=True)
+    image_tag = Column(String, nullable=True)
+    error_code = Column(String, nullable=True)
+    error_detail = Column(Text, nullable=True)
+
+    # Wall time per stage in milliseconds (NULL = stage not reached)
+    clone_ms = Column(Integer, nullable=True)
+    build_ms = Column(Integer, nullable=True)
+    port_ms = Column(Integer, nullable=True)
+    run_ms = Column(Integer, nullable=True)
+    nginx_ms = Column(Integer, nullable=True)
+    total_ms = Column(Integer, nullable=True)
+
+    started_at = Column(DateTime(timezone=True), default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime(timezone=True), nullable=True)
+
+    __table_args__ = (
+        # Per-app history is always read newest-first
+        Index("ix_deployments_app_id_id", "app_id", "id"),
+        Index("ix_deployments_status_started_at", "status", "started_at"),
+    )
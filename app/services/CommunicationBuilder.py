@@ -1,10 +1,12 @@
 from typing import Dict, Any
-import os
 import smtplib
 from email.mime.text import MIMEText
 from email.mime.multipart import MIMEMultipart
 from fastapi import HTTPException
 
+from app.config import Config
+from app.services.email_outbox import enqueue_email, open_smtp
+
 
 class Template:
     def __init__(self):
@@ -78,29 +80,34 @@ class CommunicationBuilder:
             raise ValueError("Template is required")
         return self.template.build(**self.data)
 
-    def send(self) -> Dict[str, Any]:
-        message = self.build_message()
-        smtp_email = os.environ.get("SMTP_EMAIL")
-        smtp_pass = os.environ.get("SMTP_PASSWORD")
-
-        if not smtp_email or not smtp_pass:
+    def build_email(self) -> MIMEMultipart:
+        if not Config.SMTP_EMAIL:
             raise HTTPException(500, "Email not configured on the server")
 
         subject = _TEMPLATE_SUBJECTS.get(self.template.name, "gitDeploy notification")
 
         email = MIMEMultipart("alternative")
         email["Subject"] = subject
-        email["From"] = smtp_email
+        email["From"] = Config.SMTP_EMAIL
         email["To"] = self.recipient
-        email.attach(MIMEText(message, "html"))
+        email.attach(MIMEText(self.build_message(), "html"))
+        return email
+
+    def send(self) -> Dict[str, Any]:
+        """Send synchronously on a fresh connection. Request handlers should use enqueue()."""
+        email = self.build_email()
 
         try:
-            with smtplib.SMTP_SSL("smtp.gmail.com", 465) as smtp:
-                smtp.login(smtp_email, smtp_pass)
-                smtp.sendmail(smtp_email, self.recipient, email.as_string())
+            with open_smtp() as smtp:
+                smtp.sendmail(Config.SMTP_EMAIL, self.recipient, email.as_string())
         except smtplib.SMTPAuthenticationError:
             raise HTTPException(500, "SMTP auth failed — check your App Password")
         except Exception as e:
             raise HTTPException(500, f"Failed to send email: {str(e)}")
 
-        return {"ok": True, "recipient": self.recipient}
\ No newline at end of file
+        return {"ok": True, "recipient": self.recipient}
+
+    def enqueue(self) -> Dict[str, Any]:
+        """Hand the email to the background outbox and return without touching SMTP."""
+        enqueue_email(self.recipient, self.build_email())
+        return {"ok": True, "recipient": self.recipient, "queued": True}
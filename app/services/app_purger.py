@@ -0,0 +1,142 @@
+"""
+Asynchronous app deletion.
+
+DELETE /apps/delete/{id} only marks the app DELETING and renames its
+workspace and log directories into a trash directory on the same filesystem
+(one atomic rename each, however large the tree), then hands the id to this
+purger and returns 202.
+
+A single background worker then removes the container, images, Nginx
+config and sidecar secrets, deletes the database rows and empties the trash. File removal runs
+under `ionice -c3 nice -n19` when available so it yields disk and CPU to
+running apps and deploys.
+
+On startup apps still marked DELETING are re-queued and leftover trash is
+purged, so a restart mid-delete loses nothing.
+"""
+import asyncio
+import logging
+import os
+import shutil
+import subprocess
+import time
+from pathlib import Path
+from typing import Optional
+
+from sqlalchemy import delete, select
+
+from app.config import Config
+from app.constants import AppStatus
+from app.database import AsyncSessionLocal
+from app.models import AppModel, Deployment
+from app.services.nginx_manager import remove_app_confs
+from app.services.secrets_client import delete_secrets
+from app.services.teardown import remove_docker_artifacts
+
+logger = logging.getLogger(__name__)
+
+_TRASH = ".trash"
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+
+
+def _trash_dirs():
+    return Path(Config.BASE_APPS_DIR) / _TRASH, Path(Config.BASE_LOGS_DIR) / _TRASH
+
+
+def move_to_trash(app_id: int) -> None:
+    """Rename app-{id} (workspace and logs) into the trash. Blocking but O(1) per directory."""
+    apps_trash, logs_trash = _trash_dirs()
+    for base, trash in ((Path(Config.BASE_APPS_DIR), apps_trash), (Path(Config.BASE_LOGS_DIR), logs_trash)):
+        src = base / f"app-{app_id}"
+        if src.exists():
+            trash.mkdir(parents=True, exist_ok=True)
+            os.rename(src, trash / f"app-{app_id}-{time.time_ns()}")
+
+
+def _remove_tree(path: Path) -> None:
+    if Config.PURGE_LOW_PRIORITY and shutil.which("ionice") and shutil.which("nice"):
+        result = subprocess.run(
+            ["ionice", "-c3", "nice", "-n19", "rm", "-rf", "--", str(path)],
+            capture_output=True, text=True,
+        )
+        if result.returncode == 0:
+            return
+        logger.warning("Low-priority purge of %s failed (%s) — falling back to rmtree", path, result.stderr.strip())
+    shutil.rmtree(path, ignore_errors=True)
+
+
+def _empty_trash() -> None:
+    for trash in _trash_dirs():
+        if trash.exists():
+            for entry in trash.iterdir():
+                _remove_tree(entry)
+
+
+async def _purge_app(app_id: int) -> None:
+    # Again here: a deploy in flight during the delete may have re-created the workspace or log dir
+    await asyncio.to_thread(move_to_trash, app_id)
+    await asyncio.to_thread(remove_docker_artifacts, app_id)
+    await remove_app_confs([app_id])
+
+    async with AsyncSessionLocal() as db:
+        await db.execute(delete(Deployment).where(Deployment.app_id == app_id))
+        # Whatever the status now: a deploy that was in flight may have overwritten DELETING
+        await db.execute(delete(AppModel).where(AppModel.id == app_id))
+        await db.commit()
+
+    await delete_secrets([app_id])
+    await asyncio.to_thread(_empty_trash)
+    logger.info("App %s purged.", app_id)
+
+
+async def _worker_loop() -> None:
+    try:
+        await asyncio.to_thread(_empty_trash)
+    except Exception as e:
+        logger.warning("Initial trash purge failed: %s", e)
+
+    while True:
+        app_id = await _queue.get()
+        try:
+            await _purge_app(app_id)
+        except Exception as e:
+            # Stays DELETING — retried on the next delete request or restart
+            logger.error("Purge failed for app %s: %s", app_id, e)
+        finally:
+            _queue.task_done()
+
+
+def enqueue_purge(app_id: int) -> None:
+    if _queue is None:
+        logger.warning("App purger not running — app %s will be purged on next start", app_id)
+        return
+    _queue.put_nowait(app_id)
+
+
+async def start_app_purger() -> None:
+    global _queue, _worker
+    if _worker is not None:
+        return
+    _queue = asyncio.Queue()
+    async with AsyncSessionLocal() as db:
+        result = await db.execute(select(AppModel.id).where(AppModel.status == AppStatus.DELETING))
+        pending = [row[0] for row in result.all()]
+    for app_id in pending:
+        _queue.put_nowait(app_id)
+    if pending:
+        logger.info("Resuming purge of %d app(s) left in DELETING", len(pending))
+    _worker = asyncio.create_task(_worker_loop())
+
+
+async def stop_app_purger() -> None:
+    global _queue, _worker
+    if _worker is None:
+        return
+    _worker.cancel()
+    try:
+        await _worker
+    except (asyncio.CancelledError, Exception):
+        pass
+    _queue = _worker = None
@@ -1,3 +1,4 @@
+import time
 from datetime import datetime, timedelta, timezone
 
 from fastapi import Depends, HTTPException
@@ -10,7 +11,9 @@ from app.config import Config
 from app.dependencies import get_db
 from app.models.users import Users
 from app.constants import UserRoles
-from app.utils import verify_password
+from app.utils import verify_password_async
+from app.services.cache import LRUTTLCache
+from app.services.redis_service import redis_publish, redis_subscribe
 
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="/api/v1/auth/login")
 
@@ -45,15 +48,45 @@ def decode_token(token: str) -> dict:
 async def authenticate_user(email: str, password: str, db: AsyncSession) -> Users:
     result = await db.execute(select(Users).where(Users.email == email))
     user = result.scalar_one_or_none()
-    if not user or not verify_password(password, user.hashed_password):
+    if not user or not await verify_password_async(password, user.hashed_password):
         raise HTTPException(status_code=401, detail="Invalid email or password")
     return user
 
 
+# ── Verified-token cache ──────────────────────────────────────────────────────
+# token → snapshot of the user's columns, so repeat requests with the same
+# access token skip both JWT verification and the users lookup. Entries live
+# at most AUTH_CACHE_TTL seconds (and never past the token's own expiry), and
+# are dropped on every worker when the user changes (see invalidate_user_cache).
+
+_AUTH_INVALIDATE_CHANNEL = "auth:invalidate"
+_token_cache = LRUTTLCache(max_entries=Config.AUTH_CACHE_MAX_ENTRIES)
+_USER_COLUMNS = [c.key for c in Users.__table__.columns]
+
+
+def _drop_user_entries(user_id: str | int) -> None:
+    _token_cache.delete_where(lambda snapshot: snapshot["id"] == int(user_id))
+
+
+async def invalidate_user_cache(user_id: int) -> None:
+    """Call after changing or deleting a user. Local drop plus broadcast to other workers."""
+    _drop_user_entries(user_id)
+    await redis_publish(_AUTH_INVALIDATE_CHANNEL, str(user_id))
+
+
+def start_auth_cache_listener() -> None:
+    redis_subscribe(_AUTH_INVALIDATE_CHANNEL, _drop_user_entries)
+
+
 async def get_current_user(
     token: str = Depends(oauth2_bearer),
     db: AsyncSession = Depends(get_db),
 ) -> Users:
+    snapshot = _token_cache.get(token)
+    if snapshot is not None:
+        # Fresh transient instance per request — never share ORM state across sessions
+        return Users(**snapshot)
+
     payload = decode_token(token)
     if payload.get("type") != "access":
         raise HTTPException(status_code=401, detail="Invalid token type")
@@ -64,6 +97,9 @@ async def get_current_user(
     user = result.scalar_one_or_none()
     if not user:
         raise HTTPException(status_code=401, detail="User not found")
+
+    ttl = min(Config.AUTH_CACHE_TTL, payload.get("exp", 0) - time.time())
+    _token_cache.set(token, {key: getattr(user, key) for key in _USER_COLUMNS}, ttl)
     return user
 
 
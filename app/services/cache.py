@@ -0,0 +1,125 @@
+"""
+In-process caches.
+
+LRUTTLCache — bounded LRU with a per-entry expiry.
+
+SingleFlightCache — concurrent callers asking for the same missing/expired
+key share one in-flight computation instead of each running it. With
+`serve_stale=True` an expired value is returned immediately while one
+background refresh runs.
+
+Values live per process; use Redis (redis_service) when they must be shared
+across workers.
+"""
+import asyncio
+import functools
+import logging
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Hashable, Optional, Set, Tuple
+
+logger = logging.getLogger(__name__)
+
+
+class LRUTTLCache:
+    """Bounded LRU with per-entry TTL. Not thread-safe — use from the event loop only."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self._data: "OrderedDict[Hashable, Tuple[float, Any]]" = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            del self._data[key]
+            return None
+        self._data.move_to_end(key)
+        return entry[1]
+
+    def set(self, key: Hashable, value: Any, ttl: float) -> None:
+        if ttl <= 0:
+            return
+        self._data[key] = (time.monotonic() + ttl, value)
+        self._data.move_to_end(key)
+        while len(self._data) > self.max_entries:
+            self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        self._data.pop(key, None)
+
+    def delete_where(self, predicate: Callable[[Any], bool]) -> int:
+        """Drop every entry whose value matches; returns how many were removed."""
+        stale = [k for k, (_, v) in self._data.items() if predicate(v)]
+        for k in stale:
+            del self._data[k]
+        return len(stale)
+
+    def clear(self) -> None:
+        self._data.clear()
+
+
+class SingleFlightCache:
+    def __init__(self, ttl: float):
+        self.ttl = ttl
+        self._values: Dict[Hashable, Tuple[float, Any]] = {}
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self._background: Set[asyncio.Task] = set()
+
+    def peek(self, key: Hashable) -> Optional[Any]:
+        entry = self._values.get(key)
+        if entry is not None and entry[0] > time.monotonic():
+            return entry[1]
+        return None
+
+    def invalidate(self, key: Optional[Hashable] = None) -> None:
+        if key is None:
+            self._values.clear()
+        else:
+            self._values.pop(key, None)
+
+    async def get_or_load(
+        self,
+        key: Hashable,
+        loader: Callable[[], Awaitable[Any]],
+        serve_stale: bool = False,
+    ) -> Any:
+        entry = self._values.get(key)
+        if entry is not None:
+            if entry[0] > time.monotonic():
+                return entry[1]
+            if serve_stale:
+                if key not in self._inflight:
+                    self._start(key, loader).add_done_callback(functools.partial(self._log_refresh_failure, key))
+                return entry[1]
+
+        task = self._inflight.get(key)
+        if task is None:
+            task = self._start(key, loader)
+        # The load runs in its own task; shield so a cancelled caller (client disconnect)
+        # neither cancels it nor fails the other callers waiting on it.
+        return await asyncio.shield(task)
+
+    def _start(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> asyncio.Task:
+        task = asyncio.create_task(self._load(key, loader))
+        self._inflight[key] = task
+        self._background.add(task)
+        task.add_done_callback(self._background.discard)
+        return task
+
+    @staticmethod
+    def _log_refresh_failure(key: Hashable, task: asyncio.Task) -> None:
+        if not task.cancelled() and task.exception() is not None:
+            logger.warning("Background cache refresh failed for %r: %s", key, task.exception())
+
+    async def _load(self, key: Hashable, loader: Callable[[], Awaitable[Any]]) -> Any:
+        try:
+            value = await loader()
+            self._values[key] = (time.monotonic() + self.ttl, value)
+            return value
+        finally:
+            self._inflight.pop(key, None)
@@ -0,0 +1,262 @@
+"""
+Container runtime logs — tail and follow Docker's json-file logs directly.
+
+Containers run with the json-file driver and size-based rotation
+(with_log_config): the live file is <LogPath>, older ones <LogPath>.1,
+<LogPath>.2, ... Each line is one JSON object:
+
+    {"log": "listening on :8080\n", "stream": "stdout", "time": "2024-05-01T10:00:00.123456789Z"}
+
+read_tail() answers `tail` / `since` by reading fixed-size blocks backwards
+from the end of the live file, then of .1, .2, ..., and stops as soon as it
+has enough lines (or reaches entries older than `since`). Its cost depends on
+the lines returned, not on the size of the logs.
+
+LogFollower then keeps the live file open at the offset where the tail ended
+and reads whatever is appended. When Docker rotates, the open handle still
+points at the renamed file, so it is drained before switching to the new one.
+"""
+import asyncio
+import json
+import logging
+import os
+import re
+import subprocess
+import time
+from datetime import datetime
+from pathlib import Path
+from typing import AsyncIterator, Awaitable, Callable, Iterator, List, Optional, Tuple
+
+from app.config import Config
+from app.services.metrics import instrumented_run
+
+logger = logging.getLogger(__name__)
+
+BLOCK_SIZE = 64 * 1024
+# Upper bound on bytes read per follow poll, so a chatty container can't stall a stream
+_FOLLOW_READ_MAX = 1024 * 1024
+
+_TIME_RE = re.compile(r"^(\d{4}-\d\d-\d\dT\d\d:\d\d:\d\d)(?:\.(\d+))?(Z|[+-]\d\d:\d\d)?$")
+_DURATION_RE = re.compile(r"^(\d+(?:\.\d+)?)([smhd])$")
+_DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400}
+
+
+def _container_log_path(app_id: int) -> Optional[Path]:
+    try:
+        result = instrumented_run(
+            "docker", "inspect",
+            ["docker", "inspect", "--format", "{{.LogPath}}", f"app_{app_id}_container"],
+            capture_output=True, text=True, check=True,
+        )
+    except subprocess.CalledProcessError:
+        return None
+    path = result.stdout.strip()
+    return Path(path) if path else None
+
+
+async def container_log_path(app_id: int) -> Optional[Path]:
+    """Host path of the container's json-file log, or None if there is no container (or no file logging)."""
+    return await asyncio.to_thread(_container_log_path, app_id)
+
+
+def parse_time(value: str) -> float:
+    """
+    Epoch seconds from an RFC 3339 timestamp. Docker writes nanosecond
+    fractions of varying length, so timestamps are compared as numbers,
+    never as strings. Naive timestamps are taken as UTC.
+    """
+    match = _TIME_RE.match(value.strip())
+    if not match:
+        raise ValueError(f"Invalid timestamp: {value!r}")
+    base, fraction, tz = match.groups()
+    if not tz or tz == "Z":
+        tz = "+00:00"
+    seconds = datetime.fromisoformat(base + tz).timestamp()
+    return seconds + (float(f"0.{fraction}") if fraction else 0.0)
+
+
+def parse_since(value: Optional[str]) -> Optional[float]:
+    """`since` as epoch seconds, an RFC 3339 timestamp or a relative duration ("90s", "10m", "2h", "1d")."""
+    if not value:
+        return None
+    value = value.strip()
+    match = _DURATION_RE.match(value)
+    if match:
+        return time.time() - float(match.group(1)) * _DURATION_UNITS[match.group(2)]
+    try:
+        return float(value)
+    except ValueError:
+        return parse_time(value)
+
+
+def _parse_line(raw: bytes) -> Optional[dict]:
+    try:
+        record = json.loads(raw)
+        return {
+            "time": record["time"],
+            "stream": record.get("stream", "stdout"),
+            "message": record.get("log", "").rstrip("\n"),
+        }
+    except (ValueError, KeyError, TypeError):
+        return None
+
+
+def _complete_end(f, size: int) -> int:
+    """Offset just past the last newline — a line still being written is left for the follower."""
+    pos = size
+    while pos > 0:
+        start = max(0, pos - BLOCK_SIZE)
+        f.seek(start)
+        newline = f.read(pos - start).rfind(b"\n")
+        if newline >= 0:
+            return start + newline + 1
+        pos = start
+    return 0
+
+
+def _lines_backwards(f, end: int) -> Iterator[bytes]:
+    """Lines of f[0:end] from last to first, reading BLOCK_SIZE blocks backwards."""
+    pos, rest = end, b""
+    while pos > 0:
+        size = min(BLOCK_SIZE, pos)
+        pos -= size
+        f.seek(pos)
+        lines = (f.read(size) + rest).split(b"\n")
+        rest = lines[0]
+        for line in reversed(lines[1:]):
+            if line:
+                yield line
+    if rest:
+        yield rest
+
+
+def _rotated_files(path: Path) -> Iterator[Path]:
+    """path, path.1, path.2, ... — newest first, as long as they exist."""
+    yield path
+    n = 1
+    while True:
+        rotated = path.with_name(f"{path.name}.{n}")
+        if not rotated.exists():
+            return
+        yield rotated
+        n += 1
+
+
+def read_tail(path: Path, lines: int, since: Optional[float] = None) -> Tuple[List[dict], int]:
+    """
+    The last `lines` entries (oldest first) newer than `since`, across the
+    rotated files. Also returns the offset in `path` to follow from.
+    """
+    entries: List[dict] = []
+    offset = 0
+    for n, file_path in enumerate(_rotated_files(path)):
+        try:
+            f = open(file_path, "rb")
+        except FileNotFoundError:
+            continue  # rotated away between listing and opening
+        with f:
+            end = _complete_end(f, os.fstat(f.fileno()).st_size)
+            if n == 0:
+                offset = end
+            for raw in _lines_backwards(f, end):
+                if len(entries) >= lines:
+                    return entries[::-1], offset
+                entry = _parse_line(raw)
+                if entry is None:
+                    continue
+                if since is not None and parse_time(entry["time"]) < since:
+                    return entries[::-1], offset
+                entries.append(entry)
+        if len(entries) >= lines:
+            break
+    return entries[::-1], offset
+
+
+class LogFollower:
+    """Reads lines appended to a json-file log from a given offset, across rotations."""
+
+    def __init__(self, path: Path, offset: int):
+        self._path = path
+        self._file = open(path, "rb")
+        self._file.seek(offset)
+        self._partial = b""
+
+    def _drain(self) -> Tuple[List[dict], bool]:
+        data = self._file.read(_FOLLOW_READ_MAX)
+        if not data:
+            return [], False
+        lines = (self._partial + data).split(b"\n")
+        self._partial = lines.pop()
+        return [e for e in map(_parse_line, lines) if e is not None], len(data) == _FOLLOW_READ_MAX
+
+    def poll(self) -> Tuple[List[dict], bool, bool]:
+        """New entries, whether more data is already waiting, and whether the log still exists."""
+        entries, more = self._drain()
+        if more:
+            return entries, True, True
+        if os.fstat(self._file.fileno()).st_size < self._file.tell():
+            self._file.seek(0)  # truncated in place
+            self._partial = b""
+        try:
+            current = os.stat(self._path).st_ino
+        except FileNotFoundError:
+            return entries, False, False  # container removed
+        if current != os.fstat(self._file.fileno()).st_ino:
+            # Rotated: Docker may have appended to the old file after the drain above
+            # and before renaming it, so read it to EOF before switching to the new one
+            while True:
+                tail, more = self._drain()
+                entries += tail
+                if not more:
+                    break
+            if self._partial:
+                entry = _parse_line(self._partial)
+                if entry is not None:
+                    entries.append(entry)
+            self._file.close()
+            self._file = open(self._path, "rb")
+            self._partial = b""
+            return entries, True, True
+        return entries, False, True
+
+    def close(self) -> None:
+        self._file.close()
+
+
+def _sse(entry: dict) -> bytes:
+    return f"data: {json.dumps(entry)}\n\n".encode()
+
+
+async def follow_events(
+    path: Path,
+    backlog: List[dict],
+    offset: int,
+    is_disconnected: Callable[[], Awaitable[bool]],
+) -> AsyncIterator[bytes]:
+    """
+    Server-sent events: the tail first, then appended lines until the client
+    disconnects or the container is removed (an `end` event). A comment line
+    is sent every LOG_FOLLOW_HEARTBEAT seconds of silence to keep proxies from
+    closing the connection.
+    """
+    for entry in backlog:
+        yield _sse(entry)
+    follower = await asyncio.to_thread(LogFollower, path, offset)
+    try:
+        last_sent = time.monotonic()
+        while not await is_disconnected():
+            entries, more, alive = await asyncio.to_thread(follower.poll)
+            if entries:
+                yield b"".join(_sse(e) for e in entries)
+                last_sent = time.monotonic()
+            if not alive:
+                yield b"event: end\ndata: {}\n\n"
+                return
+            if more:
+                continue
+            if time.monotonic() - last_sent >= Config.LOG_FOLLOW_HEARTBEAT:
+                yield b": keep-alive\n\n"
+                last_sent = time.monotonic()
+            await asyncio.sleep(Config.LOG_FOLLOW_POLL_INTERVAL)
+    finally:
+        follower.close()
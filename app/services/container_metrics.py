@@ -0,0 +1,213 @@
+"""
+Per-container resource metrics — background collector with in-memory ring buffers.
+
+One `docker stats --no-stream` call per interval samples CPU, memory, network
+and block I/O for every running container; rows for `app_{id}_container` are
+appended to a fixed-size, array-backed ring buffer per app. API reads never
+touch Docker — they only slice the buffers.
+
+History is per process and lost on restart; it is meant for "what is eating
+the host right now", not long-term retention.
+"""
+import asyncio
+import json
+import logging
+import re
+import time
+from array import array
+from typing import Dict, List, Optional
+
+from app.config import Config
+from app.services.metrics import instrumented_run
+
+logger = logging.getLogger(__name__)
+
+_CONTAINER_RE = re.compile(r"^app_(\d+)_container$")
+_SIZE_RE = re.compile(r"^\s*([\d.]+)\s*([a-zA-Z]*)\s*$")
+_UNITS = {
+    "b": 1,
+    "kb": 1000, "mb": 1000 ** 2, "gb": 1000 ** 3, "tb": 1000 ** 4,
+    "kib": 1024, "mib": 1024 ** 2, "gib": 1024 ** 3, "tib": 1024 ** 4,
+}
+
+FIELDS = ("ts", "cpu_percent", "mem_bytes", "mem_limit_bytes", "net_rx_bytes", "net_tx_bytes",
+          "block_read_bytes", "block_write_bytes")
+
+
+def _parse_size(text: str) -> float:
+    match = _SIZE_RE.match(text or "")
+    if not match:
+        return 0.0
+    number, unit = match.groups()
+    return float(number) * _UNITS.get(unit.lower() or "b", 1)
+
+
+def _parse_pair(text: str) -> tuple[float, float]:
+    """Parse docker's 'used / total' columns ("12MiB / 512MiB")."""
+    left, _, right = (text or "").partition("/")
+    return _parse_size(left), _parse_size(right)
+
+
+def _parse_percent(text: str) -> float:
+    try:
+        return float((text or "0").rstrip("%"))
+    except ValueError:
+        return 0.0
+
+
+class MetricRing:
+    """Fixed-capacity ring buffer with one float array per field (no per-sample objects)."""
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._columns = {field: array("d", bytes(8 * capacity)) for field in FIELDS}
+        self._head = 0    # next write position
+        self._size = 0
+
+    def __len__(self) -> int:
+        return self._size
+
+    def append(self, sample: Dict[str, float]) -> None:
+        for field in FIELDS:
+            self._columns[field][self._head] = sample[field]
+        self._head = (self._head + 1) % self.capacity
+        self._size = min(self._size + 1, self.capacity)
+
+    def latest(self) -> Optional[Dict[str, float]]:
+        if not self._size:
+            return None
+        idx = (self._head - 1) % self.capacity
+        return {field: col[idx] for field, col in self._columns.items()}
+
+    def since(self, cutoff: float) -> List[Dict[str, float]]:
+        """Samples with ts >= cutoff, oldest first."""
+        out: List[Dict[str, float]] = []
+        ts = self._columns["ts"]
+        # Walk newest → oldest and stop at the first sample outside the window
+        for back in range(1, self._size + 1):
+            idx = (self._head - back) % self.capacity
+            if ts[idx] < cutoff:
+                break
+            out.append({field: col[idx] for field, col in self._columns.items()})
+        out.reverse()
+        return out
+
+
+_buffers: Dict[int, MetricRing] = {}
+_task: Optional[asyncio.Task] = None
+
+
+def _sample_all() -> Dict[int, Dict[str, float]]:
+    """Run one batched `docker stats` call and return samples keyed by app id."""
+    result = instrumented_run(
+        "docker", "stats",
+        ["docker", "stats", "--no-stream", "--no-trunc", "--format", "{{json .}}"],
+        capture_output=True,
+        text=True,
+        timeout=30,
+    )
+    if result.returncode != 0:
+        logger.warning("docker stats failed: %s", result.stderr.strip())
+        return {}
+
+    now = time.time()
+    samples: Dict[int, Dict[str, float]] = {}
+    for line in result.stdout.splitlines():
+        try:
+            row = json.loads(line)
+        except ValueError:
+            continue
+        match = _CONTAINER_RE.match(row.get("Name", ""))
+        if not match:
+            continue
+        mem_used, mem_limit = _parse_pair(row.get("MemUsage", ""))
+        net_rx, net_tx = _parse_pair(row.get("NetIO", ""))
+        blk_read, blk_write = _parse_pair(row.get("BlockIO", ""))
+        samples[int(match.group(1))] = {
+            "ts": now,
+            "cpu_percent": _parse_percent(row.get("CPUPerc", "")),
+            "mem_bytes": mem_used,
+            "mem_limit_bytes": mem_limit,
+            "net_rx_bytes": net_rx,
+            "net_tx_bytes": net_tx,
+            "block_read_bytes": blk_read,
+            "block_write_bytes": blk_write,
+        }
+    return samples
+
+
+def _record(samples: Dict[int, Dict[str, float]]) -> None:
+    for app_id, sample in samples.items():
+        ring = _buffers.get(app_id)
+        if ring is None:
+            ring = _buffers[app_id] = MetricRing(Config.CONTAINER_METRICS_SAMPLES)
+        ring.append(sample)
+
+    # Drop buffers for containers that have been gone for a full buffer's worth of time
+    horizon = time.time() - Config.CONTAINER_METRICS_INTERVAL * Config.CONTAINER_METRICS_SAMPLES
+    for app_id in [a for a, ring in _buffers.items() if a not in samples and ring.latest()["ts"] < horizon]:
+        del _buffers[app_id]
+
+
+async def _collector_loop() -> None:
+    interval = Config.CONTAINER_METRICS_INTERVAL
+    while True:
+        try:
+            _record(await asyncio.to_thread(_sample_all))
+        except asyncio.CancelledError:
+            raise
+        except FileNotFoundError:
+            logger.warning("docker binary not found — container metrics collector stopped.")
+            return
+        except Exception as e:
+            logger.warning("Container metrics sample failed: %s", e)
+        await asyncio.sleep(interval)
+
+
+def start_container_metrics() -> None:
+    global _task
+    if _task is None:
+        _task = asyncio.create_task(_collector_loop())
+        logger.info("Container metrics collector started (every %ss).", Config.CONTAINER_METRICS_INTERVAL)
+
+
+async def stop_container_metrics() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _task = None
+
+
+# ── Read API (memory only) ────────────────────────────────────────────────────
+
+def get_app_metrics(app_id: int, window: int) -> dict:
+    ring = _buffers.get(app_id)
+    samples = ring.since(time.time() - window) if ring else []
+
+    summary = {}
+    if samples:
+        for field in ("cpu_percent", "mem_bytes"):
+            values = [s[field] for s in samples]
+            summary[field] = {"avg": round(sum(values) / len(values), 2), "max": max(values)}
+
+    return {
+        "app_id": app_id,
+        "window_seconds": window,
+        "interval_seconds": Config.CONTAINER_METRICS_INTERVAL,
+        "summary": summary,
+        "samples": samples,
+    }
+
+
+def get_top_apps(by: str, limit: int) -> List[dict]:
+    latest = []
+    for app_id, ring in _buffers.items():
+        sample = ring.latest()
+        if sample is not None:
+            latest.append({"app_id": app_id, **sample})
+    latest.sort(key=lambda s: s[by], reverse=True)
+    return latest[:limit]
@@ -1,4 +1,3 @@
-import subprocess
 import requests
 import logging
 from urllib.parse import urlparse
@@ -14,6 +13,8 @@ from app.Errors import (InvalidRepoURLError,
                         GitPullError,
                         GitBranchNotFoundError,
                         )
+from app.config import Config
+from app.services.metrics import instrumented_run
 
 logger = logging.getLogger(__name__)
 
@@ -73,7 +74,8 @@ def clone_or_pull_repo(repo_url: str, app_dir: Path, **kwargs) -> None:
 
     if not git_dir.exists():
         logger.info("Executing: git clone %s .", repo_url)
-        result = subprocess.run(
+        result = instrumented_run(
+            "git", "clone",
             ["git", "clone", repo_url, "."],
             cwd=app_dir,
             capture_output=True,
@@ -84,7 +86,8 @@ def clone_or_pull_repo(repo_url: str, app_dir: Path, **kwargs) -> None:
             raise GitCloneError(detail=result.stderr.strip(), context=repo_url)
     else:
         logger.info("Executing: git pull in %s", app_dir)
-        result = subprocess.run(
+        result = instrumented_run(
+            "git", "pull",
             ["git", "pull"],
             cwd=app_dir,
             capture_output=True,
@@ -94,18 +97,68 @@ def clone_or_pull_repo(repo_url: str, app_dir: Path, **kwargs) -> None:
             logger.error("Git Pull failed with exit code %s. Error: %s", result.returncode, result.stderr)
             raise GitPullError(detail=result.stderr.strip(), context=repo_url)
 
-    if kwargs.get("env"):
-        env_vars = kwargs["env"]
-        with open(app_dir / ".env", "w") as env_file:
-            for key, value in env_vars.items():
-                env_file.write(f"{key}={value}\n")
-        logger.info("Env variable written in .env file.")
+    # Containers get their env from docker_run's --env-file; the repo's .env is
+    # only kept for apps that opt in, and left untouched when it hasn't changed
+    # so env-only deploys don't dirty the build context. Otherwise a .env left
+    # by earlier deploys (plaintext secrets in the workspace and build context)
+    # is removed.
+    if Config.DEPLOY_WRITE_DOTENV:
+        if kwargs.get("env"):
+            write_dotenv(app_dir, kwargs["env"])
+    else:
+        remove_written_dotenv(app_dir)
     logger.info("Git operation finished successfully for %s", repo_url)
 
 
+def write_dotenv(app_dir: Path, env_vars: dict) -> bool:
+    """Write app_dir/.env if its content would change. Returns True if written."""
+    content = "".join(f"{key}={value}\n" for key, value in env_vars.items())
+    dotenv = app_dir / ".env"
+    try:
+        if dotenv.read_text() == content:
+            logger.info(".env unchanged, not rewritten.")
+            return False
+    except FileNotFoundError:
+        pass
+    dotenv.write_text(content)
+    logger.info("Env variable written in .env file.")
+    return True
+
+
+def remove_written_dotenv(app_dir: Path) -> None:
+    """
+    Undo the .env earlier deploys wrote: delete it if git doesn't track it,
+    or restore the committed version if the repo has its own .env.
+    """
+    dotenv = app_dir / ".env"
+    if not dotenv.exists():
+        return
+    tracked = instrumented_run(
+        "git", "ls-files",
+        ["git", "ls-files", "--error-unmatch", ".env"],
+        cwd=app_dir,
+        capture_output=True,
+        text=True
+    ).returncode == 0
+    if not tracked:
+        dotenv.unlink()
+        logger.info("Removed .env left by an earlier deploy.")
+        return
+    result = instrumented_run(
+        "git", "checkout",
+        ["git", "checkout", "--", ".env"],
+        cwd=app_dir,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        logger.warning("Could not restore the repo's .env in %s: %s", app_dir, result.stderr.strip())
+
+
 def switch_to_branch(branch: str, app_dir: Path) -> None:
     logger.info("Switching to branch %s", branch)
-    result = subprocess.run(
+    result = instrumented_run(
+        "git", "checkout",
         ["git", "checkout", branch],
         cwd=app_dir,
         capture_output=True,
@@ -114,4 +167,19 @@ def switch_to_branch(branch: str, app_dir: Path) -> None:
     if result.returncode != 0:
         logger.error("Failed to switch to branch %s: %s", branch, result.stderr)
         raise GitBranchNotFoundError(detail=result.stderr.strip(), context=branch)
-    logger.info("Branch %s switched successfully", branch)
\ No newline at end of file
+    logger.info("Branch %s switched successfully", branch)
+
+
+def get_head_commit(app_dir: Path) -> str | None:
+    """Return the full SHA of HEAD in app_dir, or None if it cannot be read."""
+    result = instrumented_run(
+        "git", "rev-parse",
+        ["git", "rev-parse", "HEAD"],
+        cwd=app_dir,
+        capture_output=True,
+        text=True
+    )
+    if result.returncode != 0:
+        logger.warning("Could not resolve HEAD in %s: %s", app_dir, result.stderr.strip())
+        return None
+    return result.stdout.strip()
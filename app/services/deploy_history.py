@@ -0,0 +1,165 @@
+"""
+Deployment history — records one `deployments` row per deploy with the
+wall time spent in each pipeline stage (clone, build, port, run, nginx).
+
+The row is committed as RUNNING when the deploy starts, so in-flight deploys
+show up in history, and finalised as SUCCEEDED/FAILED when it ends.
+"""
+import logging
+import math
+import time
+from contextlib import contextmanager
+from datetime import datetime, timedelta, timezone
+from typing import Dict, Iterator, List, Optional
+
+from sqlalchemy import select
+from sqlalchemy.ext.asyncio import AsyncSession
+
+from app.constants import DeploymentStatus, DeployTrigger
+from app.models import AppModel, Deployment
+from app.models.deployment import DEPLOY_STAGES
+from app.Errors import AppBaseError
+from app.services.metrics import DEPLOYS, DEPLOY_STAGE_SECONDS
+
+logger = logging.getLogger(__name__)
+
+# Upper bound on rows pulled into memory for percentile aggregation
+_STATS_MAX_ROWS = 5000
+
+
+class StageTimer:
+    """Collects wall-clock durations (ms) for named deploy stages."""
+
+    def __init__(self):
+        self._started = time.perf_counter()
+        self.durations: Dict[str, int] = {}
+
+    @contextmanager
+    def stage(self, name: str) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            elapsed = time.perf_counter() - start
+            self.durations[name] = int(elapsed * 1000)
+            DEPLOY_STAGE_SECONDS.observe(elapsed, name)
+
+    def total_ms(self) -> int:
+        return int((time.perf_counter() - self._started) * 1000)
+
+
+async def start_deployment(
+    db: AsyncSession,
+    app: AppModel,
+    trigger: DeployTrigger = DeployTrigger.MANUAL,
+    user_id: Optional[int] = None,
+) -> Deployment:
+    deployment = Deployment(
+        app_id=app.id,
+        user_id=user_id,
+        trigger=trigger,
+        status=DeploymentStatus.RUNNING,
+        branch=app.branch,
+    )
+    db.add(deployment)
+    await db.commit()
+    return deployment
+
+
+async def finish_deployment(
+    db: AsyncSession,
+    deployment: Deployment,
+    timer: StageTimer,
+    error: Optional[Exception] = None,
+) -> None:
+    """Write stage timings and outcome. Never raises — history must not mask the deploy result."""
+    try:
+        for stage in DEPLOY_STAGES:
+            if stage in timer.durations:
+                setattr(deployment, f"{stage}_ms", timer.durations[stage])
+        deployment.total_ms = timer.total_ms()
+        deployment.finished_at = datetime.now(timezone.utc)
+
+        if error is None:
+            deployment.status = DeploymentStatus.SUCCEEDED
+        else:
+            deployment.status = DeploymentStatus.FAILED
+            if isinstance(error, AppBaseError):
+                deployment.error_code = str(error.error_code)
+                deployment.error_detail = error.detail
+            else:
+                deployment.error_code = type(error).__name__
+                deployment.error_detail = str(error)
+        DEPLOYS.inc(deployment.status.value)
+        await db.commit()
+    except Exception as exc:
+        logger.error("Failed to record deployment %s: %s", deployment.id, exc)
+
+
+def serialize_deployment(d: Deployment) -> dict:
+    return {
+        "id": d.id,
+        "app_id": d.app_id,
+        "trigger": d.trigger.value,
+        "status": d.status.value,
+        "branch": d.branch,
+        "commit_sha": d.commit_sha,
+        "image_tag": d.image_tag,
+        "error_code": d.error_code,
+        "stages_ms": {stage: getattr(d, f"{stage}_ms") for stage in DEPLOY_STAGES},
+        "total_ms": d.total_ms,
+        "started_at": d.started_at.isoformat() if d.started_at else None,
+        "finished_at": d.finished_at.isoformat() if d.finished_at else None,
+    }
+
+
+def _percentile(sorted_values: List[int], pct: float) -> Optional[int]:
+    """Nearest-rank percentile over an already sorted list."""
+    if not sorted_values:
+        return None
+    rank = max(0, math.ceil(pct / 100 * len(sorted_values)) - 1)
+    return sorted_values[rank]
+
+
+async def get_stage_percentiles(db: AsyncSession, days: int = 7) -> dict:
+    """p50/p95 wall time per stage over finished deployments in the last `days` days."""
+    since = datetime.now(timezone.utc) - timedelta(days=days)
+    stage_columns = [getattr(Deployment, f"{stage}_ms") for stage in DEPLOY_STAGES]
+
+    result = await db.execute(
+        select(Deployment.status, Deployment.total_ms, *stage_columns)
+        .where(Deployment.status != DeploymentStatus.RUNNING)
+        .where(Deployment.started_at >= since)
+        .order_by(Deployment.id.desc())
+        .limit(_STATS_MAX_ROWS)
+    )
+    rows = result.all()
+
+    samples: Dict[str, List[int]] = {stage: [] for stage in (*DEPLOY_STAGES, "total")}
+    failed = 0
+    for row in rows:
+        if row[0] == DeploymentStatus.FAILED:
+            failed += 1
+            continue
+        if row[1] is not None:
+            samples["total"].append(row[1])
+        for stage, value in zip(DEPLOY_STAGES, row[2:]):
+            if value is not None:
+                samples[stage].append(value)
+
+    stages = {}
+    for stage, values in samples.items():
+        values.sort()
+        stages[stage] = {
+            "count": len(values),
+            "p50_ms": _percentile(values, 50),
+            "p95_ms": _percentile(values, 95),
+            "max_ms": values[-1] if values else None,
+        }
+
+    return {
+        "window_days": days,
+        "deployments": len(rows),
+        "failed": failed,
+        "stages": stages,
+    }
@@ -1,7 +1,12 @@
 import logging
+import os
 import subprocess
+import tempfile
 import time
+from contextlib import contextmanager
 from pathlib import Path
+from typing import Dict, Iterator, Optional
+from app.config import Config
 from app.models import AppModel
 from app.Errors import (DockerRunError,
                         DockerBuildError,
@@ -12,6 +17,7 @@ from app.Errors import (DockerRunError,
                         )
 from app.services.deploy import switch_to_branch
 from app.services.docker_command_builder import DockerCommandBuilder
+from app.services.metrics import instrumented_run, observe_subprocess
 
 
 logger = logging.getLogger(__name__)
@@ -22,7 +28,8 @@ logger = logging.getLogger(__name__)
 def docker_image_exists(image_name: str, tag: str = "latest") -> bool:
     try:
         # Run docker images -q <image_name>:<tag>
-        result = subprocess.run(
+        result = instrumented_run(
+            "docker", "images",
             ["docker", "images", "-q", f"{image_name}:{tag}"],
             capture_output=True,
             text=True,
@@ -40,7 +47,7 @@ def docker_container_exists(container_name: str, running_only: bool = False) ->
         if not running_only:
             cmd.insert(2, "-a")  # add -a for all containers
 
-        result = subprocess.run(cmd, capture_output=True, text=True, check=True)
+        result = instrumented_run("docker", "ps", cmd, capture_output=True, text=True, check=True)
         return result.stdout.strip()
     except subprocess.CalledProcessError:
         return ""
@@ -48,7 +55,8 @@ def docker_container_exists(container_name: str, running_only: bool = False) ->
 def docker_remove_image(image_name: str):
     try:
         # Get all image IDs for this name across all tags
-        result = subprocess.run(
+        result = instrumented_run(
+            "docker", "images",
             ["docker", "images", "-q", image_name],
             capture_output=True,
             text=True,
@@ -58,7 +66,8 @@ def docker_remove_image(image_name: str):
         if not image_ids:
             logger.info("Image '%s' does not exist, skipping removal.", image_name)
             return
-        rm_result = subprocess.run(
+        rm_result = instrumented_run(
+            "docker", "rmi",
             ["docker", "rmi", "-f"] + image_ids,
             capture_output=True,
             text=True
@@ -79,7 +88,8 @@ def docker_remove_container(container_name: str, container_id: str):
     try:
         if container_id:
             # Remove the container (force stops if running)
-            rm_result = subprocess.run(
+            rm_result = instrumented_run(
+                "docker", "rm",
                 ["docker", "rm", "-f", container_id],
                 capture_output=True,
                 text=True
@@ -94,7 +104,38 @@ def docker_remove_container(container_name: str, container_id: str):
         logger.error(f"Error checking container: {e}")
 
 
-def docker_build(app_model: AppModel, app_dir: Path, **kwargs):
+@contextmanager
+def _env_file(app_id: int, env_vars: Dict[str, str]) -> Iterator[Optional[Path]]:
+    """
+    Render env_vars as a `docker run --env-file` on tmpfs (Config.ENV_FILE_DIR),
+    readable only by us, and delete it when the block exits — docker reads the
+    file client-side, so it is no longer needed once `docker run -d` returns.
+    Yields None if nothing can go in the file.
+    """
+    lines = [f"{key}={value}\n" for key, value in env_vars.items() if "\n" not in value]
+    if not lines:
+        yield None
+        return
+
+    env_dir = Config.ENV_FILE_DIR
+    if not env_dir.parent.is_dir():
+        env_dir = Path(tempfile.gettempdir()) / "gitdeploy-env"
+        logger.warning("ENV_FILE_DIR parent missing, using %s (not tmpfs)", env_dir)
+    env_dir.mkdir(mode=0o700, parents=True, exist_ok=True)
+
+    fd, path = tempfile.mkstemp(prefix=f"app_{app_id}_", suffix=".env", dir=env_dir)
+    try:
+        with os.fdopen(fd, "w") as f:
+            f.writelines(lines)
+        yield Path(path)
+    finally:
+        try:
+            os.unlink(path)
+        except FileNotFoundError:
+            pass
+
+
+def docker_build(app_model: AppModel, app_dir: Path, **kwargs) -> str:
     version_tag = str(int(time.time()))
     image_name = f"app_{app_model.id}_image"
     tagged_image = f"{image_name}:{version_tag}"
@@ -130,6 +171,7 @@ def docker_build(app_model: AppModel, app_dir: Path, **kwargs):
         for key, value in kwargs['build_args'].items():
             build_cmd = build_cmd.with_build_arg(key, value)
 
+    started = time.perf_counter()
     process = subprocess.Popen(
         args = build_cmd.compile(),
         cwd=app_dir,
@@ -143,12 +185,14 @@ def docker_build(app_model: AppModel, app_dir: Path, **kwargs):
         logger.info(line.rstrip())
 
     exit_code = process.wait()
+    observe_subprocess("docker", "build", started, ok=exit_code == 0)
 
     if exit_code != 0:
         logger.error("Docker build failed for %s with exit code %s", image_name, exit_code)
         raise DockerBuildError(context=f"Docker build failed with exit code {exit_code}")
     
     logger.info("Docker build completed successfully for %s", image_name)
+    return tagged_image
 
 
 def docker_run(app_model: AppModel, app_dir: Path, **kwargs):
@@ -198,23 +242,34 @@ def docker_run(app_model: AppModel, app_dir: Path, **kwargs):
         )
     )
 
-    # Injecting environment variables dynamically if provided
-    if kwargs.get('env_vars'):
-        for key, value in kwargs['env_vars'].items():
-            run_cmd = run_cmd.with_env(key, value)
+    # Environment goes through a short-lived --env-file instead of -e flags, keeping
+    # values out of argv (and `ps`). Docker env-files can't hold multi-line values
+    # (PEM keys, JSON credentials); those are set in the docker CLI's own environment
+    # and passed as a bare `-e KEY`, which docker resolves client-side.
+    # Request schemas accept any JSON value (e.g. PORT: 8080); docker only takes strings
+    env_vars = {key: str(value) for key, value in (kwargs.get('env_vars') or {}).items()}
+    multiline = {key: value for key, value in env_vars.items() if "\n" in value}
+    for key in multiline:
+        run_cmd = run_cmd.with_env_from_client(key)
 
-    # The image MUST be the last configuration before compile()
-    run_cmd = run_cmd.with_image(full_image_target)
-    # --------------------------------------------------
+    with _env_file(app_model.id, env_vars) as env_file:
+        if env_file is not None:
+            run_cmd = run_cmd.with_env_file(env_file)
 
-    # Initiating docker Container Running command
-    logger.info("Initiating Docker run from image: %s", full_image_target)
-    result = subprocess.run(
-        args=run_cmd.compile(),
-        cwd=app_dir,
-        capture_output=True,
-        text=True
-    )
+        # The image MUST be the last configuration before compile()
+        run_cmd = run_cmd.with_image(full_image_target)
+        # --------------------------------------------------
+
+        # Initiating docker Container Running command
+        logger.info("Initiating Docker run from image: %s", full_image_target)
+        result = instrumented_run(
+            "docker", "run",
+            run_cmd.compile(),
+            cwd=app_dir,
+            env={**os.environ, **multiline} if multiline else None,
+            capture_output=True,
+            text=True
+        )
 
     if result.returncode != 0:
         logger.error("Container Failed to Run with error %s", result.stderr)
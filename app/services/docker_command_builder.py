@@ -96,6 +96,16 @@ class DockerCommandBuilder:
             self._env_vars.extend(["-e", f"{key}={value}"])
             return self
 
+        def with_env_from_client(self, key: str) -> 'DockerCommandBuilder.RunCommandBuilder':
+            """`-e KEY` without a value: docker copies KEY from the docker CLI's own environment."""
+            self._env_vars.extend(["-e", key])
+            return self
+
+        def with_env_file(self, env_file: str | Path) -> 'DockerCommandBuilder.RunCommandBuilder':
+            """Reads variables from a KEY=VALUE file instead of putting them on the command line."""
+            self._env_vars.extend(["--env-file", str(env_file)])
+            return self
+
         def with_volume(self, host_path: str | Path,
                         container_path: str | Path) -> 'DockerCommandBuilder.RunCommandBuilder':
             self._volumes.extend(["-v", f"{str(host_path)}:{str(container_path)}"])
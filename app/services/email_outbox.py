@@ -0,0 +1,184 @@
+"""
+Outbound email queue.
+
+Handlers enqueue messages and return immediately; a single background worker
+keeps one SMTP connection open, drains the queue in batches over it and
+retries failed sends with exponential backoff. The connection is closed after
+EMAIL_SMTP_IDLE_SECONDS without traffic and re-opened on demand.
+
+Point SMTP_HOST/SMTP_PORT at a local stand-in (e.g. `python -m aiosmtpd -n`)
+with SMTP_USE_SSL=false and no SMTP_PASSWORD to exercise it without a real
+mail server; self_test_scripts/smtp_standin.py does that end to end.
+"""
+import asyncio
+import logging
+import smtplib
+import ssl
+from dataclasses import dataclass
+from email.message import Message
+from typing import List, Optional
+
+from fastapi import HTTPException
+
+from app.config import Config
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class OutgoingEmail:
+    recipient: str
+    message: Message
+    attempts: int = 0
+
+
+_queue: Optional[asyncio.Queue] = None
+_worker: Optional[asyncio.Task] = None
+_retry_handles: set = set()
+_smtp: Optional[smtplib.SMTP] = None
+
+
+# ── SMTP connection (only touched from the worker's to_thread calls) ──────────
+
+def open_smtp() -> smtplib.SMTP:
+    """
+    Connect to SMTP_HOST: implicit TLS with SMTP_USE_SSL, otherwise STARTTLS
+    whenever the server offers it. With SMTP_PASSWORD set, logs in and refuses
+    to go on if the server offers no AUTH or the connection is not encrypted;
+    without it (e.g. a local stand-in) mail is sent unauthenticated.
+    """
+    if Config.SMTP_USE_SSL:
+        smtp = smtplib.SMTP_SSL(Config.SMTP_HOST, Config.SMTP_PORT, timeout=30)
+    else:
+        smtp = smtplib.SMTP(Config.SMTP_HOST, Config.SMTP_PORT, timeout=30)
+    try:
+        smtp.ehlo_or_helo_if_needed()
+        encrypted = Config.SMTP_USE_SSL
+        if not encrypted and smtp.has_extn("starttls"):
+            smtp.starttls(context=ssl.create_default_context())
+            smtp.ehlo()  # capabilities (AUTH in particular) change after STARTTLS
+            encrypted = True
+        if Config.SMTP_PASSWORD:
+            if not encrypted:
+                raise smtplib.SMTPNotSupportedError(
+                    f"{Config.SMTP_HOST} offers no TLS; refusing to send SMTP_PASSWORD in plaintext")
+            if not smtp.has_extn("auth"):
+                raise smtplib.SMTPNotSupportedError(f"{Config.SMTP_HOST} does not offer AUTH")
+            smtp.login(Config.SMTP_EMAIL, Config.SMTP_PASSWORD)
+    except Exception:
+        smtp.close()
+        raise
+    logger.info("SMTP connection opened to %s:%s", Config.SMTP_HOST, Config.SMTP_PORT)
+    return smtp
+
+
+def _close_smtp() -> None:
+    global _smtp
+    if _smtp is not None:
+        try:
+            _smtp.quit()
+        except Exception:
+            pass
+        _smtp = None
+
+
+def _send_batch(batch: List[OutgoingEmail]) -> List[OutgoingEmail]:
+    """Send over the shared connection; returns the emails that failed."""
+    global _smtp
+    failed: List[OutgoingEmail] = []
+    for item in batch:
+        try:
+            if _smtp is None:
+                _smtp = open_smtp()
+            _smtp.send_message(item.message, from_addr=Config.SMTP_EMAIL, to_addrs=[item.recipient])
+        except smtplib.SMTPRecipientsRefused as e:
+            # Permanent for this address — retrying won't help
+            logger.error("SMTP refused recipient %s: %s", item.recipient, e.recipients)
+        except Exception as e:
+            logger.warning("SMTP send to %s failed: %s", item.recipient, e)
+            # Drop the connection; the next attempt reconnects (and re-authenticates)
+            _close_smtp()
+            failed.append(item)
+    return failed
+
+
+# ── Worker ────────────────────────────────────────────────────────────────────
+
+def _schedule_retry(item: OutgoingEmail) -> None:
+    item.attempts += 1
+    if item.attempts >= Config.EMAIL_MAX_ATTEMPTS:
+        logger.error("Giving up on email to %s after %d attempts", item.recipient, item.attempts)
+        return
+    delay = min(Config.EMAIL_RETRY_BASE_SECONDS * 2 ** (item.attempts - 1), 300)
+    logger.info("Retrying email to %s in %.0fs (attempt %d)", item.recipient, delay, item.attempts + 1)
+
+    def requeue():
+        _retry_handles.discard(handle)
+        if _queue is not None:
+            try:
+                _queue.put_nowait(item)
+            except asyncio.QueueFull:
+                logger.error("Email queue full — dropping retry to %s", item.recipient)
+
+    handle = asyncio.get_running_loop().call_later(delay, requeue)
+    _retry_handles.add(handle)
+
+
+async def _worker_loop() -> None:
+    while True:
+        try:
+            first = await asyncio.wait_for(_queue.get(), timeout=Config.EMAIL_SMTP_IDLE_SECONDS)
+        except asyncio.TimeoutError:
+            await asyncio.to_thread(_close_smtp)
+            continue
+
+        batch = [first]
+        while len(batch) < Config.EMAIL_BATCH_SIZE and not _queue.empty():
+            batch.append(_queue.get_nowait())
+
+        try:
+            failed = await asyncio.to_thread(_send_batch, batch)
+        except Exception as e:
+            logger.error("Email batch failed: %s", e)
+            failed = batch
+        for item in failed:
+            _schedule_retry(item)
+        for _ in batch:
+            _queue.task_done()
+
+
+def start_email_outbox() -> None:
+    global _queue, _worker
+    if _worker is None:
+        _queue = asyncio.Queue(maxsize=Config.EMAIL_QUEUE_MAX)
+        _worker = asyncio.create_task(_worker_loop())
+
+
+async def stop_email_outbox(drain_timeout: float = 10.0) -> None:
+    """Give queued mail a chance to go out, then stop the worker and close SMTP."""
+    global _queue, _worker
+    if _worker is None:
+        return
+    try:
+        await asyncio.wait_for(_queue.join(), timeout=drain_timeout)
+    except asyncio.TimeoutError:
+        logger.warning("Email outbox shut down with %d message(s) unsent", _queue.qsize())
+    for handle in list(_retry_handles):
+        handle.cancel()
+    _retry_handles.clear()
+    _worker.cancel()
+    try:
+        await _worker
+    except (asyncio.CancelledError, Exception):
+        pass
+    await asyncio.to_thread(_close_smtp)
+    _queue = _worker = None
+
+
+def enqueue_email(recipient: str, message: Message) -> None:
+    if _queue is None:
+        raise HTTPException(500, "Email outbox is not running")
+    try:
+        _queue.put_nowait(OutgoingEmail(recipient=recipient, message=message))
+    except asyncio.QueueFull:
+        raise HTTPException(503, "Email queue is full, please retry shortly", headers={"Retry-After": "30"})
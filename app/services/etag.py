@@ -0,0 +1,47 @@
+"""
+Weak ETags for polled read endpoints.
+
+Endpoints derive the tag from a cheap projection — (id, updated_at, status)
+of the rows a response is built from — so answering If-None-Match with 304
+never needs the full rows or serialization. updated_at is bumped on every
+ORM update (TimeStatusMixin.onupdate), and inserts/deletes change the row
+set, so any change to the response changes the tag.
+"""
+import hashlib
+from typing import Iterable, Optional
+
+from fastapi import Request, Response
+
+# Clients must revalidate every time; the tag only saves the body and the full query
+CACHE_CONTROL = "private, no-cache"
+
+
+def compute_etag(scope: str, rows: Iterable[tuple]) -> str:
+    digest = hashlib.blake2b(scope.encode(), digest_size=12)
+    for row in rows:
+        digest.update(b"\x1f".join(str(v).encode() for v in row))
+        digest.update(b"\x1e")
+    return f'W/"{digest.hexdigest()}"'
+
+
+def _opaque(tag: str) -> str:
+    return tag.strip().removeprefix("W/")
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """Weak comparison against If-None-Match (RFC 9110 §13.1.2)."""
+    header: Optional[str] = request.headers.get("if-none-match")
+    if not header:
+        return False
+    if header.strip() == "*":
+        return True
+    return any(_opaque(candidate) == _opaque(etag) for candidate in header.split(","))
+
+
+def not_modified(etag: str) -> Response:
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": CACHE_CONTROL})
+
+
+def set_etag(response: Response, etag: str) -> None:
+    response.headers["ETag"] = etag
+    response.headers["Cache-Control"] = CACHE_CONTROL
@@ -0,0 +1,113 @@
+"""
+In-process key/value store with TTLs — redis_service's fallback when Redis is
+disabled or unreachable, so OTP, password reset and caching keep working on a
+single-node deployment.
+
+- Expiry: a min-heap of (expires_at, key) is drained on every operation, so
+  expired keys are reclaimed even if never read again. Heap entries are not
+  removed on overwrite; stale ones are skipped when popped.
+- Memory cap: sizes are approximated from key/value lengths; once the total
+  exceeds `max_bytes` the least recently used keys are evicted.
+- Operations are synchronous and the store is only used from the event loop,
+  so each call (including incr) is atomic.
+
+State is per process: with several uvicorn workers each has its own store, so
+a value written by one worker is invisible to the others. Use Redis for
+multi-worker deployments.
+"""
+import heapq
+import sys
+import time
+from collections import OrderedDict
+from typing import List, Optional, Tuple
+
+# Rough per-entry bookkeeping cost (dict/OrderedDict slot, tuple, heap entry)
+_ENTRY_OVERHEAD = 200
+
+
+def _size(key: str, value: str) -> int:
+    return sys.getsizeof(key) + sys.getsizeof(value) + _ENTRY_OVERHEAD
+
+
+class MemoryStore:
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.bytes_used = 0
+        self.evictions = 0
+        # key -> (value, expires_at or None), kept in LRU order
+        self._data: "OrderedDict[str, Tuple[str, Optional[float]]]" = OrderedDict()
+        self._expiry: List[Tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+    def _remove(self, key: str) -> None:
+        value, _ = self._data.pop(key)
+        self.bytes_used -= _size(key, value)
+
+    def _purge_expired(self, now: float) -> None:
+        heap = self._expiry
+        while heap and heap[0][0] <= now:
+            expires_at, key = heapq.heappop(heap)
+            entry = self._data.get(key)
+            # Only drop the key if this heap entry is still its current deadline
+            if entry is not None and entry[1] == expires_at:
+                self._remove(key)
+
+    def _live(self, key: str, now: float) -> Optional[Tuple[str, Optional[float]]]:
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[1] is not None and entry[1] <= now:
+            self._remove(key)
+            return None
+        return entry
+
+    def _store(self, key: str, value: str, expires_at: Optional[float]) -> None:
+        if key in self._data:
+            self._remove(key)
+        self._data[key] = (value, expires_at)
+        self.bytes_used += _size(key, value)
+        if expires_at is not None:
+            heapq.heappush(self._expiry, (expires_at, key))
+        while self.bytes_used > self.max_bytes and len(self._data) > 1:
+            oldest = next(iter(self._data))
+            self._remove(oldest)
+            self.evictions += 1
+        # Overwrites leave dead heap entries behind; rebuild before they dominate
+        if len(self._expiry) > 2 * len(self._data) + 1024:
+            self._expiry = [(e, k) for k, (_, e) in self._data.items() if e is not None]
+            heapq.heapify(self._expiry)
+
+    def get(self, key: str) -> Optional[str]:
+        now = time.monotonic()
+        self._purge_expired(now)
+        entry = self._live(key, now)
+        if entry is None:
+            return None
+        self._data.move_to_end(key)
+        return entry[0]
+
+    def set(self, key: str, value: str, ex: Optional[float] = None) -> None:
+        now = time.monotonic()
+        self._purge_expired(now)
+        self._store(key, value, now + ex if ex else None)
+
+    def delete(self, key: str) -> None:
+        self._purge_expired(time.monotonic())
+        if key in self._data:
+            self._remove(key)
+
+    def incr(self, key: str, ex: Optional[float] = None) -> int:
+        """Increment an integer value (missing counts as 0) and refresh its TTL, like INCR + EXPIRE."""
+        now = time.monotonic()
+        self._purge_expired(now)
+        entry = self._live(key, now)
+        value = int(entry[0]) + 1 if entry is not None else 1
+        self._store(key, str(value), now + ex if ex else None)
+        return value
+
+    def clear(self) -> None:
+        self._data.clear()
+        self._expiry.clear()
+        self.bytes_used = 0
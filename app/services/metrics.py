@@ -0,0 +1,289 @@
+"""
+Prometheus-format metrics — in-process counters, gauges and histograms.
+
+Kept dependency-free and cheap enough for hot paths: each update is a dict
+lookup plus a few float additions under a per-metric lock (subprocess calls
+run in worker threads via asyncio.to_thread, so updates must be thread-safe).
+
+Exposed at GET /metrics by main.py in text exposition format 0.0.4.
+Values are per process; with multiple uvicorn workers, scrape each worker
+or aggregate with `sum by (...)` in PromQL.
+"""
+import bisect
+import subprocess
+import threading
+import time
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+# Request latency buckets (seconds) — API calls are mostly sub-second
+_HTTP_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+# Deploy stages and subprocesses range from milliseconds to several minutes
+_SLOW_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0, 120.0, 300.0, 600.0)
+
+_registry: List["_Metric"] = []
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{n}="{_escape(str(v))}"' for n, v in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _format_value(value: float) -> str:
+    if value == float("inf"):
+        return "+Inf"
+    return repr(float(value)) if not float(value).is_integer() else str(int(value))
+
+
+class _Metric:
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._lock = threading.Lock()
+        _registry.append(self)
+
+    def _samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return "\n".join(lines)
+
+
+class Counter(_Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in items
+        ]
+
+
+class Gauge(_Metric):
+    """A settable gauge, or a callback gauge read at scrape time when `fn` is given."""
+    kind = "gauge"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 fn: Optional[Callable[[], Optional[float]]] = None):
+        super().__init__(name, documentation, labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._fn = fn
+
+    def set(self, value: float, *labels: str) -> None:
+        with self._lock:
+            self._values[labels] = value
+
+    def inc(self, *labels: str, amount: float = 1.0) -> None:
+        with self._lock:
+            self._values[labels] = self._values.get(labels, 0.0) + amount
+
+    def dec(self, *labels: str, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    def _samples(self) -> List[str]:
+        if self._fn is not None:
+            try:
+                value = self._fn()
+            except Exception:
+                value = None
+            return [] if value is None else [f"{self.name} {_format_value(value)}"]
+        with self._lock:
+            items = list(self._values.items())
+        return [
+            f"{self.name}{_format_labels(self.labelnames, labels)} {_format_value(v)}"
+            for labels, v in items
+        ]
+
+
+class Histogram(_Metric):
+    kind = "histogram"
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = _HTTP_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self._buckets = tuple(sorted(buckets))
+        # labels -> [per-bucket counts..., +Inf count, sum]
+        self._values: Dict[Tuple[str, ...], List[float]] = {}
+
+    def observe(self, value: float, *labels: str) -> None:
+        idx = bisect.bisect_left(self._buckets, value)
+        with self._lock:
+            state = self._values.get(labels)
+            if state is None:
+                state = [0.0] * (len(self._buckets) + 2)
+                self._values[labels] = state
+            state[idx] += 1
+            state[-1] += value
+
+    def _samples(self) -> List[str]:
+        with self._lock:
+            items = [(labels, list(state)) for labels, state in self._values.items()]
+        lines = []
+        for labels, state in items:
+            cumulative = 0.0
+            for bound, count in zip((*self._buckets, float("inf")), state[:-1]):
+                cumulative += count
+                le = 'le="' + _format_value(bound) + '"'
+                lines.append(
+                    f"{self.name}_bucket{_format_labels(self.labelnames, labels, le)} {_format_value(cumulative)}"
+                )
+            lines.append(f"{self.name}_sum{_format_labels(self.labelnames, labels)} {_format_value(state[-1])}")
+            lines.append(f"{self.name}_count{_format_labels(self.labelnames, labels)} {_format_value(cumulative)}")
+        return lines
+
+
+def render_metrics() -> str:
+    return "\n".join(metric.render() for metric in _registry) + "\n"
+
+
+# ── DB pool (read at scrape time) ─────────────────────────────────────────────
+
+def _pool_stat(attr: str) -> Optional[float]:
+    from app.database import engine
+    stat = getattr(engine.pool, attr, None)
+    return stat() if callable(stat) else None
+
+
+def _near_cache_size() -> Optional[float]:
+    from app.services.redis_service import near_cache_size
+    return near_cache_size()
+
+
+def _memory_store_stat(attr: str) -> Optional[float]:
+    from app.services.redis_service import memory_store_stats
+    return getattr(memory_store_stats(), attr)
+
+
+# ── Metric definitions ────────────────────────────────────────────────────────
+
+HTTP_REQUESTS = Counter(
+    "gitdeploy_http_requests_total", "HTTP requests handled.", ("method", "route", "status"),
+)
+HTTP_LATENCY = Histogram(
+    "gitdeploy_http_request_duration_seconds", "HTTP request latency by route.", ("method", "route"),
+)
+HTTP_IN_FLIGHT = Gauge(
+    "gitdeploy_http_requests_in_flight", "HTTP requests currently being served.",
+)
+
+DEPLOY_STAGE_SECONDS = Histogram(
+    "gitdeploy_deploy_stage_duration_seconds", "Wall time per deploy pipeline stage.", ("stage",),
+    buckets=_SLOW_BUCKETS,
+)
+DEPLOYS = Counter(
+    "gitdeploy_deploys_total", "Finished deployments by outcome.", ("status",),
+)
+
+SUBPROCESS_SECONDS = Histogram(
+    "gitdeploy_subprocess_duration_seconds", "Latency of docker/git subprocess calls.", ("tool", "op"),
+    buckets=_SLOW_BUCKETS,
+)
+SUBPROCESS_FAILURES = Counter(
+    "gitdeploy_subprocess_failures_total", "docker/git subprocess calls that failed.", ("tool", "op"),
+)
+
+DB_POOL_SIZE = Gauge("gitdeploy_db_pool_size", "Configured DB pool size.", fn=lambda: _pool_stat("size"))
+DB_POOL_CHECKED_OUT = Gauge(
+    "gitdeploy_db_pool_checked_out", "DB connections currently checked out.", fn=lambda: _pool_stat("checkedout"),
+)
+DB_POOL_OVERFLOW = Gauge(
+    "gitdeploy_db_pool_overflow", "DB connections opened beyond pool_size.", fn=lambda: _pool_stat("overflow"),
+)
+
+REDIS_OPS = Counter(
+    "gitdeploy_redis_ops_total", "Redis operations by outcome (hit/miss/ok/error).", ("op", "result"),
+)
+NEAR_CACHE_OPS = Counter(
+    "gitdeploy_redis_near_cache_total", "Redis near-cache lookups and invalidations.", ("result",),
+)
+NEAR_CACHE_SIZE = Gauge(
+    "gitdeploy_redis_near_cache_entries", "Entries held in the Redis near cache.", fn=lambda: _near_cache_size(),
+)
+MEMORY_STORE_BYTES = Gauge(
+    "gitdeploy_memory_store_bytes", "Approximate bytes held by the in-process Redis fallback.",
+    fn=lambda: _memory_store_stat("bytes_used"),
+)
+MEMORY_STORE_EVICTIONS = Gauge(
+    "gitdeploy_memory_store_evictions", "Keys evicted from the in-process Redis fallback by the memory cap.",
+    fn=lambda: _memory_store_stat("evictions"),
+)
+RATE_LIMITED = Counter(
+    "gitdeploy_rate_limited_total", "Requests rejected with 429 by rate-limit rule.", ("rule",),
+)
+NGINX_RELOADS = Counter(
+    "gitdeploy_nginx_reloads_total", "nginx -s reload invocations by outcome.", ("result",),
+)
+
+
+# ── Helpers ───────────────────────────────────────────────────────────────────
+
+def observe_subprocess(tool: str, op: str, started: float, ok: bool) -> None:
+    SUBPROCESS_SECONDS.observe(time.perf_counter() - started, tool, op)
+    if not ok:
+        SUBPROCESS_FAILURES.inc(tool, op)
+
+
+def instrumented_run(tool: str, op: str, args: Sequence[str], **kwargs) -> subprocess.CompletedProcess:
+    """subprocess.run() that records latency and failures for /metrics."""
+    started = time.perf_counter()
+    try:
+        result = subprocess.run(args, **kwargs)
+    except Exception:
+        observe_subprocess(tool, op, started, ok=False)
+        raise
+    observe_subprocess(tool, op, started, ok=result.returncode == 0)
+    return result
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware — records per-route latency, status and in-flight count."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        status_code = [500]
+
+        async def send_wrapper(message):
+            if message["type"] == "http.response.start":
+                status_code[0] = message["status"]
+            await send(message)
+
+        started = time.perf_counter()
+        HTTP_IN_FLIGHT.inc()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            HTTP_IN_FLIGHT.dec()
+            # Use the route template, not the raw path, to keep label cardinality bounded
+            route = scope.get("route")
+            route_path = getattr(route, "path", None) or "unmatched"
+            method = scope.get("method", "")
+            HTTP_LATENCY.observe(time.perf_counter() - started, method, route_path)
+            HTTP_REQUESTS.inc(method, route_path, str(status_code[0]))
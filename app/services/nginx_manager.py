@@ -6,7 +6,8 @@ On every successful deployment:
 On every app deletion:
   → removes /etc/nginx/gitdeploy.d/app-{id}.conf
 
-If NGINX_AUTO_RELOAD=true, runs `nginx -s reload` after each change.
+If NGINX_AUTO_RELOAD=true, runs `nginx -s reload` after each change
+(once per batch for remove_app_confs).
 
 All operations fail silently (log warning) so a missing Nginx installation
 never breaks a deployment.
@@ -15,8 +16,10 @@ import asyncio
 import logging
 import subprocess
 from pathlib import Path
+from typing import Iterable
 
 from app.config import Config
+from app.services.metrics import NGINX_RELOADS
 
 logger = logging.getLogger(__name__)
 
@@ -64,18 +67,28 @@ def _write_conf(app_id: int, subdomain: str, internal_port: int) -> None:
         _reload_nginx()
 
 
-def _remove_conf(app_id: int) -> None:
+def _unlink_conf(app_id: int) -> bool:
     conf_file = Path(Config.NGINX_CONF_DIR) / f"app-{app_id}.conf"
     if conf_file.exists():
         conf_file.unlink()
         logger.info("Nginx config removed: %s", conf_file)
-    else:
-        logger.debug("Nginx config not found (already removed?): %s", conf_file)
+        return True
+    logger.debug("Nginx config not found (already removed?): %s", conf_file)
+    return False
+
 
+def _remove_conf(app_id: int) -> None:
+    _unlink_conf(app_id)
     if Config.NGINX_AUTO_RELOAD:
         _reload_nginx()
 
 
+def _remove_confs(app_ids: Iterable[int]) -> None:
+    removed = [app_id for app_id in app_ids if _unlink_conf(app_id)]
+    if removed and Config.NGINX_AUTO_RELOAD:
+        _reload_nginx()
+
+
 def _reload_nginx() -> None:
     try:
         result = subprocess.run(
@@ -85,12 +98,16 @@ def _reload_nginx() -> None:
             timeout=10,
         )
         if result.returncode == 0:
+            NGINX_RELOADS.inc("ok")
             logger.info("Nginx reloaded successfully.")
         else:
+            NGINX_RELOADS.inc("failed")
             logger.warning("Nginx reload returned non-zero: %s", result.stderr.strip())
     except FileNotFoundError:
+        NGINX_RELOADS.inc("missing")
         logger.warning("nginx binary not found — skipping reload.")
     except Exception as e:
+        NGINX_RELOADS.inc("failed")
         logger.warning("Nginx reload failed: %s", e)
 
 
@@ -114,3 +131,14 @@ async def remove_app_conf(app_id: int) -> None:
         await asyncio.to_thread(_remove_conf, app_id)
     except Exception as e:
         logger.warning("Failed to remove Nginx config for app %s: %s", app_id, e)
+
+
+async def remove_app_confs(app_ids: Iterable[int]) -> None:
+    """Remove Nginx configs for several apps with a single reload. Never raises."""
+    if not Config.NGINX_ENABLED:
+        return
+    app_ids = list(app_ids)
+    try:
+        await asyncio.to_thread(_remove_confs, app_ids)
+    except Exception as e:
+        logger.warning("Failed to remove Nginx configs for apps %s: %s", app_ids, e)
@@ -42,8 +42,8 @@ class OTPManager:
             template=OtpTemplate(),
             data={"otp": otp, "username": username},
         )
-        builder.send()
-        logger.info("OTP sent to %s", email)
+        builder.enqueue()
+        logger.info("OTP queued for %s", email)
 
     async def verify_otp(self, email: str, otp: str) -> None:
         stored = await redis_get(self._otp_key(email))
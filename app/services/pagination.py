@@ -0,0 +1,73 @@
+"""
+Keyset (cursor) pagination and cached totals for admin listing endpoints.
+
+`?cursor=` pages seek on the primary key (`WHERE id < :last_id`), so page
+1000 of error_logs costs the same as page 1. The classic `?page=` API still
+works and also returns a `next_cursor` so clients can switch over.
+
+Totals come from a per-process count cache: a stale value is served
+immediately while a single background query refreshes it.
+"""
+import base64
+import binascii
+from typing import Any, Callable, List, Optional, Sequence, Tuple
+
+from fastapi import HTTPException
+from sqlalchemy import Select
+
+from app.config import Config
+from app.database import ReadSessionLocal
+from app.services.cache import SingleFlightCache
+
+_count_cache = SingleFlightCache(ttl=Config.ADMIN_COUNT_CACHE_TTL)
+
+
+def encode_cursor(last_id: int) -> str:
+    return base64.urlsafe_b64encode(f"id:{last_id}".encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        prefix, _, value = base64.urlsafe_b64decode(padded.encode()).decode().partition(":")
+        if prefix != "id":
+            raise ValueError(cursor)
+        return int(value)
+    except (ValueError, binascii.Error, UnicodeDecodeError):
+        raise HTTPException(status_code=400, detail="Invalid cursor")
+
+
+def paginate(
+    query: Select,
+    id_column: Any,
+    cursor: Optional[str],
+    page: int,
+    size: int,
+    descending: bool = True,
+) -> Select:
+    """Apply ordering plus keyset (cursor) or offset (page) paging. Fetches one extra row."""
+    if cursor:
+        last_id = decode_cursor(cursor)
+        query = query.where(id_column < last_id if descending else id_column > last_id)
+    else:
+        query = query.offset((page - 1) * size)
+    order = id_column.desc() if descending else id_column.asc()
+    return query.order_by(order).limit(size + 1)
+
+
+def split_page(rows: Sequence[Any], size: int, get_id: Callable[[Any], int]) -> Tuple[List[Any], Optional[str]]:
+    """Trim the look-ahead row and build next_cursor (None on the last page)."""
+    items = list(rows[:size])
+    next_cursor = encode_cursor(get_id(items[-1])) if len(rows) > size and items else None
+    return items, next_cursor
+
+
+async def cached_count(key: str, count_query: Select) -> int:
+    """COUNT(*) cached for ADMIN_COUNT_CACHE_TTL seconds, refreshed in the background when stale."""
+    async def load() -> int:
+        # Own session: a background refresh may outlive the request that triggered it
+        async with ReadSessionLocal() as session:
+            result = await session.execute(count_query)
+            return result.scalar() or 0
+
+    return await _count_cache.get_or_load(key, load, serve_stale=True)
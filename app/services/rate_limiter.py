@@ -0,0 +1,170 @@
+"""
+Token-bucket rate limiting for abuse-prone routes (login, register, OTP, deploy).
+
+Each rule is a bucket of `capacity` tokens refilled at `per_minute` tokens
+per minute, keyed per client IP or per authenticated user. With Redis the
+bucket lives in Redis and is updated atomically by a Lua script (shared by
+every worker); without Redis, or if a Redis call fails, an in-process bucket
+is used instead.
+
+Rejected requests get 429 with a Retry-After header before any handler (and
+therefore any bcrypt work) runs.
+"""
+import json
+import logging
+import math
+import re
+import time
+from dataclasses import dataclass
+from typing import List, Optional, Tuple
+
+from jose import JWTError, jwt
+
+from app.config import Config
+from app.services.cache import LRUTTLCache
+from app.services.metrics import RATE_LIMITED
+from app.services.redis_service import redis_eval
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class RateLimitRule:
+    name: str
+    method: str
+    path: "re.Pattern[str]"
+    capacity: int
+    per_minute: float
+    key: str = "ip"          # "ip" or "user"
+
+    @property
+    def rate(self) -> float:
+        """Refill rate in tokens per second."""
+        return self.per_minute / 60.0
+
+
+_API = "/api/v1"
+RULES: List[RateLimitRule] = [
+    RateLimitRule("login", "POST", re.compile(rf"^{_API}/auth/login$"), capacity=10, per_minute=10),
+    RateLimitRule("register", "POST", re.compile(rf"^{_API}/auth/register$"), capacity=5, per_minute=5),
+    RateLimitRule("resend_otp", "POST", re.compile(rf"^{_API}/auth/resend-otp$"), capacity=5, per_minute=3),
+    RateLimitRule("forgot_password", "POST", re.compile(rf"^{_API}/auth/forgot-password$"), capacity=5, per_minute=3),
+    RateLimitRule("deploy_user", "POST", re.compile(rf"^{_API}/apps/\d+/deploy$"), capacity=10, per_minute=6, key="user"),
+    RateLimitRule("deploy_ip", "POST", re.compile(rf"^{_API}/apps/\d+/deploy$"), capacity=30, per_minute=30),
+]
+
+# KEYS[1] = bucket; ARGV = capacity, refill tokens/sec. Returns {allowed, retry_after_seconds}.
+# Uses the Redis server clock so all workers agree on elapsed time.
+_TOKEN_BUCKET_LUA = """
+local capacity = tonumber(ARGV[1])
+local rate = tonumber(ARGV[2])
+local t = redis.call('TIME')
+local now = tonumber(t[1]) + tonumber(t[2]) / 1000000
+local state = redis.call('HMGET', KEYS[1], 'tokens', 'ts')
+local tokens = tonumber(state[1]) or capacity
+local ts = tonumber(state[2]) or now
+tokens = math.min(capacity, tokens + math.max(0, now - ts) * rate)
+local allowed = 0
+local retry_after = 0
+if tokens >= 1 then
+  tokens = tokens - 1
+  allowed = 1
+else
+  retry_after = (1 - tokens) / rate
+end
+redis.call('HSET', KEYS[1], 'tokens', tostring(tokens), 'ts', tostring(now))
+redis.call('PEXPIRE', KEYS[1], math.ceil(capacity / rate * 1000))
+return {allowed, tostring(retry_after)}
+"""
+
+# bucket key → (tokens, last refill ts); entries expire once they would be full again
+_local_buckets = LRUTTLCache(max_entries=50_000)
+
+
+def _take_local(bucket: str, rule: RateLimitRule) -> Tuple[bool, float]:
+    now = time.monotonic()
+    tokens, ts = _local_buckets.get(bucket) or (float(rule.capacity), now)
+    tokens = min(rule.capacity, tokens + (now - ts) * rule.rate)
+    allowed, retry_after = tokens >= 1, 0.0
+    if allowed:
+        tokens -= 1
+    else:
+        retry_after = (1 - tokens) / rule.rate
+    _local_buckets.set(bucket, (tokens, now), ttl=rule.capacity / rule.rate)
+    return allowed, retry_after
+
+
+async def _take(bucket: str, rule: RateLimitRule) -> Tuple[bool, float]:
+    result = await redis_eval(_TOKEN_BUCKET_LUA, [bucket], [rule.capacity, rule.rate])
+    if result is None:
+        return _take_local(bucket, rule)
+    return bool(int(result[0])), float(result[1])
+
+
+def _client_ip(scope) -> str:
+    if Config.RATE_LIMIT_TRUST_FORWARDED:
+        for name, value in scope.get("headers", []):
+            if name == b"x-forwarded-for":
+                return value.decode("latin-1").split(",")[0].strip()
+    client = scope.get("client")
+    return client[0] if client else "unknown"
+
+
+def _user_id(scope) -> Optional[str]:
+    for name, value in scope.get("headers", []):
+        if name == b"authorization":
+            token = value.decode("latin-1").removeprefix("Bearer ").strip()
+            try:
+                payload = jwt.decode(token, Config.JWT_SECRET, algorithms=[Config.JWT_ALGORITHM])
+            except JWTError:
+                return None
+            return payload.get("sub")
+    return None
+
+
+class RateLimitMiddleware:
+    """Pure ASGI middleware applying RULES; non-matching requests pass straight through."""
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        method, path = scope["method"], scope["path"]
+        retry_after = 0.0
+        limited_by = None
+        for rule in RULES:
+            if rule.method != method or not rule.path.match(path):
+                continue
+            if rule.key == "user":
+                subject = _user_id(scope)
+                if subject is None:
+                    continue  # unauthenticated — the handler will reject it anyway
+                bucket = f"ratelimit:{rule.name}:user:{subject}"
+            else:
+                bucket = f"ratelimit:{rule.name}:ip:{_client_ip(scope)}"
+
+            allowed, wait = await _take(bucket, rule)
+            if not allowed and wait >= retry_after:
+                retry_after, limited_by = wait, rule.name
+
+        if limited_by is None:
+            await self.app(scope, receive, send)
+            return
+
+        RATE_LIMITED.inc(limited_by)
+        logger.warning("Rate limit '%s' hit for %s %s", limited_by, method, path)
+        body = json.dumps({"detail": "Too many requests, please slow down"}).encode()
+        await send({
+            "type": "http.response.start",
+            "status": 429,
+            "headers": [
+                (b"content-type", b"application/json"),
+                (b"content-length", str(len(body)).encode()),
+                (b"retry-after", str(max(1, math.ceil(retry_after))).encode()),
+            ],
+        })
+        await send({"type": "http.response.body", "body": body})
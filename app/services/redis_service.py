@@ -1,10 +1,28 @@
 """
 Redis service — optional caching layer.
 Uses a gitdeploy: namespace prefix so we don't clash with other apps on the same Redis.
-If Redis is disabled or unreachable, all operations silently no-op.
+If Redis is disabled or unreachable at startup, get/set/delete/incr fall back to
+an in-process TTL store (memory_store) — enough for a single-worker node;
+pub/sub and Lua scripts no-op.
+
+Optional near cache (REDIS_NEAR_CACHE_ENABLED): redis_get results are kept in
+a bounded per-process LRU for at most REDIS_NEAR_CACHE_TTL seconds (never
+longer than the key's own Redis TTL). Writes through this module publish the
+key on a pub/sub channel so other workers drop their copy immediately; if a
+message is lost (e.g. the subscription drops) the TTL still bounds how long a
+stale value can be served, and the cache is cleared on every (re)subscribe.
+Keys written to Redis by anything other than this module are only bounded by
+the TTL.
 """
+import asyncio
 import logging
-from typing import Optional
+import uuid
+from typing import Callable, Dict, List, Optional, Sequence, Set
+
+from app.config import Config
+from app.services.cache import LRUTTLCache
+from app.services.memory_store import MemoryStore
+from app.services.metrics import NEAR_CACHE_OPS, REDIS_OPS
 
 logger = logging.getLogger(__name__)
 
@@ -17,66 +35,241 @@ except ImportError:
 REDIS_PREFIX = "gitdeploy:"
 
 _client: Optional["aioredis.Redis"] = None  # type: ignore
+_subscriber_tasks: Set[asyncio.Task] = set()
+_scripts: Dict[str, object] = {}
+# Used whenever _client is None
+_memory = MemoryStore(Config.MEMORY_STORE_MAX_BYTES)
+
+_NEAR_CHANNEL = "near:invalidate"
+_NODE_ID = uuid.uuid4().hex
+_near: Optional[LRUTTLCache] = None
+# Bumped on every invalidation; a GET that raced with one must not populate the cache
+_near_generation = 0
 
 
 async def init_redis(url: str) -> None:
     global _client
     if not _REDIS_AVAILABLE:
-        logger.warning("redis package not installed — Redis disabled.")
+        logger.warning("redis package not installed — using the in-process store.")
         return
     try:
         _client = aioredis.from_url(url, decode_responses=True)
         await _client.ping()
         logger.info("Redis connected: %s", url)
     except Exception as e:
-        logger.warning("Redis unavailable (%s) — continuing without cache.", e)
+        logger.warning("Redis unavailable (%s) — using the in-process store.", e)
         _client = None
+        return
+    if Config.REDIS_NEAR_CACHE_ENABLED:
+        _start_near_cache()
 
 
 async def close_redis() -> None:
-    global _client
+    global _client, _near
+    _near = None
+    for task in list(_subscriber_tasks):
+        task.cancel()
+    _subscriber_tasks.clear()
+    _scripts.clear()
     if _client:
         await _client.aclose()
         _client = None
 
 
+# ── Near cache ────────────────────────────────────────────────────────────────
+
+def memory_store_stats() -> MemoryStore:
+    return _memory
+
+
+def near_cache_size() -> Optional[int]:
+    return len(_near) if _near is not None else None
+
+
+def _near_drop(key: str) -> None:
+    global _near_generation
+    _near_generation += 1
+    if _near is not None:
+        _near.delete(key)
+
+
+def _near_clear() -> None:
+    global _near_generation
+    _near_generation += 1
+    if _near is not None:
+        _near.clear()
+
+
+def _on_near_invalidate(message: str) -> None:
+    node, _, key = message.partition(" ")
+    if node != _NODE_ID:
+        NEAR_CACHE_OPS.inc("invalidation")
+        _near_drop(key)
+
+
+def _start_near_cache() -> None:
+    global _near
+    _near = LRUTTLCache(Config.REDIS_NEAR_CACHE_MAX_ENTRIES)
+    redis_subscribe(_NEAR_CHANNEL, _on_near_invalidate, on_subscribe=_near_clear)
+    logger.info(
+        "Redis near cache enabled (max %d entries, %.1fs bound)",
+        Config.REDIS_NEAR_CACHE_MAX_ENTRIES, Config.REDIS_NEAR_CACHE_TTL,
+    )
+
+
+async def _near_invalidate(key: str) -> None:
+    if _near is not None:
+        _near_drop(key)
+        await redis_publish(_NEAR_CHANNEL, f"{_NODE_ID} {key}")
+
+
+async def _get_through_near(key: str) -> Optional[str]:
+    cached = _near.get(key)
+    if cached is not None:
+        NEAR_CACHE_OPS.inc("hit")
+        return cached
+    NEAR_CACHE_OPS.inc("miss")
+
+    generation = _near_generation
+    full_key = f"{REDIS_PREFIX}{key}"
+    pipe = _client.pipeline(transaction=False)
+    await pipe.get(full_key)
+    await pipe.pttl(full_key)
+    value, pttl = await pipe.execute()
+    if value is not None and generation == _near_generation and _near is not None:
+        # pttl is -1 for keys without expiry
+        ttl = Config.REDIS_NEAR_CACHE_TTL if pttl < 0 else min(Config.REDIS_NEAR_CACHE_TTL, pttl / 1000)
+        _near.set(key, value, ttl)
+    return value
+
+
+# ── Key/value ─────────────────────────────────────────────────────────────────
+
 async def redis_get(key: str) -> Optional[str]:
     if _client is None:
-        return None
+        return _memory.get(key)
     try:
-        return await _client.get(f"{REDIS_PREFIX}{key}")
+        if _near is not None:
+            value = await _get_through_near(key)
+        else:
+            value = await _client.get(f"{REDIS_PREFIX}{key}")
     except Exception:
+        REDIS_OPS.inc("get", "error")
         return None
+    REDIS_OPS.inc("get", "hit" if value is not None else "miss")
+    return value
 
 
 async def redis_set(key: str, value: str, ex: int = 60) -> None:
     if _client is None:
+        _memory.set(key, value, ex=ex)
         return
     try:
         await _client.set(f"{REDIS_PREFIX}{key}", value, ex=ex)
+        REDIS_OPS.inc("set", "ok")
     except Exception:
-        pass
+        REDIS_OPS.inc("set", "error")
+    await _near_invalidate(key)
 
 
 async def redis_delete(key: str) -> None:
     if _client is None:
+        _memory.delete(key)
         return
     try:
         await _client.delete(f"{REDIS_PREFIX}{key}")
+        REDIS_OPS.inc("delete", "ok")
     except Exception:
-        pass
+        REDIS_OPS.inc("delete", "error")
+    await _near_invalidate(key)
 
 
 async def redis_incr(key: str, ex: int = 3600) -> int:
     """Increment a counter, initialising TTL on first call. Returns new value."""
     if _client is None:
-        return 0
+        return _memory.incr(key, ex=ex)
     try:
         pipe = _client.pipeline()
         full_key = f"{REDIS_PREFIX}{key}"
         await pipe.incr(full_key)
         await pipe.expire(full_key, ex)
         results = await pipe.execute()
-        return results[0]
+        REDIS_OPS.inc("incr", "ok")
     except Exception:
+        REDIS_OPS.inc("incr", "error")
         return 0
+    await _near_invalidate(key)
+    return results[0]
+
+
+async def redis_publish(channel: str, message: str) -> None:
+    if _client is None:
+        return
+    try:
+        await _client.publish(f"{REDIS_PREFIX}{channel}", message)
+        REDIS_OPS.inc("publish", "ok")
+    except Exception:
+        REDIS_OPS.inc("publish", "error")
+
+
+async def _listen(
+    channel: str,
+    handler: Callable[[str], None],
+    on_subscribe: Optional[Callable[[], None]],
+) -> None:
+    full_channel = f"{REDIS_PREFIX}{channel}"
+    while _client is not None:
+        pubsub = _client.pubsub()
+        try:
+            await pubsub.subscribe(full_channel)
+            if on_subscribe is not None:
+                on_subscribe()
+            async for message in pubsub.listen():
+                if message.get("type") == "message":
+                    try:
+                        handler(message["data"])
+                    except Exception as e:
+                        logger.warning("Redis subscriber for %s failed: %s", channel, e)
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("Redis subscription to %s dropped (%s) — retrying.", channel, e)
+            await asyncio.sleep(1)
+        finally:
+            try:
+                await pubsub.aclose()
+            except Exception:
+                pass
+
+
+def redis_subscribe(
+    channel: str,
+    handler: Callable[[str], None],
+    on_subscribe: Optional[Callable[[], None]] = None,
+) -> None:
+    """
+    Run `handler(message)` for every message on channel until close_redis(). No-op without Redis.
+    `on_subscribe` runs each time the subscription is (re)established — messages sent while it
+    was down are lost, so callers holding derived state should reset it there.
+    """
+    if _client is None:
+        return
+    task = asyncio.create_task(_listen(channel, handler, on_subscribe))
+    _subscriber_tasks.add(task)
+    task.add_done_callback(_subscriber_tasks.discard)
+
+
+async def redis_eval(script: str, keys: Sequence[str], args: Sequence) -> Optional[List]:
+    """Run a Lua script atomically (keys are prefixed). Returns None if Redis is off or errors."""
+    if _client is None:
+        return None
+    try:
+        registered = _scripts.get(script)
+        if registered is None:
+            # register_script → EVALSHA, so the script body is sent once per connection pool
+            registered = _scripts[script] = _client.register_script(script)
+        return await registered(keys=[f"{REDIS_PREFIX}{k}" for k in keys], args=list(args))
+    except Exception as e:
+        REDIS_OPS.inc("eval", "error")
+        logger.debug("Redis eval failed: %s", e)
+        return None
@@ -0,0 +1,149 @@
+"""
+Client for the Secret Manager sidecar (sidecar/main.py).
+
+With SIDECAR_ENABLED=true app env vars are stored encrypted in the sidecar
+instead of in plaintext in AppModel.env; the column then only keeps the
+variable names with masked values (so the detail endpoint can list them).
+Deploys resolve the real values at run time through resolve_app_env().
+
+One httpx.AsyncClient with a keep-alive pool is shared by the process, so a
+deploy reuses an open connection instead of paying TCP setup per call.
+Decrypted secrets are cached per worker for SECRETS_CACHE_TTL seconds; writes
+through this module invalidate the entry locally and, with Redis, in every
+other worker. Saving an env sends only the variables that changed or were
+removed (PATCH), so the sidecar re-encrypts those rather than the whole env.
+"""
+import logging
+from typing import Dict, Iterable, Optional
+
+import httpx
+from fastapi import HTTPException
+
+from app.config import Config
+from app.services.cache import LRUTTLCache
+from app.services.redis_service import redis_publish, redis_subscribe
+
+logger = logging.getLogger(__name__)
+
+MASK = "********"
+_INVALIDATE_CHANNEL = "secrets:invalidate"
+
+_client: Optional[httpx.AsyncClient] = None
+_cache = LRUTTLCache(max_entries=Config.SECRETS_CACHE_MAX_ENTRIES)
+
+
+def start_secrets_client() -> None:
+    global _client
+    if _client is None:
+        _client = httpx.AsyncClient(
+            base_url=Config.SIDECAR_URL,
+            headers={"X-Api-Key": Config.SIDECAR_API_KEY},
+            timeout=Config.SIDECAR_TIMEOUT,
+            limits=httpx.Limits(
+                max_connections=Config.SIDECAR_MAX_CONNECTIONS,
+                max_keepalive_connections=Config.SIDECAR_MAX_CONNECTIONS,
+                keepalive_expiry=60,
+            ),
+        )
+        redis_subscribe(_INVALIDATE_CHANNEL, lambda app_id: _cache.delete(int(app_id)))
+
+
+async def close_secrets_client() -> None:
+    global _client
+    if _client is not None:
+        await _client.aclose()
+        _client = None
+    _cache.clear()
+
+
+def _get_client() -> httpx.AsyncClient:
+    if _client is None:
+        raise HTTPException(status_code=500, detail="Secret store client is not running")
+    return _client
+
+
+async def _request(method: str, path: str, allow: tuple = (), **kwargs) -> httpx.Response:
+    """Call the sidecar; any non-2xx status not listed in `allow` raises 502."""
+    try:
+        response = await _get_client().request(method, path, **kwargs)
+    except httpx.HTTPError as e:
+        logger.error("Sidecar %s %s failed: %s", method, path, e)
+        raise HTTPException(status_code=502, detail="Secret store unavailable")
+    if not response.is_success and response.status_code not in allow:
+        logger.error("Sidecar %s %s returned %s: %s", method, path, response.status_code, response.text[:200])
+        raise HTTPException(status_code=502, detail="Secret store error")
+    return response
+
+
+async def _invalidate(app_id: int) -> None:
+    _cache.delete(app_id)
+    await redis_publish(_INVALIDATE_CHANNEL, str(app_id))
+
+
+async def _load_secrets(app_id: int) -> Dict[str, str]:
+    response = await _request("GET", f"/secrets/{app_id}", allow=(404,))
+    secrets = {} if response.status_code == 404 else response.json()["secrets"]
+    _cache.set(app_id, secrets, Config.SECRETS_CACHE_TTL)
+    return dict(secrets)
+
+
+async def fetch_secrets(app_id: int) -> Dict[str, str]:
+    """Decrypted env for one app ({} if none stored)."""
+    cached = _cache.get(app_id)
+    if cached is not None:
+        return dict(cached)
+    return await _load_secrets(app_id)
+
+
+async def patch_secrets(app_id: int, changes: Dict[str, Optional[str]]) -> None:
+    """Set the named variables, or remove those mapped to None; the others are not touched."""
+    await _request("PATCH", f"/secrets/{app_id}", json={"secrets": changes})
+    await _invalidate(app_id)
+
+
+async def delete_secrets(app_ids: Iterable[int]) -> None:
+    """Best-effort removal for deleted apps. Never raises."""
+    if not Config.SIDECAR_ENABLED:
+        return
+    for app_id in app_ids:
+        try:
+            await _request("DELETE", f"/secrets/{app_id}", allow=(404,))
+            await _invalidate(app_id)
+        except HTTPException as e:
+            logger.warning("Could not delete secrets for app %s: %s", app_id, e.detail)
+
+
+def masked(env: Dict[str, str]) -> Dict[str, str]:
+    """What AppModel.env keeps when values live in the sidecar."""
+    return {key: MASK for key in env}
+
+
+async def save_app_env(app, env: Dict[str, str]) -> None:
+    """Persist an app's env: into the sidecar (names only on the row) or plaintext on the row."""
+    if Config.SIDECAR_ENABLED:
+        # The sidecar stores strings only; request schemas also accept numbers and booleans
+        env = {key: str(value) for key, value in env.items()}
+        # Diff against the stored env, not the cache: a stale entry would leave wrong values behind
+        current = await _load_secrets(app.id)
+        changes: Dict[str, Optional[str]] = {key: value for key, value in env.items() if current.get(key) != value}
+        changes.update({key: None for key in current if key not in env})
+        if changes:
+            await patch_secrets(app.id, changes)
+            _cache.set(app.id, env, Config.SECRETS_CACHE_TTL)
+        app.env = masked(env)
+    else:
+        app.env = env
+
+
+async def resolve_app_env(app) -> Dict[str, str]:
+    """
+    The env to run an app with. `app.env` must be loaded (undefer(AppModel.env)).
+    Rows written before the sidecar was enabled still hold plaintext values and
+    are used as-is until the next save.
+    """
+    row_env = app.env or {}
+    if not Config.SIDECAR_ENABLED:
+        return dict(row_env)
+    secrets = await fetch_secrets(app.id)
+    legacy = {key: value for key, value in row_env.items() if value != MASK}
+    return {**legacy, **secrets}
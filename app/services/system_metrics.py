@@ -1,7 +1,19 @@
-"""System health metrics using psutil."""
+"""
+System health metrics using psutil.
+
+A background task samples the host every SYSTEM_METRICS_INTERVAL seconds and
+keeps the latest snapshot plus a short history in memory, so /admin/health
+never blocks on a CPU probe. Counters (network bytes, disk I/O) are turned
+into per-second rates by diffing consecutive samples.
+"""
 import asyncio
 import logging
+import time
+from collections import deque
 from datetime import datetime, timezone
+from typing import Deque, List, Optional
+
+from app.config import Config
 
 logger = logging.getLogger(__name__)
 
@@ -13,16 +25,54 @@ except ImportError:
 
 _start_time = datetime.now(timezone.utc)
 
+_latest: Optional[dict] = None
+_history: Deque[dict] = deque(maxlen=Config.SYSTEM_METRICS_HISTORY)
+_prev_counters: Optional[tuple] = None   # (monotonic ts, net counters, disk io counters)
+_task: Optional[asyncio.Task] = None
+
+
+def _rate(current: float, previous: float, elapsed: float) -> float:
+    # Counters can reset (interface re-created, counter wrap) — never report a negative rate
+    return round(max(current - previous, 0) / elapsed, 2) if elapsed > 0 else 0.0
+
 
 def _collect_metrics() -> dict:
+    global _prev_counters
     if not _PSUTIL_AVAILABLE:
         return {"error": "psutil not installed"}
 
-    cpu = psutil.cpu_percent(interval=0.5)
+    now = time.monotonic()
+    # interval=None compares against the previous call instead of sleeping
+    cpu = psutil.cpu_percent(interval=None)
     mem = psutil.virtual_memory()
     disk = psutil.disk_usage("/")
     net = psutil.net_io_counters()
-    uptime_seconds = (datetime.now(timezone.utc) - _start_time).total_seconds()
+    disk_io = psutil.disk_io_counters()
+
+    network = {
+        "bytes_sent_mb": round(net.bytes_sent / 1024 / 1024, 2),
+        "bytes_recv_mb": round(net.bytes_recv / 1024 / 1024, 2),
+        "sent_bytes_per_sec": 0.0,
+        "recv_bytes_per_sec": 0.0,
+    }
+    io = {
+        "read_iops": 0.0,
+        "write_iops": 0.0,
+        "read_bytes_per_sec": 0.0,
+        "write_bytes_per_sec": 0.0,
+    }
+
+    if _prev_counters is not None:
+        prev_ts, prev_net, prev_io = _prev_counters
+        elapsed = now - prev_ts
+        network["sent_bytes_per_sec"] = _rate(net.bytes_sent, prev_net.bytes_sent, elapsed)
+        network["recv_bytes_per_sec"] = _rate(net.bytes_recv, prev_net.bytes_recv, elapsed)
+        if disk_io is not None and prev_io is not None:
+            io["read_iops"] = _rate(disk_io.read_count, prev_io.read_count, elapsed)
+            io["write_iops"] = _rate(disk_io.write_count, prev_io.write_count, elapsed)
+            io["read_bytes_per_sec"] = _rate(disk_io.read_bytes, prev_io.read_bytes, elapsed)
+            io["write_bytes_per_sec"] = _rate(disk_io.write_bytes, prev_io.write_bytes, elapsed)
+    _prev_counters = (now, net, disk_io)
 
     return {
         "cpu": {
@@ -41,13 +91,61 @@ def _collect_metrics() -> dict:
             "used_gb": round(disk.used / 1024 / 1024 / 1024, 2),
             "percent": disk.percent,
         },
-        "network": {
-            "bytes_sent_mb": round(net.bytes_sent / 1024 / 1024, 2),
-            "bytes_recv_mb": round(net.bytes_recv / 1024 / 1024, 2),
-        },
-        "uptime_seconds": round(uptime_seconds),
+        "disk_io": io,
+        "network": network,
+        "sampled_at": datetime.now(timezone.utc).isoformat(),
     }
 
 
+def _store(snapshot: dict) -> None:
+    global _latest
+    _latest = snapshot
+    _history.append(snapshot)
+
+
+async def _sampler_loop() -> None:
+    while True:
+        try:
+            _store(await asyncio.to_thread(_collect_metrics))
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.warning("System metrics sample failed: %s", e)
+        await asyncio.sleep(Config.SYSTEM_METRICS_INTERVAL)
+
+
+def start_system_metrics() -> None:
+    global _task
+    if _task is None and _PSUTIL_AVAILABLE:
+        _task = asyncio.create_task(_sampler_loop())
+        logger.info("System metrics sampler started (every %ss).", Config.SYSTEM_METRICS_INTERVAL)
+
+
+async def stop_system_metrics() -> None:
+    global _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except (asyncio.CancelledError, Exception):
+            pass
+        _task = None
+
+
+def _uptime_seconds() -> int:
+    return round((datetime.now(timezone.utc) - _start_time).total_seconds())
+
+
 async def get_system_metrics() -> dict:
-    return await asyncio.to_thread(_collect_metrics)
+    """Latest host snapshot — a memory read once the sampler is running."""
+    snapshot = _latest
+    if snapshot is None:
+        # Sampler not started (or first tick pending) — take one non-blocking sample
+        snapshot = await asyncio.to_thread(_collect_metrics)
+        if "error" not in snapshot:
+            _store(snapshot)
+    return {**snapshot, "uptime_seconds": _uptime_seconds()}
+
+
+def get_system_metrics_history() -> List[dict]:
+    return list(_history)
@@ -0,0 +1,66 @@
+"""
+App teardown — removes an app's container, images, workspace and logs.
+
+Bulk deletes (a user's apps, DELETE /admin/apps?ids=) fan the per-app work out
+over worker threads, at most TEARDOWN_CONCURRENCY at a time, and remove all
+Nginx configs with a single reload at the end. Each app's steps stay ordered
+(container before image); different apps are independent.
+"""
+import asyncio
+import logging
+import shutil
+from dataclasses import dataclass, field
+from pathlib import Path
+from typing import Dict, Iterable, List
+
+from app.config import Config
+from app.services.docker import docker_container_exists, docker_remove_container, docker_remove_image
+from app.services.nginx_manager import remove_app_confs
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass
+class TeardownResult:
+    removed: List[int] = field(default_factory=list)
+    failed: Dict[int, Exception] = field(default_factory=dict)
+
+
+def remove_docker_artifacts(app_id: int) -> None:
+    """Remove the app's container (if any) and every tag of its image. Blocking."""
+    container_name = f"app_{app_id}_container"
+    container_id = docker_container_exists(container_name)
+    if container_id:
+        docker_remove_container(container_name, container_id)
+    docker_remove_image(f"app_{app_id}_image")
+
+
+def _teardown_app(app_id: int) -> None:
+    remove_docker_artifacts(app_id)
+    for directory in (Path(Config.BASE_APPS_DIR) / f"app-{app_id}", Config.BASE_LOGS_DIR / f"app-{app_id}"):
+        if directory.exists():
+            shutil.rmtree(directory)
+
+
+async def teardown_apps(app_ids: Iterable[int]) -> TeardownResult:
+    """
+    Tear down every app in parallel (bounded). Never raises — apps whose teardown
+    failed are reported in `failed` and should be kept in the database.
+    Nginx configs are removed only for apps that were torn down.
+    """
+    result = TeardownResult()
+    semaphore = asyncio.Semaphore(max(1, Config.TEARDOWN_CONCURRENCY))
+
+    async def one(app_id: int) -> None:
+        async with semaphore:
+            try:
+                await asyncio.to_thread(_teardown_app, app_id)
+            except Exception as e:
+                logger.error("Teardown failed for app %s: %s", app_id, e)
+                result.failed[app_id] = e
+            else:
+                result.removed.append(app_id)
+
+    await asyncio.gather(*(one(app_id) for app_id in app_ids))
+    await remove_app_confs(result.removed)
+    return result
@@ -1,6 +1,15 @@
+import asyncio
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Optional
+
 from passlib.context import CryptContext
+from fastapi import HTTPException
 from fastapi.security import OAuth2PasswordBearer
 
+from app.config import Config
+
 bcrypt_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
 oauth2_bearer = OAuth2PasswordBearer(tokenUrl="/api/login")
 
@@ -9,3 +18,73 @@ def hash_password(password: str) -> str:
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     return bcrypt_context.verify(plain_password, hashed_password)
+
+
+# ── Async password hashing ────────────────────────────────────────────────────
+# bcrypt costs ~100-300ms of CPU per call. Running it inline in an async
+# handler stalls every other request on the worker, so handlers use the
+# *_async variants, which run in a dedicated process pool. At most
+# PASSWORD_HASH_QUEUE calls may be queued or running; beyond that callers
+# get 503 instead of building an unbounded backlog. If a worker dies (OOM
+# kill, crash) the pool is broken for good, so it is replaced and the job
+# retried once.
+
+_password_pool: Optional[ProcessPoolExecutor] = None
+_pending = 0
+
+
+def _get_password_pool() -> Optional[ProcessPoolExecutor]:
+    global _password_pool
+    if _password_pool is None and Config.PASSWORD_HASH_WORKERS > 0:
+        # spawn: never fork a process that has a running event loop and threads
+        _password_pool = ProcessPoolExecutor(
+            max_workers=Config.PASSWORD_HASH_WORKERS,
+            mp_context=multiprocessing.get_context("spawn"),
+        )
+    return _password_pool
+
+
+def shutdown_password_pool() -> None:
+    global _password_pool
+    if _password_pool is not None:
+        _password_pool.shutdown(wait=False, cancel_futures=True)
+        _password_pool = None
+
+
+def _discard_password_pool(pool: ProcessPoolExecutor) -> None:
+    """Drop a broken pool so the next call builds a new one (unless a concurrent caller already did)."""
+    global _password_pool
+    if _password_pool is pool:
+        _password_pool = None
+    pool.shutdown(wait=False, cancel_futures=True)
+
+
+async def _run_password_job(fn, *args):
+    global _pending
+    if _pending >= Config.PASSWORD_HASH_QUEUE:
+        raise HTTPException(
+            status_code=503,
+            detail="Server busy, please retry",
+            headers={"Retry-After": "1"},
+        )
+    _pending += 1
+    try:
+        pool = _get_password_pool()
+        if pool is None:
+            # PASSWORD_HASH_WORKERS=0 — bcrypt releases the GIL, so a thread still frees the loop
+            return await asyncio.to_thread(fn, *args)
+        try:
+            return await asyncio.get_running_loop().run_in_executor(pool, fn, *args)
+        except BrokenProcessPool:
+            _discard_password_pool(pool)
+            return await asyncio.get_running_loop().run_in_executor(_get_password_pool(), fn, *args)
+    finally:
+        _pending -= 1
+
+
+async def hash_password_async(password: str) -> str:
+    return await _run_password_job(hash_password, password)
+
+
+async def verify_password_async(plain_password: str, hashed_password: str) -> bool:
+    return await _run_password_job(verify_password, plain_password, hashed_password)
@@ -1,12 +1,23 @@
 import api
 import logging
 from contextlib import asynccontextmanager
-from fastapi import FastAPI
+import secrets
+from fastapi import FastAPI, Request, HTTPException
+from fastapi.responses import PlainTextResponse
 from app.Errors.app_errors import AppBaseError
 from app.Errors.exception_handler import app_error_handler
-from app.database import engine, Base
+from app.database import engine, Base, dispose_engines
 from app.config import Config
 from app.services.redis_service import init_redis, close_redis
+from app.services.auth import start_auth_cache_listener
+from app.utils import shutdown_password_pool
+from app.services.metrics import MetricsMiddleware, render_metrics, CONTENT_TYPE
+from app.services.rate_limiter import RateLimitMiddleware
+from app.services.container_metrics import start_container_metrics, stop_container_metrics
+from app.services.system_metrics import start_system_metrics, stop_system_metrics
+from app.services.email_outbox import start_email_outbox, stop_email_outbox
+from app.services.app_purger import start_app_purger, stop_app_purger
+from app.services.secrets_client import start_secrets_client, close_secrets_client
 from fastapi.middleware.cors import CORSMiddleware
 
 
@@ -19,10 +30,24 @@ async def lifespan(app: FastAPI):
     Config.BASE_APPS_DIR.mkdir(parents=True, exist_ok=True)
     if Config.REDIS_ENABLED:
         await init_redis(Config.REDIS_URL)
+        start_auth_cache_listener()
+    if Config.SIDECAR_ENABLED:
+        start_secrets_client()
+    start_email_outbox()
+    await start_app_purger()
+    start_system_metrics()
+    if Config.CONTAINER_METRICS_ENABLED:
+        start_container_metrics()
     yield
     # Shutdown
+    await stop_container_metrics()
+    await stop_system_metrics()
+    await stop_email_outbox()
+    await stop_app_purger()
+    await close_secrets_client()
     await close_redis()
-    await engine.dispose()
+    shutdown_password_pool()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -32,14 +57,21 @@ app = FastAPI(
     lifespan=lifespan,
 )
 
+if Config.RATE_LIMIT_ENABLED:
+    app.add_middleware(RateLimitMiddleware)
+
 app.add_middleware(
     CORSMiddleware,
     allow_origins=Config.CORS_ORIGINS,
     allow_credentials=True,
     allow_methods=["GET", "POST", "PUT", "PATCH", "DELETE", "OPTIONS"],
-    allow_headers=["Authorization", "Content-Type"],
+    allow_headers=["Authorization", "Content-Type", "If-None-Match"],
+    expose_headers=["Retry-After", "ETag"],
 )
 
+if Config.METRICS_ENABLED:
+    app.add_middleware(MetricsMiddleware)
+
 app.include_router(api.router, prefix="/api")
 app.add_exception_handler(AppBaseError, app_error_handler)
 
@@ -52,3 +84,14 @@ logging.basicConfig(
 @app.get("/", tags=["health"])
 async def health():
     return {"status": "healthy", "version": "1.0.0"}
+
+
+@app.get("/metrics", tags=["health"], include_in_schema=False)
+async def metrics(request: Request):
+    if not Config.METRICS_ENABLED:
+        raise HTTPException(status_code=404, detail="Not Found")
+    if Config.METRICS_TOKEN:
+        supplied = request.headers.get("Authorization", "").removeprefix("Bearer ").strip()
+        if not secrets.compare_digest(supplied, Config.METRICS_TOKEN):
+            raise HTTPException(status_code=401, detail="Invalid metrics token")
+    return PlainTextResponse(render_metrics(), media_type=CONTENT_TYPE)
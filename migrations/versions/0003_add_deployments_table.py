@@ -0,0 +1,65 @@
+"""Add deployments table for deploy history and per-stage timings
+
+Revision ID: 0003
+Revises: 0002
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+import sqlalchemy as sa
+from alembic import op
+
+revision: str = "0003"
+down_revision: Union[str, None] = "0002"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_table(
+        "deployments",
+        sa.Column("id", sa.Integer(), autoincrement=True, nullable=False),
+        sa.Column("app_id", sa.Integer(), nullable=False),
+        sa.Column("user_id", sa.Integer(), nullable=True),
+        sa.Column(
+            "trigger",
+            sa.Enum("manual", "force_rebuild", name="deploytrigger"),
+            nullable=False,
+        ),
+        sa.Column(
+            "status",
+            sa.Enum("running", "succeeded", "failed", name="deploymentstatus"),
+            nullable=False,
+        ),
+        sa.Column("branch", sa.String(), nullable=True),
+        sa.Column("commit_sha", sa.String(length=40), nullable=True),
+        sa.Column("image_tag", sa.String(), nullable=True),
+        sa.Column("error_code", sa.String(), nullable=True),
+        sa.Column("error_detail", sa.Text(), nullable=True),
+        sa.Column("clone_ms", sa.Integer(), nullable=True),
+        sa.Column("build_ms", sa.Integer(), nullable=True),
+        sa.Column("port_ms", sa.Integer(), nullable=True),
+        sa.Column("run_ms", sa.Integer(), nullable=True),
+        sa.Column("nginx_ms", sa.Integer(), nullable=True),
+        sa.Column("total_ms", sa.Integer(), nullable=True),
+        sa.Column("started_at", sa.DateTime(timezone=True), nullable=True),
+        sa.Column("finished_at", sa.DateTime(timezone=True), nullable=True),
+        sa.ForeignKeyConstraint(["app_id"], ["apps.id"], ondelete="CASCADE"),
+        sa.PrimaryKeyConstraint("id"),
+    )
+    op.create_index(op.f("ix_deployments_id"), "deployments", ["id"], unique=False)
+    op.create_index("ix_deployments_app_id_id", "deployments", ["app_id", "id"], unique=False)
+    op.create_index(
+        "ix_deployments_status_started_at", "deployments", ["status", "started_at"], unique=False
+    )
+
+
+def downgrade() -> None:
+    op.drop_index("ix_deployments_status_started_at", table_name="deployments")
+    op.drop_index("ix_deployments_app_id_id", table_name="deployments")
+    op.drop_index(op.f("ix_deployments_id"), table_name="deployments")
+    op.drop_table("deployments")
+
+    sa.Enum(name="deploymentstatus").drop(op.get_bind())
+    sa.Enum(name="deploytrigger").drop(op.get_bind())
@@ -0,0 +1,23 @@
+"""Index apps.status for health aggregates and status filters
+
+Revision ID: 0004
+Revises: 0003
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0004"
+down_revision: Union[str, None] = "0003"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    op.create_index(op.f("ix_apps_status"), "apps", ["status"], unique=False)
+
+
+def downgrade() -> None:
+    op.drop_index(op.f("ix_apps_status"), table_name="apps")
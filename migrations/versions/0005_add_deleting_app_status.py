@@ -0,0 +1,27 @@
+"""Add the 'deleting' app status used by asynchronous app deletion
+
+Revision ID: 0005
+Revises: 0004
+Create Date: 2026-10-19
+
+"""
+from typing import Sequence, Union
+
+from alembic import op
+
+revision: str = "0005"
+down_revision: Union[str, None] = "0004"
+branch_labels: Union[str, Sequence[str], None] = None
+depends_on: Union[str, Sequence[str], None] = None
+
+
+def upgrade() -> None:
+    # SQLite stores the enum as plain text; only Postgres has a native type to extend
+    if op.get_bind().dialect.name == "postgresql":
+        with op.get_context().autocommit_block():
+            op.execute("ALTER TYPE appstatus ADD VALUE IF NOT EXISTS 'deleting'")
+
+
+def downgrade() -> None:
+    # Postgres cannot drop a value from an enum type; an unused extra value is harmless
+    pass
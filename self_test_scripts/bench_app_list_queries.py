@@ -0,0 +1,117 @@
+"""
+Benchmark: app list queries with full ORM hydration vs. column projection.
+
+Seeds a throwaway SQLite database with N_APPS apps (each carrying an
+ENV_BYTES-sized env JSON, like apps with many variables), then for each
+strategy measures
+
+  * page latency — mean/p99 over PAGES keyset pages of PAGE_SIZE rows
+  * bulk fetch   — time and peak Python memory (tracemalloc) to read
+                   BULK_ROWS rows at once, as an export or admin scan would
+
+"orm + env" is the old behaviour (select(AppModel) with env loaded),
+"orm" is select(AppModel) now that env is deferred, and "columns" is the
+projected select the list endpoints use.
+
+Run from the repo root:  python -m self_test_scripts.bench_app_list_queries
+"""
+import asyncio
+import os
+import statistics
+import tempfile
+import time
+import tracemalloc
+
+from sqlalchemy import insert, select
+from sqlalchemy.ext.asyncio import async_sessionmaker, create_async_engine
+from sqlalchemy.orm import undefer
+
+from app.database import Base
+from app.models import AppModel, Users
+from app.constants import AppStatus
+
+N_APPS = 100_000
+ENV_BYTES = 2_000
+PAGE_SIZE = 50
+PAGES = 200
+BULK_ROWS = 20_000
+
+_COLUMNS = (
+    AppModel.id, AppModel.name, AppModel.subdomain, AppModel.container_port, AppModel.repo_url,
+    AppModel.build_path, AppModel.branch, AppModel.status, AppModel.updated_at,
+)
+
+
+def _strategies():
+    return {
+        "orm + env": lambda: select(AppModel).options(undefer(AppModel.env)),
+        "orm": lambda: select(AppModel),
+        "columns": lambda: select(*_COLUMNS),
+    }
+
+
+async def _seed(engine) -> None:
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        await conn.execute(insert(Users), [{"username": "bench", "email": "bench@x.io", "hashed_password": "x"}])
+        env = {f"VAR_{i}": "v" * 40 for i in range(ENV_BYTES // 50)}
+        statuses = list(AppStatus)
+        batch = []
+        for i in range(1, N_APPS + 1):
+            batch.append({
+                "name": f"app{i}", "subdomain": f"app-{i}", "repo_url": "https://github.com/acme/service",
+                "container_port": 8000, "status": statuses[i % len(statuses)], "env": env, "user_id": 1,
+            })
+            if len(batch) == 5_000:
+                await conn.execute(insert(AppModel), batch)
+                batch = []
+
+
+async def _fetch(session, query, scalars: bool):
+    result = await session.execute(query)
+    return result.scalars().all() if scalars else result.all()
+
+
+async def _bench(sessionmaker, label: str, make_query) -> None:
+    scalars = label != "columns"
+    latencies = []
+    async with sessionmaker() as session:
+        last_id = 0
+        for _ in range(PAGES):
+            start = time.perf_counter()
+            rows = await _fetch(
+                session, make_query().where(AppModel.id > last_id).order_by(AppModel.id).limit(PAGE_SIZE), scalars,
+            )
+            latencies.append(time.perf_counter() - start)
+            last_id = rows[-1].id
+            session.expunge_all()
+
+    async with sessionmaker() as session:
+        tracemalloc.start()
+        start = time.perf_counter()
+        rows = await _fetch(session, make_query().order_by(AppModel.id).limit(BULK_ROWS), scalars)
+        bulk = time.perf_counter() - start
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+        del rows
+
+    lat = sorted(latencies)
+    print(
+        f"{label:<10} page mean {statistics.mean(lat) * 1e3:6.2f}ms  p99 {lat[int(len(lat) * 0.99)] * 1e3:6.2f}ms   "
+        f"bulk {BULK_ROWS:,} rows {bulk * 1e3:7.0f}ms  peak {peak / 2**20:6.1f} MiB"
+    )
+
+
+async def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        engine = create_async_engine(f"sqlite+aiosqlite:///{os.path.join(tmp, 'bench.db')}")
+        print(f"Seeding {N_APPS:,} apps ...")
+        await _seed(engine)
+        sessionmaker = async_sessionmaker(engine, expire_on_commit=False)
+        for label, make_query in _strategies().items():
+            await _bench(sessionmaker, label, make_query)
+        await engine.dispose()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
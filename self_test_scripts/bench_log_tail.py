@@ -0,0 +1,69 @@
+"""
+Benchmark: tail of a Docker json-file log, backward block reads vs. a forward scan.
+
+Writes a LOG_MB json-file log (plus one rotated file) to a temp dir and, for a
+few `tail` sizes, times read_tail() — which seeks to the end and reads blocks
+backwards — against reading every line from the start and keeping the last N.
+
+Run from the repo root:  python -m self_test_scripts.bench_log_tail
+"""
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+
+from app.services.container_logs import read_tail
+
+LOG_MB = 100
+TAILS = (10, 100, 1000, 10000)
+
+
+def _write_log(path: str, size: int, start: datetime) -> datetime:
+    ts = start
+    written = 0
+    with open(path, "w") as f:
+        while written < size:
+            ts += timedelta(microseconds=1500)
+            line = json.dumps({
+                "log": f"GET /api/items?page={written % 997} 200 {written % 31}ms\n",
+                "stream": "stdout",
+                "time": ts.strftime("%Y-%m-%dT%H:%M:%S.%f") + "123Z",
+            }) + "\n"
+            f.write(line)
+            written += len(line)
+    return ts
+
+
+def _forward_scan(paths, n):
+    last = deque(maxlen=n)
+    for path in paths:
+        with open(path, "rb") as f:
+            for raw in f:
+                last.append(json.loads(raw))
+    return list(last)
+
+
+def main() -> None:
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "container-json.log")
+        start = datetime(2024, 1, 1, tzinfo=timezone.utc)
+        mid = _write_log(path + ".1", 10 * 1024 * 1024, start)
+        _write_log(path, LOG_MB * 1024 * 1024, mid)
+        print(f"log: {os.path.getsize(path) / 1e6:.0f}MB + {os.path.getsize(path + '.1') / 1e6:.0f}MB rotated")
+
+        for n in TAILS:
+            t0 = time.perf_counter()
+            lines, _ = read_tail(Path(path), n)
+            t_tail = time.perf_counter() - t0
+            assert len(lines) == n
+            t0 = time.perf_counter()
+            _forward_scan([path + ".1", path], n)
+            t_scan = time.perf_counter() - t0
+            print(f"tail={n:<6} backward {t_tail * 1e3:8.2f}ms   forward scan {t_scan * 1e3:8.0f}ms   x{t_scan / t_tail:7.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,66 @@
+"""
+Benchmark: login-style bcrypt verification inline vs. in the process pool.
+
+For each mode, fires CONCURRENT verify calls and meanwhile runs a "probe"
+coroutine that stands in for any other endpoint — it wakes every 10ms and
+records how late it was. Inline bcrypt shows probe p99 ≈ one bcrypt call;
+the pool keeps it flat while throughput scales with workers.
+
+Run from the repo root:  python -m self_test_scripts.bench_password_pool
+"""
+import asyncio
+import os
+import statistics
+import time
+
+from app.config import Config
+import app.utils as utils
+
+CONCURRENT = 64
+PROBE_INTERVAL = 0.01
+
+
+async def _probe(lags: list, stop: asyncio.Event) -> None:
+    while not stop.is_set():
+        start = time.perf_counter()
+        await asyncio.sleep(PROBE_INTERVAL)
+        lags.append(time.perf_counter() - start - PROBE_INTERVAL)
+
+
+async def _run(mode: str, hashed: str) -> None:
+    lags: list = []
+    stop = asyncio.Event()
+    probe = asyncio.create_task(_probe(lags, stop))
+    await asyncio.sleep(0)
+
+    start = time.perf_counter()
+    if mode == "inline":
+        async def one():
+            utils.verify_password("correct horse", hashed)
+    else:
+        async def one():
+            await utils.verify_password_async("correct horse", hashed)
+    await asyncio.gather(*(one() for _ in range(CONCURRENT)))
+    elapsed = time.perf_counter() - start
+
+    stop.set()
+    await probe
+    # Inline bcrypt starves the probe entirely — its single sample is the whole run
+    p99 = (statistics.quantiles(lags, n=100)[98] if len(lags) >= 2 else max(lags, default=0)) * 1000
+    print(f"{mode:>10}: {CONCURRENT / elapsed:7.1f} logins/s   probe p99 lag {p99:8.1f} ms")
+
+
+async def main() -> None:
+    hashed = utils.hash_password("correct horse")
+    Config.PASSWORD_HASH_QUEUE = CONCURRENT
+    await _run("inline", hashed)
+    for workers in sorted({1, 2, os.cpu_count() or 1}):
+        utils.shutdown_password_pool()
+        Config.PASSWORD_HASH_WORKERS = workers
+        await utils.verify_password_async("warm-up", hashed)  # spawn workers outside the timing
+        await _run(f"pool={workers}", hashed)
+    utils.shutdown_password_pool()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
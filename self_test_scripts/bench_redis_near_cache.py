@@ -0,0 +1,90 @@
+"""
+Benchmark: redis_get against plain Redis vs. with the per-worker near cache.
+
+Writes HOT_KEYS keys, then issues READS reads drawn from them with a skewed,
+hot-key distribution from CONCURRENCY tasks, and reports throughput, latency
+percentiles and the near-cache hit ratio for each mode. Finally it simulates
+a write from another worker (direct SET plus its invalidation message) and
+measures how long until the new value is served — it should be milliseconds,
+not REDIS_NEAR_CACHE_TTL.
+
+Needs a reachable Redis at REDIS_URL.
+Run from the repo root:  python -m self_test_scripts.bench_redis_near_cache
+"""
+import asyncio
+import random
+import statistics
+import time
+
+from app.config import Config
+import app.services.redis_service as rs
+
+HOT_KEYS = 200
+READS = 20_000
+CONCURRENCY = 32
+
+
+async def _run(label: str) -> None:
+    keys = [f"bench:near:{i}" for i in range(HOT_KEYS)]
+    for key in keys:
+        await rs.redis_set(key, "x" * 64, ex=300)
+
+    # Zipf-like skew: a few keys take most of the traffic
+    weights = [1 / (i + 1) for i in range(HOT_KEYS)]
+    plan = random.choices(keys, weights=weights, k=READS)
+    latencies: list = []
+
+    async def reader(chunk):
+        for key in chunk:
+            start = time.perf_counter()
+            await rs.redis_get(key)
+            latencies.append(time.perf_counter() - start)
+
+    per_task = READS // CONCURRENCY
+    before = dict(rs.NEAR_CACHE_OPS._values)
+    start = time.perf_counter()
+    await asyncio.gather(*(reader(plan[i * per_task:(i + 1) * per_task]) for i in range(CONCURRENCY)))
+    elapsed = time.perf_counter() - start
+
+    hits = rs.NEAR_CACHE_OPS._values.get(("hit",), 0) - before.get(("hit",), 0)
+    misses = rs.NEAR_CACHE_OPS._values.get(("miss",), 0) - before.get(("miss",), 0)
+    lat = sorted(latencies)
+    print(
+        f"{label:<12} {len(lat) / elapsed:>10,.0f} reads/s   "
+        f"p50 {statistics.median(lat) * 1e6:>7.0f}µs   p99 {lat[int(len(lat) * 0.99)] * 1e6:>7.0f}µs   "
+        f"hit ratio {hits / (hits + misses) if hits + misses else 0:.1%}"
+    )
+    for key in keys:
+        await rs.redis_delete(key)
+
+
+async def main() -> None:
+    for enabled, label in ((False, "plain redis"), (True, "near cache")):
+        Config.REDIS_NEAR_CACHE_ENABLED = enabled
+        await rs.init_redis(Config.REDIS_URL)
+        if rs._client is None:
+            print(f"Redis not reachable at {Config.REDIS_URL}")
+            return
+        await asyncio.sleep(0.1)  # let the invalidation subscription attach
+        await _run(label)
+        await rs.close_redis()
+
+    # Staleness: a write from another worker must evict our copy well before the TTL
+    Config.REDIS_NEAR_CACHE_ENABLED = True
+    await rs.init_redis(Config.REDIS_URL)
+    await asyncio.sleep(0.1)
+    await rs.redis_set("bench:near:stale", "old", ex=60)
+    await rs.redis_get("bench:near:stale")
+    await rs._client.set(f"{rs.REDIS_PREFIX}bench:near:stale", "new", ex=60)
+    await rs.redis_publish(rs._NEAR_CHANNEL, "other-worker bench:near:stale")
+    start = time.perf_counter()
+    while await rs.redis_get("bench:near:stale") != "new":
+        await asyncio.sleep(0.001)
+    print(f"remote write visible after {(time.perf_counter() - start) * 1e3:.1f}ms "
+          f"(bound {Config.REDIS_NEAR_CACHE_TTL:.0f}s)")
+    await rs.redis_delete("bench:near:stale")
+    await rs.close_redis()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,103 @@
+"""
+Benchmark: per-app sidecar calls vs. /secrets:batchGet and /secrets:batchPut.
+
+Runs the sidecar in-process against a throwaway SQLite database (through
+httpx's ASGI transport, so HTTP parsing and validation are included but not
+network latency — real round trips make the per-app numbers worse) and, for
+N_APPS apps, measures
+
+  * put  — N_APPS × POST /secrets/{id}  vs. POST /secrets:batchPut
+  * get  — N_APPS × GET  /secrets/{id}  vs. POST /secrets:batchGet
+
+(one batch call with the default SIDECAR_BATCH_MAX_ITEMS; more if it is set lower)
+
+for a small env (SMALL_VARS variables) and a large one (LARGE_VARS), the
+latter crossing SIDECAR_BATCH_PARALLEL_BYTES so decryption runs in threads.
+
+Run from the repo root:  python -m self_test_scripts.bench_sidecar_batch
+"""
+import asyncio
+import os
+import tempfile
+import time
+
+N_APPS = 1_000
+SMALL_VARS = 10
+LARGE_VARS = 200
+API_KEY = "bench"
+
+
+def _env(n_vars: int, app_id: int) -> dict:
+    return {f"VAR_{i}": f"value-{app_id}-{i}-" + "x" * 24 for i in range(n_vars)}
+
+
+async def _timed(coro) -> float:
+    start = time.perf_counter()
+    await coro
+    return time.perf_counter() - start
+
+
+async def _bench(client, label: str, n_vars: int) -> None:
+    from sidecar.config import SidecarConfig
+
+    app_ids = list(range(1, N_APPS + 1))
+    payloads = {app_id: _env(n_vars, app_id) for app_id in app_ids}
+    # Stay within the sidecar's SIDECAR_BATCH_MAX_ITEMS, whatever it is set to
+    step = SidecarConfig.BATCH_MAX_ITEMS
+    chunks = [app_ids[i:i + step] for i in range(0, N_APPS, step)]
+
+    async def put_single():
+        for app_id in app_ids:
+            (await client.post(f"/secrets/{app_id}", json={"secrets": payloads[app_id]})).raise_for_status()
+
+    async def put_batch():
+        for chunk in chunks:
+            items = [{"app_id": app_id, "secrets": payloads[app_id]} for app_id in chunk]
+            (await client.post("/secrets:batchPut", json={"items": items})).raise_for_status()
+
+    async def get_single():
+        for app_id in app_ids:
+            (await client.get(f"/secrets/{app_id}")).raise_for_status()
+
+    async def get_batch():
+        found = 0
+        for chunk in chunks:
+            response = await client.post("/secrets:batchGet", json={"app_ids": chunk})
+            response.raise_for_status()
+            found += len(response.json()["secrets"])
+        assert found == N_APPS
+
+    for op, single, batch in (("put", put_single, put_batch), ("get", get_single, get_batch)):
+        t_single = await _timed(single())
+        t_batch = await _timed(batch())
+        print(
+            f"{label:<6} {op}  per-app {t_single * 1e3:7.0f}ms ({N_APPS / t_single:7.0f} apps/s)   "
+            f"batch {t_batch * 1e3:6.0f}ms ({N_APPS / t_batch:7.0f} apps/s)   x{t_single / t_batch:5.1f}"
+        )
+
+
+async def main() -> None:
+    import httpx
+    from cryptography.fernet import Fernet
+
+    with tempfile.TemporaryDirectory() as tmp:
+        os.environ.update(
+            SIDECAR_DB_PATH=os.path.join(tmp, "secrets.db"),
+            SIDECAR_API_KEY=API_KEY,
+            SIDECAR_ENCRYPTION_KEY=Fernet.generate_key().decode(),
+        )
+        import logging
+        from sidecar.main import app, lifespan
+        logging.disable(logging.INFO)
+
+        async with lifespan(app):
+            transport = httpx.ASGITransport(app=app)
+            async with httpx.AsyncClient(
+                transport=transport, base_url="http://sidecar", headers={"X-Api-Key": API_KEY},
+            ) as client:
+                await _bench(client, "small", SMALL_VARS)
+                await _bench(client, "large", LARGE_VARS)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,75 @@
+"""
+Self-test: the email outbox against a local SMTP stand-in.
+
+Starts an aiosmtpd server in-process (plain SMTP, no TLS, no AUTH — the same
+as `python -m aiosmtpd -n`), points Config at it with SMTP_USE_SSL=false and
+no SMTP_PASSWORD, then queues N_MESSAGES OTP emails through
+CommunicationBuilder.enqueue() and the synchronous send(). Every message must
+arrive. With a password set, open_smtp() must refuse the same server instead
+of sending the credentials (or the mail) over an unencrypted connection.
+
+Needs aiosmtpd (`pip install aiosmtpd`).
+Run from the repo root:  python -m self_test_scripts.smtp_standin
+"""
+import asyncio
+import smtplib
+import time
+
+from app.config import Config
+from app.services import email_outbox
+from app.services.CommunicationBuilder import CommunicationBuilder, OtpTemplate
+
+N_MESSAGES = 20
+PORT = 8025
+
+
+class _Inbox:
+    def __init__(self):
+        self.recipients = []
+
+    async def handle_DATA(self, server, session, envelope):
+        self.recipients.extend(envelope.rcpt_tos)
+        return "250 Message accepted for delivery"
+
+
+async def main() -> None:
+    from aiosmtpd.controller import Controller
+
+    inbox = _Inbox()
+    controller = Controller(inbox, hostname="127.0.0.1", port=PORT)
+    controller.start()
+    Config.SMTP_HOST, Config.SMTP_PORT, Config.SMTP_USE_SSL = "127.0.0.1", PORT, False
+    Config.SMTP_EMAIL, Config.SMTP_PASSWORD = "noreply@gitdeploy.local", ""
+    try:
+        email_outbox.start_email_outbox()
+        start = time.perf_counter()
+        for i in range(N_MESSAGES):
+            CommunicationBuilder(f"user{i}@example.com", OtpTemplate(), {"otp": f"{i:06d}"}).enqueue()
+        await email_outbox.stop_email_outbox(drain_timeout=10)
+        elapsed = time.perf_counter() - start
+
+        await asyncio.to_thread(
+            CommunicationBuilder("direct@example.com", OtpTemplate(), {"otp": "123456"}).send
+        )
+
+        Config.SMTP_PASSWORD = "app-password"
+        try:
+            await asyncio.to_thread(email_outbox.open_smtp)
+        except smtplib.SMTPNotSupportedError:
+            refused = True
+        else:
+            refused = False
+    finally:
+        controller.stop()
+
+    expected = {f"user{i}@example.com" for i in range(N_MESSAGES)} | {"direct@example.com"}
+    missing = expected - set(inbox.recipients)
+    print(f"outbox: {N_MESSAGES} queued, delivered in {elapsed * 1e3:.0f}ms; send(): ok")
+    print(f"received {len(inbox.recipients)} message(s), missing: {sorted(missing) or 'none'}")
+    print(f"password over plain SMTP without AUTH: {'refused' if refused else 'NOT refused'}")
+    if missing or not refused:
+        raise SystemExit(1)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -8,7 +8,18 @@ load_dotenv()
 class SidecarConfig:
     API_KEY: str = os.getenv("SIDECAR_API_KEY", secrets.token_hex(32))
     ENCRYPTION_KEY: str = os.getenv("SIDECAR_ENCRYPTION_KEY", "")  # Must be set in production
+    # Comma-separated older keys, kept while rows may still be encrypted under them
+    PREVIOUS_ENCRYPTION_KEY: str = os.getenv("SIDECAR_PREVIOUS_ENCRYPTION_KEY", "")
     DB_PATH: str = os.getenv("SIDECAR_DB_PATH", "/opt/secrets/secrets.db")
+    SQLITE_READ_POOL_SIZE: int = int(os.getenv("SIDECAR_SQLITE_READ_POOL_SIZE", "4"))
+    SQLITE_BUSY_TIMEOUT_MS: int = int(os.getenv("SIDECAR_SQLITE_BUSY_TIMEOUT_MS", "5000"))
+    SQLITE_CACHE_SIZE_KB: int = int(os.getenv("SIDECAR_SQLITE_CACHE_SIZE_KB", "8192"))
+    SQLITE_MMAP_SIZE: int = int(os.getenv("SIDECAR_SQLITE_MMAP_SIZE", str(64 * 1024 * 1024)))
+    BATCH_MAX_ITEMS: int = int(os.getenv("SIDECAR_BATCH_MAX_ITEMS", "1000"))
+    # Batches with more ciphertext than this are en/decrypted in worker threads
+    BATCH_PARALLEL_BYTES: int = int(os.getenv("SIDECAR_BATCH_PARALLEL_BYTES", str(256 * 1024)))
+    BATCH_PARALLEL_CHUNKS: int = int(os.getenv("SIDECAR_BATCH_PARALLEL_CHUNKS", "4"))
+    ROTATION_CHUNK_SIZE: int = int(os.getenv("SIDECAR_ROTATION_CHUNK_SIZE", "200"))
     HOST: str = os.getenv("SIDECAR_HOST", "0.0.0.0")
     PORT: int = int(os.getenv("SIDECAR_PORT", "8001"))
     ALLOWED_ORIGINS: list[str] = ["http://localhost:8000", "http://127.0.0.1:8000"]
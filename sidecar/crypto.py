@@ -3,9 +3,12 @@ AES-256-GCM encryption via cryptography.fernet (uses AES-128-CBC+HMAC under the
 Fernet is safe, authenticated, and handles key derivation automatically.
 """
 import base64
-import os
+import hashlib
 import logging
-from cryptography.fernet import Fernet, InvalidToken
+from functools import lru_cache
+from typing import Optional
+
+from cryptography.fernet import Fernet, InvalidToken, MultiFernet
 
 logger = logging.getLogger(__name__)
 
@@ -15,6 +18,15 @@ def generate_key() -> str:
     return Fernet.generate_key().decode()
 
 
+def is_valid_key(key: str) -> bool:
+    try:
+        Fernet(key.encode())
+        return True
+    except (ValueError, TypeError):
+        return False
+
+
+@lru_cache(maxsize=16)
 def _get_fernet(key: str) -> Fernet:
     if not key:
         raise ValueError("SIDECAR_ENCRYPTION_KEY is not set. Cannot encrypt/decrypt secrets.")
@@ -28,14 +40,72 @@ def _get_fernet(key: str) -> Fernet:
         return Fernet(b64)
 
 
+def key_id(key: str) -> str:
+    """Stable, non-secret identifier of a key (stored per row; never the key itself)."""
+    return hashlib.sha256(key.encode()).hexdigest()[:16]
+
+
+class KeyRing:
+    """
+    The primary key plus older keys that are still accepted for decryption.
+
+    Rows record the ID of the key that encrypted them, so a decrypt is a
+    single HMAC check against that key; rows without an ID (written before
+    key IDs existed) fall back to trying every key, as MultiFernet does.
+    """
+
+    def __init__(self, keys: tuple[str, ...]):
+        self._fernets = {key_id(k): _get_fernet(k) for k in keys}
+        self.primary_id = key_id(keys[0])
+        self._primary = self._fernets[self.primary_id]
+        self._any = MultiFernet(list(self._fernets.values()))
+
+    def is_current(self, kid: Optional[str]) -> bool:
+        return kid == self.primary_id
+
+    def encrypt(self, plaintext: str) -> str:
+        return self._primary.encrypt(plaintext.encode()).decode()
+
+    def decrypt(self, ciphertext: str, kid: Optional[str] = None) -> str:
+        token = ciphertext.encode()
+        f = self._fernets.get(kid)
+        try:
+            if f is not None:
+                try:
+                    return f.decrypt(token).decode()
+                except InvalidToken:
+                    pass  # mislabelled row — fall through to every key
+            return self._any.decrypt(token).decode()
+        except InvalidToken:
+            raise ValueError("Decryption failed: invalid token or wrong key.")
+
+    def encrypt_many(self, plaintexts: list[str]) -> list[str]:
+        return [self.encrypt(p) for p in plaintexts]
+
+    def decrypt_many(self, rows: list[tuple[str, Optional[str]]]) -> list[Optional[str]]:
+        """decrypt() for (ciphertext, key_id) pairs; failures come back as None."""
+        out: list[Optional[str]] = []
+        for ciphertext, kid in rows:
+            try:
+                out.append(self.decrypt(ciphertext, kid))
+            except ValueError:
+                out.append(None)
+        return out
+
+    def reencrypt_many(self, rows: list[tuple[str, Optional[str]]]) -> list[Optional[str]]:
+        """Re-encrypt (ciphertext, key_id) pairs under the primary key; failures come back as None."""
+        return [None if plain is None else self.encrypt(plain) for plain in self.decrypt_many(rows)]
+
+
+@lru_cache(maxsize=4)
+def get_key_ring(*keys: str) -> KeyRing:
+    """Cached KeyRing for (primary, *older) keys — rebuilt only when the keys change."""
+    return KeyRing(keys)
+
+
 def encrypt(plaintext: str, key: str) -> str:
-    f = _get_fernet(key)
-    return f.encrypt(plaintext.encode()).decode()
+    return get_key_ring(key).encrypt(plaintext)
 
 
-def decrypt(ciphertext: str, key: str) -> str:
-    f = _get_fernet(key)
-    try:
-        return f.decrypt(ciphertext.encode()).decode()
-    except InvalidToken:
-        raise ValueError("Decryption failed: invalid token or wrong key.")
+def decrypt(ciphertext: str, key: str, *older_keys: str) -> str:
+    return get_key_ring(key, *older_keys).decrypt(ciphertext)
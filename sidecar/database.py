@@ -1,24 +1,89 @@
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker, AsyncSession
-from sqlalchemy.orm import DeclarativeBase
+from sqlalchemy.orm import DeclarativeBase, Session
+from sqlalchemy.sql.dml import UpdateBase
 from sidecar.config import SidecarConfig
 from pathlib import Path
 
 # Ensure the secrets directory exists
 Path(SidecarConfig.DB_PATH).parent.mkdir(parents=True, exist_ok=True)
 
+_DB_URL = f"sqlite+aiosqlite:///{SidecarConfig.DB_PATH}"
+_CONNECT_ARGS = {"check_same_thread": False}
+
+# Single writer connection — writes queue here instead of hitting "database is locked"
 engine = create_async_engine(
-    f"sqlite+aiosqlite:///{SidecarConfig.DB_PATH}",
-    connect_args={"check_same_thread": False},
+    _DB_URL,
+    connect_args=_CONNECT_ARGS,
+    pool_size=1,
+    max_overflow=0,
+)
+read_engine = create_async_engine(
+    _DB_URL,
+    connect_args=_CONNECT_ARGS,
+    pool_size=SidecarConfig.SQLITE_READ_POOL_SIZE,
+    max_overflow=0,
 )
 
+
+def _sqlite_pragmas(read_only: bool):
+    """WAL + synchronous=NORMAL + busy_timeout on every new connection (same profile as app/database.py)."""
+    def on_connect(dbapi_connection, _record):
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.execute(f"PRAGMA busy_timeout={int(SidecarConfig.SQLITE_BUSY_TIMEOUT_MS)}")
+        cursor.execute(f"PRAGMA cache_size=-{int(SidecarConfig.SQLITE_CACHE_SIZE_KB)}")
+        cursor.execute(f"PRAGMA mmap_size={int(SidecarConfig.SQLITE_MMAP_SIZE)}")
+        cursor.execute("PRAGMA temp_store=MEMORY")
+        if read_only:
+            cursor.execute("PRAGMA query_only=ON")
+        cursor.close()
+    return on_connect
+
+
+event.listen(engine.sync_engine, "connect", _sqlite_pragmas(read_only=False))
+event.listen(read_engine.sync_engine, "connect", _sqlite_pragmas(read_only=True))
+
+
+class RoutingSession(Session):
+    """Reads use the read pool; after the first write the session sticks to the writer."""
+    _sticky = False
+
+    def get_bind(self, mapper=None, clause=None, **kw):
+        if not self._sticky and (
+            self._flushing
+            or isinstance(clause, UpdateBase)
+            or getattr(clause, "_for_update_arg", None) is not None
+        ):
+            self._sticky = True
+        return engine.sync_engine if self._sticky else read_engine.sync_engine
+
+
 AsyncSessionLocal = async_sessionmaker(
     bind=engine,
     class_=AsyncSession,
+    sync_session_class=RoutingSession,
     expire_on_commit=False,
     autocommit=False,
     autoflush=False,
 )
 
 
+def upgrade_schema(connection) -> None:
+    """Add columns introduced after the tables were first created (create_all never alters)."""
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(secret_store)")}
+    if "key_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE secret_store ADD COLUMN key_id VARCHAR(16)")
+    columns = {row[1] for row in connection.exec_driver_sql("PRAGMA table_info(key_rotation)")}
+    if "last_var_id" not in columns:
+        connection.exec_driver_sql("ALTER TABLE key_rotation ADD COLUMN last_var_id INTEGER NOT NULL DEFAULT 0")
+
+
+async def dispose_engines() -> None:
+    await engine.dispose()
+    await read_engine.dispose()
+
+
 class Base(DeclarativeBase):
     pass
@@ -2,33 +2,42 @@
 Secret Manager Sidecar — gitDeploy companion service.
 
 Runs on port 8001 by default. Provides encrypted storage of per-app
-environment variable secrets using AES encryption (Fernet).
+environment variable secrets using AES encryption (Fernet), one row per
+variable (secret_var), so reads and updates only touch the variables asked for.
 
 Authentication: X-Api-Key header (shared secret with main app).
 
 Endpoints:
   GET  /health                    - health check
-  POST /secrets/{app_id}          - store / update secrets for an app
-  GET  /secrets/{app_id}          - retrieve decrypted secrets for an app
+  POST /secrets/{app_id}          - store / replace secrets for an app
+  PATCH /secrets/{app_id}         - set / remove individual variables
+  GET  /secrets/{app_id}          - retrieve decrypted secrets for an app (?keys=A,B for a subset)
   DELETE /secrets/{app_id}        - delete secrets for an app
   GET  /secrets                   - list all app IDs that have secrets stored
-  POST /admin/rotate-key          - re-encrypt all secrets with a new key
+  POST /secrets:batchGet          - retrieve decrypted secrets for many apps
+  POST /secrets:batchPut          - store / update secrets for many apps
+  POST /admin/rotate-key          - start / resume re-encrypting all secrets with a new key
+  GET  /admin/rotate-key          - key rotation progress
 """
-import json
+import asyncio
 import logging
 from contextlib import asynccontextmanager
-from typing import AsyncGenerator
+from datetime import datetime, timezone
+from typing import AsyncGenerator, Callable, Optional
 
-from fastapi import FastAPI, Depends, HTTPException
+from fastapi import BackgroundTasks, FastAPI, Depends, HTTPException, Query
 from fastapi import Path as ApiPath
-from sqlalchemy import select
+from sqlalchemy import delete, insert, select
+from sqlalchemy.dialects.sqlite import insert as sqlite_insert
 from sqlalchemy.ext.asyncio import AsyncSession
-from pydantic import BaseModel
+from pydantic import BaseModel, PositiveInt
 
 from sidecar.config import SidecarConfig
-from sidecar.database import engine, Base, AsyncSessionLocal
-from sidecar.models import SecretStore
-from sidecar.crypto import encrypt, decrypt, generate_key
+from sidecar.database import engine, Base, AsyncSessionLocal, dispose_engines, upgrade_schema
+from sidecar.models import SecretVar
+from sidecar.crypto import KeyRing, generate_key, is_valid_key
+from sidecar import rotation
+from sidecar.migrate import migrate_blob_secrets
 from sidecar.dependencies import get_db, verify_api_key
 
 logging.basicConfig(
@@ -42,6 +51,7 @@ logger = logging.getLogger(__name__)
 async def lifespan(app: FastAPI):
     async with engine.begin() as conn:
         await conn.run_sync(Base.metadata.create_all)
+        await conn.run_sync(upgrade_schema)
     logger.info("Secret Manager sidecar started on port %s", SidecarConfig.PORT)
     if not SidecarConfig.ENCRYPTION_KEY:
         new_key = generate_key()
@@ -50,8 +60,11 @@ async def lifespan(app: FastAPI):
             new_key,
         )
         SidecarConfig.ENCRYPTION_KEY = new_key
+    await migrate_blob_secrets()
+    await rotation.resume_on_startup()
     yield
-    await engine.dispose()
+    await rotation.stop_rotation()
+    await dispose_engines()
 
 
 app = FastAPI(
@@ -68,10 +81,84 @@ class SecretsPayload(BaseModel):
     secrets: dict[str, str]
 
 
+class SecretsPatchPayload(BaseModel):
+    # JSON merge patch: a string sets the variable, null removes it
+    secrets: dict[str, Optional[str]]
+
+
 class RotateKeyPayload(BaseModel):
     new_key: str
 
 
+class BatchGetPayload(BaseModel):
+    app_ids: list[PositiveInt]
+
+
+class BatchPutItem(BaseModel):
+    app_id: PositiveInt
+    secrets: dict[str, str]
+
+
+class BatchPutPayload(BaseModel):
+    items: list[BatchPutItem]
+
+
+# ── Storage helpers ───────────────────────────────────────────────────────────
+
+_VAR_COLUMNS = (SecretVar.id, SecretVar.app_id, SecretVar.name, SecretVar.encrypted_value, SecretVar.key_id)
+
+
+async def _run_batched(fn: Callable[[list], list], items: list, nbytes: int) -> list:
+    """
+    fn(items) inline for small batches; above BATCH_PARALLEL_BYTES the items
+    are split into chunks run in worker threads, keeping the event loop free
+    and letting OpenSSL work on several chunks at once.
+    """
+    if nbytes < SidecarConfig.BATCH_PARALLEL_BYTES:
+        return fn(items)
+    step = -(-len(items) // max(1, SidecarConfig.BATCH_PARALLEL_CHUNKS))
+    parts = await asyncio.gather(*(
+        asyncio.to_thread(fn, items[i:i + step]) for i in range(0, len(items), step)
+    ))
+    return [result for part in parts for result in part]
+
+
+async def _decrypt_rows(rows, ring: KeyRing) -> list[Optional[str]]:
+    return await _run_batched(
+        ring.decrypt_many,
+        [(row.encrypted_value, row.key_id) for row in rows],
+        sum(len(row.encrypted_value) for row in rows),
+    )
+
+
+async def _encrypt_rows(envs: dict[int, dict[str, str]], ring: KeyRing) -> list[dict]:
+    """secret_var insert values for {app_id: {name: value}}, encrypted under the primary key."""
+    names = [(app_id, name) for app_id, env in envs.items() for name in env]
+    plaintexts = [envs[app_id][name] for app_id, name in names]
+    tokens = await _run_batched(ring.encrypt_many, plaintexts, sum(len(p) for p in plaintexts))
+    return [
+        {"app_id": app_id, "name": name, "encrypted_value": token, "key_id": ring.primary_id}
+        for (app_id, name), token in zip(names, tokens)
+    ]
+
+
+async def _replace_vars(db: AsyncSession, envs: dict[int, dict[str, str]]) -> None:
+    """Make each app's variables exactly `envs[app_id]`. Does not commit."""
+    values = await _encrypt_rows(envs, rotation.key_ring())
+    await db.execute(delete(SecretVar).where(SecretVar.app_id.in_(list(envs))))
+    if values:
+        await db.execute(insert(SecretVar), values)
+
+
+def _check_batch_size(n: int) -> None:
+    if n > SidecarConfig.BATCH_MAX_ITEMS:
+        raise HTTPException(
+            status_code=400,
+            detail=f"At most {SidecarConfig.BATCH_MAX_ITEMS} apps per batch request",
+            headers={"X-Batch-Max-Items": str(SidecarConfig.BATCH_MAX_ITEMS)},
+        )
+
+
 # ── Routes ────────────────────────────────────────────────────────────────────
 
 @app.get("/health")
@@ -85,39 +172,69 @@ async def store_secrets(
     db: AsyncSession = Depends(get_db),
     app_id: int = ApiPath(gt=0),
 ):
-    encrypted = encrypt(json.dumps(payload.secrets), SidecarConfig.ENCRYPTION_KEY)
-
-    result = await db.execute(select(SecretStore).where(SecretStore.app_id == app_id))
-    existing = result.scalar_one_or_none()
-
-    if existing:
-        existing.encrypted_secrets = encrypted
-    else:
-        db.add(SecretStore(app_id=app_id, encrypted_secrets=encrypted))
-
+    """Replace all of an app's variables."""
+    await _replace_vars(db, {app_id: payload.secrets})
     await db.commit()
     logger.info("Secrets stored for app_id=%s (%d keys)", app_id, len(payload.secrets))
     return {"app_id": app_id, "keys_stored": len(payload.secrets)}
 
 
+@app.patch("/secrets/{app_id}", dependencies=[Depends(verify_api_key)])
+async def patch_secrets(
+    payload: SecretsPatchPayload,
+    db: AsyncSession = Depends(get_db),
+    app_id: int = ApiPath(gt=0),
+):
+    """Set or remove (null) individual variables; the others are not touched."""
+    to_set = {name: value for name, value in payload.secrets.items() if value is not None}
+    to_remove = [name for name, value in payload.secrets.items() if value is None]
+
+    if to_set:
+        values = await _encrypt_rows({app_id: to_set}, rotation.key_ring())
+        upsert = sqlite_insert(SecretVar).values(values)
+        await db.execute(upsert.on_conflict_do_update(
+            index_elements=[SecretVar.app_id, SecretVar.name],
+            set_={
+                "encrypted_value": upsert.excluded.encrypted_value,
+                "key_id": upsert.excluded.key_id,
+                "updated_at": datetime.now(timezone.utc),
+            },
+        ))
+    if to_remove:
+        await db.execute(delete(SecretVar).where(SecretVar.app_id == app_id, SecretVar.name.in_(to_remove)))
+    await db.commit()
+    logger.info("Secrets patched for app_id=%s (%d set, %d removed)", app_id, len(to_set), len(to_remove))
+    return {"app_id": app_id, "keys_set": len(to_set), "keys_removed": len(to_remove)}
+
+
 @app.get("/secrets/{app_id}", dependencies=[Depends(verify_api_key)])
 async def get_secrets(
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
     app_id: int = ApiPath(gt=0),
+    keys: Optional[str] = Query(None, description="Comma-separated variable names to return (default: all)"),
 ):
-    result = await db.execute(select(SecretStore).where(SecretStore.app_id == app_id))
-    record = result.scalar_one_or_none()
-    if not record:
-        raise HTTPException(status_code=404, detail="No secrets found for this app")
-
-    try:
-        decrypted = decrypt(record.encrypted_secrets, SidecarConfig.ENCRYPTION_KEY)
-        secrets = json.loads(decrypted)
-    except Exception as e:
-        logger.error("Decryption failed for app_id=%s: %s", app_id, e)
+    query = select(*_VAR_COLUMNS).where(SecretVar.app_id == app_id)
+    if keys is not None:
+        query = query.where(SecretVar.name.in_([k.strip() for k in keys.split(",") if k.strip()]))
+    rows = (await db.execute(query)).all()
+    if not rows:
+        exists = keys is not None and (await db.execute(
+            select(SecretVar.id).where(SecretVar.app_id == app_id).limit(1)
+        )).first()
+        if not exists:
+            raise HTTPException(status_code=404, detail="No secrets found for this app")
+
+    ring = rotation.key_ring()
+    values = await _decrypt_rows(rows, ring)
+    if any(value is None for value in values):
+        logger.error("Decryption failed for app_id=%s", app_id)
         raise HTTPException(status_code=500, detail="Failed to decrypt secrets")
 
-    return {"app_id": app_id, "secrets": secrets}
+    stale = [row for row in rows if not ring.is_current(row.key_id)]
+    if stale:
+        background_tasks.add_task(rotation.reencrypt_stale, stale)
+    return {"app_id": app_id, "secrets": {row.name: value for row, value in zip(rows, values)}}
 
 
 @app.delete("/secrets/{app_id}", dependencies=[Depends(verify_api_key)])
@@ -125,12 +242,10 @@ async def delete_secrets(
     db: AsyncSession = Depends(get_db),
     app_id: int = ApiPath(gt=0),
 ):
-    result = await db.execute(select(SecretStore).where(SecretStore.app_id == app_id))
-    record = result.scalar_one_or_none()
-    if not record:
+    result = await db.execute(delete(SecretVar).where(SecretVar.app_id == app_id))
+    if not result.rowcount:
         raise HTTPException(status_code=404, detail="No secrets found for this app")
 
-    await db.delete(record)
     await db.commit()
     logger.info("Secrets deleted for app_id=%s", app_id)
     return {"message": f"Secrets for app {app_id} deleted"}
@@ -138,33 +253,80 @@ async def delete_secrets(
 
 @app.get("/secrets", dependencies=[Depends(verify_api_key)])
 async def list_secret_app_ids(db: AsyncSession = Depends(get_db)):
-    result = await db.execute(select(SecretStore.app_id))
+    result = await db.execute(select(SecretVar.app_id).distinct().order_by(SecretVar.app_id))
     app_ids = [row[0] for row in result.all()]
     return {"app_ids": app_ids, "count": len(app_ids)}
 
 
-@app.post("/admin/rotate-key", dependencies=[Depends(verify_api_key)])
-async def rotate_encryption_key(
-    payload: RotateKeyPayload,
+@app.post("/secrets:batchGet", dependencies=[Depends(verify_api_key)])
+async def batch_get_secrets(
+    payload: BatchGetPayload,
+    background_tasks: BackgroundTasks,
     db: AsyncSession = Depends(get_db),
 ):
-    """Re-encrypt all stored secrets with a new encryption key."""
-    result = await db.execute(select(SecretStore))
-    records = result.scalars().all()
-
-    rotated = 0
-    for record in records:
-        try:
-            plain = decrypt(record.encrypted_secrets, SidecarConfig.ENCRYPTION_KEY)
-            record.encrypted_secrets = encrypt(plain, payload.new_key)
-            rotated += 1
-        except Exception as e:
-            logger.error("Key rotation failed for app_id=%s: %s", record.app_id, e)
-
-    SidecarConfig.ENCRYPTION_KEY = payload.new_key
+    """
+    Decrypted secrets for many apps in one query. Apps without stored
+    secrets are listed in `missing`, undecryptable ones in `failed`.
+    """
+    app_ids = list(dict.fromkeys(payload.app_ids))
+    _check_batch_size(len(app_ids))
+    rows = (await db.execute(select(*_VAR_COLUMNS).where(SecretVar.app_id.in_(app_ids)))).all()
+    ring = rotation.key_ring()
+    values = await _decrypt_rows(rows, ring)
+
+    secrets: dict[int, dict[str, str]] = {}
+    failed, stale = set(), []
+    for row, value in zip(rows, values):
+        if value is None:
+            failed.add(row.app_id)
+            continue
+        secrets.setdefault(row.app_id, {})[row.name] = value
+        if not ring.is_current(row.key_id):
+            stale.append(row)
+    for app_id in failed:
+        logger.error("Decryption failed for app_id=%s", app_id)
+        secrets.pop(app_id, None)
+    if stale:
+        background_tasks.add_task(rotation.reencrypt_stale, stale)
+    missing = [app_id for app_id in app_ids if app_id not in secrets and app_id not in failed]
+    return {"secrets": secrets, "missing": missing, "failed": sorted(failed)}
+
+
+@app.post("/secrets:batchPut", dependencies=[Depends(verify_api_key)])
+async def batch_store_secrets(
+    payload: BatchPutPayload,
+    db: AsyncSession = Depends(get_db),
+):
+    """Replace secrets for many apps in one transaction. A repeated app_id keeps its last payload."""
+    items = {item.app_id: item.secrets for item in payload.items}
+    _check_batch_size(len(items))
+    await _replace_vars(db, items)
     await db.commit()
-    logger.info("Key rotation complete. %d records re-encrypted.", rotated)
-    return {"rotated": rotated}
+    logger.info("Secrets stored for %d apps (batch)", len(items))
+    return {"stored": len(items), "app_ids": list(items)}
+
+
+@app.post("/admin/rotate-key", status_code=202, dependencies=[Depends(verify_api_key)])
+async def rotate_encryption_key(payload: RotateKeyPayload):
+    """
+    Switch to a new encryption key and re-encrypt stored secrets in the
+    background (see sidecar/rotation.py). Re-POSTing the same key resumes an
+    interrupted rotation. Poll GET /admin/rotate-key for progress.
+    """
+    if not is_valid_key(payload.new_key):
+        raise HTTPException(status_code=400, detail="new_key is not a valid Fernet key")
+    if rotation.is_running():
+        raise HTTPException(status_code=409, detail="A key rotation is already running")
+    try:
+        checkpoint = await rotation.start_rotation(payload.new_key)
+    except ValueError as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return rotation.progress(checkpoint)
+
+
+@app.get("/admin/rotate-key", dependencies=[Depends(verify_api_key)])
+async def rotation_progress():
+    return rotation.progress(await rotation.load_checkpoint())
 
 
 if __name__ == "__main__":
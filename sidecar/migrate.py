@@ -0,0 +1,61 @@
+"""
+One-time move of secrets from the legacy secret_store blobs (the whole env
+as one encrypted JSON document per app) to per-variable secret_var rows.
+
+Runs at startup before the sidecar serves requests. Apps are migrated in
+chunks of ROTATION_CHUNK_SIZE, each in its own transaction that inserts the
+variables and deletes the blob, so an interrupted migration simply continues
+on the next start. Blobs that cannot be decrypted with the key ring are left
+in secret_store and logged.
+"""
+import json
+import logging
+
+from sqlalchemy import delete, insert, select
+
+from sidecar.config import SidecarConfig
+from sidecar.database import AsyncSessionLocal
+from sidecar.models import SecretStore, SecretVar
+from sidecar.rotation import key_ring
+
+logger = logging.getLogger(__name__)
+
+
+async def migrate_blob_secrets() -> None:
+    ring = key_ring()
+    last_app_id, migrated, skipped = 0, 0, 0
+    while True:
+        async with AsyncSessionLocal() as db:
+            blobs = (await db.execute(
+                select(SecretStore.app_id, SecretStore.encrypted_secrets, SecretStore.key_id)
+                .where(SecretStore.app_id > last_app_id)
+                .order_by(SecretStore.app_id)
+                .limit(SidecarConfig.ROTATION_CHUNK_SIZE)
+            )).all()
+            if not blobs:
+                break
+            last_app_id = blobs[-1].app_id
+
+            values, done = [], []
+            for blob in blobs:
+                try:
+                    env = json.loads(ring.decrypt(blob.encrypted_secrets, blob.key_id))
+                except ValueError as e:
+                    logger.error("Cannot migrate secrets of app_id=%s: %s", blob.app_id, e)
+                    skipped += 1
+                    continue
+                done.append(blob.app_id)
+                values.extend(
+                    {"app_id": blob.app_id, "name": name, "encrypted_value": ring.encrypt(value),
+                     "key_id": ring.primary_id}
+                    for name, value in env.items()
+                )
+            if values:
+                await db.execute(insert(SecretVar), values)
+            if done:
+                await db.execute(delete(SecretStore).where(SecretStore.app_id.in_(done)))
+            await db.commit()
+            migrated += len(done)
+
+    if migrated or skipped:
+        logger.info("Migrated %d app(s) to per-variable secrets (%d skipped)", migrated, skipped)
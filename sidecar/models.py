@@ -1,15 +1,50 @@
-from sqlalchemy import Column, Integer, String, Text, DateTime
+from sqlalchemy import Column, Integer, String, Text, DateTime, UniqueConstraint
 from datetime import datetime, timezone
 from sidecar.database import Base
 
 
+class SecretVar(Base):
+    """One encrypted environment variable of an app. Names are stored in clear, values encrypted."""
+    __tablename__ = "secret_var"
+    __table_args__ = (UniqueConstraint("app_id", "name", name="uq_secret_var_app_name"),)
+
+    id = Column(Integer, primary_key=True, autoincrement=True)
+    app_id = Column(Integer, nullable=False)     # indexed by uq_secret_var_app_name
+    name = Column(String(255), nullable=False)
+    encrypted_value = Column(Text, nullable=False)
+    key_id = Column(String(16), nullable=False)          # crypto.key_id() of the encrypting key
+    created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    updated_at = Column(DateTime,
+                        default=lambda: datetime.now(timezone.utc),
+                        onupdate=lambda: datetime.now(timezone.utc))
+
+
 class SecretStore(Base):
+    """Legacy layout: the whole env as one encrypted JSON blob. Only read by sidecar/migrate.py."""
     __tablename__ = "secret_store"
 
     id = Column(Integer, primary_key=True, autoincrement=True)
     app_id = Column(Integer, nullable=False, index=True, unique=True)
     encrypted_secrets = Column(Text, nullable=False)   # JSON dict, encrypted
+    key_id = Column(String(16), nullable=True)         # crypto.key_id() of the encrypting key; NULL = legacy row
     created_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
     updated_at = Column(DateTime,
                         default=lambda: datetime.now(timezone.utc),
                         onupdate=lambda: datetime.now(timezone.utc))
+
+
+class KeyRotation(Base):
+    """Checkpoint of the current/last key rotation (single row, id=1)."""
+    __tablename__ = "key_rotation"
+
+    id = Column(Integer, primary_key=True)
+    key_fingerprint = Column(String(16), nullable=False)   # sha256 prefix of the new key, never the key
+    status = Column(String(16), nullable=False)            # running | completed | failed
+    last_app_id = Column(Integer, nullable=False, default=0)
+    last_var_id = Column(Integer, nullable=False, default=0)  # keyset position within last_app_id
+    rotated = Column(Integer, nullable=False, default=0)
+    failed = Column(Integer, nullable=False, default=0)
+    total = Column(Integer, nullable=False, default=0)
+    error = Column(Text, nullable=True)
+    started_at = Column(DateTime, default=lambda: datetime.now(timezone.utc))
+    finished_at = Column(DateTime, nullable=True)
@@ -0,0 +1,281 @@
+"""
+Background, resumable re-encryption of secret_var under a new key.
+
+Keys form a ring (crypto.KeyRing): SIDECAR_ENCRYPTION_KEY encrypts, and it
+plus the comma-separated SIDECAR_PREVIOUS_ENCRYPTION_KEY decrypt. Each row
+records its key ID, and rows read under an older key are re-encrypted under
+the current one after the response (reencrypt_stale), so rotation happens
+incrementally as secrets are used.
+
+POST /admin/rotate-key switches the sidecar to the new key immediately (the
+old key joins the ring) and starts a sweep for rows nobody reads, walking the
+stale rows of secret_var in (app_id, id) order, ROTATION_CHUNK_SIZE rows at a
+time:
+
+  - each chunk is re-encrypted in a worker thread, so the event loop keeps
+    serving requests;
+  - each chunk is written in its own transaction together with the
+    key_rotation checkpoint (last_app_id, last_var_id, counters), so a crash
+    loses at most one chunk of work and memory stays bounded by the chunk
+    size, however many variables an app has;
+  - rows are updated only if their ciphertext is unchanged since the chunk
+    was read — a concurrent write has already used the new key.
+
+After a restart the sidecar resumes an unfinished sweep by itself when
+SIDECAR_ENCRYPTION_KEY is the new key and SIDECAR_PREVIOUS_ENCRYPTION_KEY
+holds the old one; otherwise re-POSTing the same new key resumes from the
+checkpoint. A request that began before the switch can still commit a row
+under the old key behind the cursor, so after each pass the whole table is
+counted again and the sweep rewinds to the start while stale rows remain. It
+stops when none are left, or when a full pass re-encrypts nothing (what is
+left cannot be decrypted with any key in the ring); only then are the older
+keys dropped.
+"""
+import asyncio
+import logging
+from datetime import datetime, timezone
+from typing import Optional
+
+from sqlalchemy import and_, bindparam, func, or_, select, update
+
+from sidecar.config import SidecarConfig
+from sidecar.crypto import KeyRing, get_key_ring, key_id
+from sidecar.database import AsyncSessionLocal
+from sidecar.models import KeyRotation, SecretVar
+
+logger = logging.getLogger(__name__)
+
+_CHECKPOINT_ID = 1
+_task: Optional[asyncio.Task] = None
+
+
+def key_ring() -> KeyRing:
+    """The current key first, then every previous key still accepted for decryption."""
+    older = [k.strip() for k in SidecarConfig.PREVIOUS_ENCRYPTION_KEY.split(",") if k.strip()]
+    return get_key_ring(SidecarConfig.ENCRYPTION_KEY, *older)
+
+
+def is_running() -> bool:
+    return _task is not None and not _task.done()
+
+
+def progress(checkpoint: Optional[KeyRotation]) -> dict:
+    if checkpoint is None:
+        return {"status": "idle"}
+    return {
+        "status": checkpoint.status,
+        "key_fingerprint": checkpoint.key_fingerprint,
+        "last_app_id": checkpoint.last_app_id,
+        "last_var_id": checkpoint.last_var_id,
+        "rotated": checkpoint.rotated,
+        "failed": checkpoint.failed,
+        "total": checkpoint.total,
+        "error": checkpoint.error,
+        "started_at": checkpoint.started_at,
+        "finished_at": checkpoint.finished_at,
+    }
+
+
+async def load_checkpoint() -> Optional[KeyRotation]:
+    async with AsyncSessionLocal() as db:
+        return await db.get(KeyRotation, _CHECKPOINT_ID)
+
+
+# Core (table-level) executemany: only rows whose ciphertext is unchanged since they were read
+_var_table = SecretVar.__table__
+_CAS_UPDATE = (
+    update(_var_table)
+    .where(_var_table.c.id == bindparam("row_id"), _var_table.c.encrypted_value == bindparam("old"))
+    .values(encrypted_value=bindparam("new"), key_id=bindparam("new_key_id"))
+)
+
+
+async def reencrypt_rows(db, rows, ring: KeyRing) -> list:
+    """
+    Re-encrypt secret_var (id, app_id, encrypted_value, key_id) rows under the ring's
+    primary key and write them back compare-and-swap style. Does not commit.
+    Returns the rows that could not be decrypted.
+    """
+    pairs = [(row.encrypted_value, row.key_id) for row in rows]
+    if len(rows) > 16:
+        tokens = await asyncio.to_thread(ring.reencrypt_many, pairs)
+    else:
+        tokens = ring.reencrypt_many(pairs)
+    params, failed = [], []
+    for row, token in zip(rows, tokens):
+        if token is None:
+            failed.append(row)
+        else:
+            params.append({"row_id": row.id, "old": row.encrypted_value, "new": token, "new_key_id": ring.primary_id})
+    if params:
+        await db.execute(_CAS_UPDATE, params)
+    return failed
+
+
+async def reencrypt_stale(rows) -> None:
+    """Lazy re-encryption of rows read under an older key (run after the response is sent)."""
+    try:
+        async with AsyncSessionLocal() as db:
+            await reencrypt_rows(db, rows, key_ring())
+            await db.commit()
+    except Exception as e:
+        logger.warning("Lazy re-encryption of %d row(s) failed: %s", len(rows), e)
+
+
+def _stale(ring: KeyRing):
+    return SecretVar.key_id != ring.primary_id
+
+
+def _after(checkpoint: KeyRotation):
+    """Rows past the checkpoint's (app_id, id) keyset position."""
+    return or_(
+        SecretVar.app_id > checkpoint.last_app_id,
+        and_(SecretVar.app_id == checkpoint.last_app_id, SecretVar.id > checkpoint.last_var_id),
+    )
+
+
+async def _rotate_chunk() -> bool:
+    """Re-encrypt the next ROTATION_CHUNK_SIZE stale rows after the checkpoint. Returns False when done."""
+    ring = key_ring()
+    async with AsyncSessionLocal() as db:
+        checkpoint = await db.get(KeyRotation, _CHECKPOINT_ID)
+        rows = (await db.execute(
+            select(SecretVar.id, SecretVar.app_id, SecretVar.encrypted_value, SecretVar.key_id)
+            .where(_after(checkpoint), _stale(ring))
+            .order_by(SecretVar.app_id, SecretVar.id)
+            .limit(SidecarConfig.ROTATION_CHUNK_SIZE)
+        )).all()
+        if not rows:
+            return False
+
+        failed = await reencrypt_rows(db, rows, ring)
+        for row in failed:
+            logger.error("Key rotation failed for app_id=%s: undecryptable variable", row.app_id)
+        checkpoint.failed += len(failed)
+        checkpoint.rotated += len(rows) - len(failed)
+        checkpoint.last_app_id, checkpoint.last_var_id = rows[-1].app_id, rows[-1].id
+        await db.commit()
+        return True
+
+
+async def _rewind(start: KeyRotation) -> bool:
+    """
+    After a pass that began at `start`: if stale rows remain anywhere in the
+    table, rewind the checkpoint for another pass and return True. A full pass
+    that re-encrypted nothing ends the sweep.
+    """
+    async with AsyncSessionLocal() as db:
+        checkpoint = await db.get(KeyRotation, _CHECKPOINT_ID)
+        stale = (await db.execute(select(func.count(SecretVar.id)).where(_stale(key_ring())))).scalar_one()
+        full_pass = start.last_app_id == 0 and start.last_var_id == 0
+        if stale == 0 or (full_pass and checkpoint.rotated == start.rotated):
+            return False
+        logger.info("Key rotation: %d row(s) still under an older key, sweeping again", stale)
+        checkpoint.last_app_id = checkpoint.last_var_id = 0
+        checkpoint.failed = 0  # the next pass retries them
+        checkpoint.total = checkpoint.rotated + stale
+        await db.commit()
+        return True
+
+
+async def _run() -> None:
+    try:
+        while True:
+            start = await load_checkpoint()
+            while await _rotate_chunk():
+                pass
+            if not await _rewind(start):
+                break
+    except Exception as e:
+        logger.exception("Key rotation aborted")
+        await _finish("failed", error=str(e))
+        return
+    checkpoint = await _finish("completed")
+    SidecarConfig.PREVIOUS_ENCRYPTION_KEY = ""
+    logger.info(
+        "Key rotation complete. %d records re-encrypted, %d failed.", checkpoint.rotated, checkpoint.failed,
+    )
+
+
+async def _finish(status: str, error: Optional[str] = None) -> KeyRotation:
+    async with AsyncSessionLocal() as db:
+        checkpoint = await db.get(KeyRotation, _CHECKPOINT_ID)
+        checkpoint.status = status
+        checkpoint.error = error
+        checkpoint.finished_at = datetime.now(timezone.utc)
+        await db.commit()
+        return checkpoint
+
+
+async def start_rotation(new_key: str) -> KeyRotation:
+    """
+    Make new_key the primary key (the current one joins the older keys) and
+    sweep rows still under older keys onto it. Resumes an unfinished sweep
+    for the same new key; POSTing the current key sweeps whatever lazy
+    re-encryption has not reached yet. Raises ValueError if another
+    rotation is unfinished.
+    """
+    global _task
+    older = [k.strip() for k in SidecarConfig.PREVIOUS_ENCRYPTION_KEY.split(",") if k.strip()]
+    if SidecarConfig.ENCRYPTION_KEY != new_key:
+        older.insert(0, SidecarConfig.ENCRYPTION_KEY)
+    older = [k for k in dict.fromkeys(older) if k != new_key]
+
+    async with AsyncSessionLocal() as db:
+        checkpoint = await db.get(KeyRotation, _CHECKPOINT_ID)
+        resume = (
+            checkpoint is not None
+            and checkpoint.status != "completed"
+            and checkpoint.key_fingerprint == key_id(new_key)
+        )
+        if checkpoint is not None and checkpoint.status != "completed" and not resume:
+            raise ValueError("Another key rotation is unfinished; resume it with its new key first")
+
+        if not resume:
+            if checkpoint is not None:
+                await db.delete(checkpoint)
+                await db.flush()
+            checkpoint = KeyRotation(id=_CHECKPOINT_ID, key_fingerprint=key_id(new_key), status="running",
+                                     last_app_id=0, last_var_id=0, rotated=0, failed=0)
+            db.add(checkpoint)
+        else:
+            logger.info("Resuming key rotation after app_id=%s", checkpoint.last_app_id)
+        remaining = (await db.execute(
+            select(func.count(SecretVar.id))
+            .where(_after(checkpoint), _stale(get_key_ring(new_key)))
+        )).scalar_one()
+        checkpoint.status, checkpoint.error, checkpoint.finished_at = "running", None, None
+        checkpoint.total = checkpoint.rotated + checkpoint.failed + remaining
+        await db.commit()
+
+    SidecarConfig.ENCRYPTION_KEY = new_key
+    SidecarConfig.PREVIOUS_ENCRYPTION_KEY = ",".join(older)
+    _task = asyncio.create_task(_run())
+    return checkpoint
+
+
+async def resume_on_startup() -> None:
+    """Pick up a rotation interrupted by a restart, if the env carries both keys."""
+    checkpoint = await load_checkpoint()
+    if checkpoint is None or checkpoint.status != "running":
+        return
+    if checkpoint.key_fingerprint == key_id(SidecarConfig.ENCRYPTION_KEY) and SidecarConfig.PREVIOUS_ENCRYPTION_KEY:
+        await start_rotation(SidecarConfig.ENCRYPTION_KEY)
+    else:
+        logger.warning(
+            "An unfinished key rotation was found (after app_id=%s). Set SIDECAR_ENCRYPTION_KEY to the new key "
+            "and SIDECAR_PREVIOUS_ENCRYPTION_KEY to the old one, or re-POST /admin/rotate-key, to resume it.",
+            checkpoint.last_app_id,
+        )
+
+
+async def stop_rotation() -> None:
+    """Cancel the background task on shutdown; the checkpoint stays 'running' for resume."""
+    global _task
+    if is_running():
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+    _task = None